@@ -0,0 +1,163 @@
+import argparse
+import os
+from array import array
+from typing import Dict, Iterable, Optional
+
+from main import ActionType, FigureType, Player, square_index
+from replay import ReplayReader
+
+FIGURE_TYPES = list(FigureType)
+
+# One row per logged action: (column, array typecode, Arrow/NumPy type)
+COLUMNS = [
+    ("game", "i", "int32"),
+    ("ply", "i", "int32"),
+    ("turn", "i", "int32"),         # turn the action was played in
+    ("player", "b", "int8"),        # Player value of the side acting
+    ("kind", "b", "int8"),          # ActionType value
+    ("figure_type", "b", "int8"),   # index into FigureType, -1 for END_TURN
+    ("from_square", "b", "int8"),   # row * 8 + col, -1 when there is none
+    ("to_square", "b", "int8"),     # target square, or where a charging knight landed
+    ("success", "b", "int8"),
+    ("damage", "h", "int16"),       # life taken from enemy figures
+    ("kills", "b", "int8"),         # enemy figures killed
+    ("score_one", "b", "int8"),     # scores after the action
+    ("score_two", "b", "int8"),
+    ("winner", "b", "int8"),        # Player value that won the game, 0 if unfinished
+]
+
+def empty_columns() -> Dict[str, array]:
+    """Fresh column buffers."""
+    return {name: array(typecode) for name, typecode, _ in COLUMNS}
+
+def add_game(columns: Dict[str, array], reader: ReplayReader, game: int) -> int:
+    """Replay one log, appending a row per action. Returns the number of rows added.
+
+    A log with no actions, like one from a game dropped before its first
+    move, has no snapshot to start from and adds no rows.
+    """
+    if not len(reader):
+        return 0
+    state = reader.state_at(0)
+    start = len(columns["game"])
+    for ply, action in enumerate(reader.actions()):
+        turn = state.turn_count
+        player = state.current_player
+        figure_type = -1
+        if action.kind != ActionType.END_TURN:
+            actor = state.get_figure_at(action.origin)
+            if actor is not None:
+                player = actor.player
+                figure_type = FIGURE_TYPES.index(actor.type)
+        opponent = Player.TWO if player == Player.ONE else Player.ONE
+        enemies = {figure: figure.life for figure in state.figures_of(opponent)}
+
+        success, _ = state.perform(action)
+
+        damage = kills = 0
+        for figure, life in enemies.items():
+            damage += max(life - figure.life, 0)
+            kills += figure.is_dead
+        if action.kind == ActionType.CHARGE and success:
+            to_square = square_index(actor.position)
+        else:
+            to_square = -1 if action.target is None else square_index(action.target)
+
+        columns["game"].append(game)
+        columns["ply"].append(ply)
+        columns["turn"].append(turn)
+        columns["player"].append(player.value)
+        columns["kind"].append(action.kind.value)
+        columns["figure_type"].append(figure_type)
+        columns["from_square"].append(-1 if action.origin is None else square_index(action.origin))
+        columns["to_square"].append(to_square)
+        columns["success"].append(success)
+        columns["damage"].append(damage)
+        columns["kills"].append(kills)
+        columns["score_one"].append(state.scores[Player.ONE])
+        columns["score_two"].append(state.scores[Player.TWO])
+        columns["winner"].append(0)
+
+    added = len(columns["game"]) - start
+    if state.winner is not None:
+        columns["winner"][start:] = array("b", [state.winner.value]) * added
+    return added
+
+def _arrow_table(columns: Dict[str, array]):
+    import pyarrow as pa
+    return pa.table({name: pa.array(columns[name], type=getattr(pa, kind)())
+                     for name, _, kind in COLUMNS})
+
+def export(logs: Iterable[str], output: str, format: Optional[str] = None,
+           chunk_rows: int = 1 << 20) -> str:
+    """Write one row per action of every replay log to a columnar file.
+
+    format is "parquet" or "arrow" (both need pyarrow) or "npy", which
+    writes a directory of .npy files, one per column (needs numpy). By
+    default it follows the output's extension, and a directory of .npy
+    files is written when pyarrow is not installed. Arrow output is
+    written in row groups of about chunk_rows rows. Returns the format
+    used.
+    """
+    if format is None:
+        extension = os.path.splitext(output)[1].lower()
+        format = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}.get(extension, "npy")
+        if format != "npy":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                format = "npy"
+    if format not in ("parquet", "arrow", "npy"):
+        raise ValueError(f"Unknown format {format!r}, expected parquet, arrow or npy")
+
+    writer = None
+    columns = empty_columns()
+    try:
+        for game, path in enumerate(logs):
+            with ReplayReader(path) as reader:
+                add_game(columns, reader, game)
+            if format != "npy" and len(columns["game"]) >= chunk_rows:
+                writer = _write_arrow(writer, columns, output, format)
+                columns = empty_columns()
+        if format == "npy":
+            _write_npy(columns, output)
+        elif columns["game"] or writer is None:
+            writer = _write_arrow(writer, columns, output, format)
+    finally:
+        if writer is not None:
+            writer.close()
+    return format
+
+def _write_arrow(writer, columns: Dict[str, array], output: str, format: str):
+    """Append a row group, opening the writer on the first one."""
+    table = _arrow_table(columns)
+    if writer is None:
+        if format == "parquet":
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(output, table.schema)
+        else:
+            import pyarrow as pa
+            writer = pa.ipc.new_file(output, table.schema)
+    writer.write_table(table)
+    return writer
+
+def _write_npy(columns: Dict[str, array], output: str):
+    import numpy as np
+    os.makedirs(output, exist_ok=True)
+    for name, _, kind in COLUMNS:
+        np.save(os.path.join(output, f"{name}.npy"), np.frombuffer(columns[name], dtype=kind))
+
+def main():
+    """Command line entry point for exporting replay logs."""
+    parser = argparse.ArgumentParser(description="Export replay logs as one columnar row per action")
+    parser.add_argument("output", help="output file (.parquet, .arrow) or directory for .npy columns")
+    parser.add_argument("logs", nargs="+", help="replay logs to export, numbered as games in order")
+    parser.add_argument("--format", choices=["parquet", "arrow", "npy"],
+                        help="output format (default: from the output's extension)")
+    args = parser.parse_args()
+    used = export(args.logs, args.output, args.format)
+    print(f"Exported {len(args.logs)} games to {args.output} ({used})")
+
+
+if __name__ == "__main__":
+    main()
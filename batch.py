@@ -0,0 +1,586 @@
+from typing import List, Optional
+
+import numpy as np
+
+from compact import (ACTED, ATTACK, BOMBS, CONTAINED, DEAD, FIGURE_COUNT, FIGURE_TYPES,
+                     FLAGS, GAME_OVER, LIFE, MAX_LIFE, MOVE, MOVED, NO_SQUARE, OWNER, POOLS,
+                     REACH, SCORES, SIDE, SQUARE, TURN, WINNER, CompactState)
+from main import (Action, ActionType, CHARGE_DIRECTIONS, CHEBYSHEV_MASKS, FIGURE_STATS, FigureType,
+                  LONG_EYE_DIRECTIONS, MANHATTAN_MASKS, PATH_MASKS, Player, RAYS,
+                  ROSTER, START_ZONES, TERRAIN, BLAST_MASKS, iter_squares, square_position)
+
+KNIGHT = FIGURE_TYPES.index(FigureType.KNIGHT)
+BARBARIAN = FIGURE_TYPES.index(FigureType.BARBARIAN)
+ARBALIST = FIGURE_TYPES.index(FigureType.ARBALIST)
+BLACK_MAGE = FIGURE_TYPES.index(FigureType.BLACK_MAGE)
+WHITE_MAGE = FIGURE_TYPES.index(FigureType.WHITE_MAGE)
+
+# Every action a figure can take is a slot in a fixed-width row, so a whole
+# batch of legal action sets is one boolean array
+MOVE_SLOTS = 0                          # + target square
+ATTACK_SLOTS = MOVE_SLOTS + 64          # + target square
+CHARGE_SLOTS = ATTACK_SLOTS + 64        # + CHARGE_DIRECTIONS index
+LONG_EYE_SLOTS = CHARGE_SLOTS + 4       # + LONG_EYE_DIRECTIONS index
+BOMB_SLOTS = LONG_EYE_SLOTS + 8         # + target square
+PLAGUE_SLOTS = BOMB_SLOTS + 64          # + target square * 7 + X - 1
+PUSH_SLOTS = PLAGUE_SLOTS + 64 * 7      # + target square * 10 + dead pool index
+CONJURE_SLOTS = PUSH_SLOTS + 64 * 10    # + target square
+HEAL_SLOTS = CONJURE_SLOTS + 64         # + target square
+CONTAIN_SLOTS = HEAL_SLOTS + 64         # + target square
+ACTION_SLOTS = CONTAIN_SLOTS + 64
+END_TURN_SLOT = -1
+
+SLOT_STARTS = np.array([MOVE_SLOTS, ATTACK_SLOTS, CHARGE_SLOTS, LONG_EYE_SLOTS, BOMB_SLOTS,
+                        PLAGUE_SLOTS, PUSH_SLOTS, CONJURE_SLOTS, HEAL_SLOTS, CONTAIN_SLOTS])
+SLOT_KINDS = [ActionType.MOVE, ActionType.ATTACK, ActionType.CHARGE, ActionType.LONG_EYE,
+              ActionType.MAGIC_BOMB, ActionType.PLAGUE, ActionType.VAMPIRIC_PUSH,
+              ActionType.CONJURE, ActionType.HEAL, ActionType.CONTAIN]
+MAX_PLAGUE = 7  # X stays below the mage's life, which is at most 7
+CHARGE_NAMES = list(CHARGE_DIRECTIONS)
+LONG_EYE_NAMES = list(LONG_EYE_DIRECTIONS)
+
+# The geometry tables from main, as arrays
+def _bits_to_bool(mask: int) -> np.ndarray:
+    return np.array([mask >> square & 1 for square in range(64)], dtype=bool)
+
+def _padded(squares: List[int], width: int) -> List[int]:
+    return squares[:width] + [-1] * (width - len(squares[:width]))
+
+SQUARE_BITS = np.array([1 << square for square in range(64)], dtype=np.uint64)
+
+def _lane_bits(lane: List[int]) -> List[int]:
+    """Bits of a charge lane's squares up to the first terrain, padded to four steps."""
+    bits = []
+    for square in lane:
+        if TERRAIN >> square & 1:
+            break
+        bits.append(1 << square)
+    return bits + [0] * (4 - len(bits))
+
+def _target_table(figure_type: FigureType):
+    """Every square a figure type could target from each square, padded to one width.
+
+    Returns (64, width) arrays: the target squares, their bits, the path
+    bits in between, and whether each target is in move range with a
+    path, in attack range with a path, or in spell range. Padding repeats
+    the figure's own square with every flag off.
+    """
+    _, move, _, reach = FIGURE_STATS[figure_type]
+    diagonal = figure_type == FigureType.ARBALIST
+    within = CHEBYSHEV_MASKS if diagonal else MANHATTAN_MASKS
+    mage = figure_type in (FigureType.BLACK_MAGE, FigureType.WHITE_MAGE)
+    spells = [MANHATTAN_MASKS[reach][square] if mage else 0 for square in range(64)]
+    # Straight movers only reach squares in line with them, except with spells
+    lists = [[target for target in iter_squares(within[move][square] | within[reach][square] | spells[square])
+              if PATH_MASKS[diagonal][square * 64 + target] is not None or spells[square] >> target & 1]
+             for square in range(64)]
+    width = max(len(targets) for targets in lists)
+    squares, movable, attackable, castable = [], [], [], []
+    for square, targets in enumerate(lists):
+        paths = [PATH_MASKS[diagonal][square * 64 + target] for target in targets]
+        padding = [False] * (width - len(targets))
+        squares.append(targets + [square] * len(padding))
+        movable.append([path is not None and bool(within[move][square] >> target & 1)
+                        and not TERRAIN >> target & 1 for target, path in zip(targets, paths)] + padding)
+        attackable.append([path is not None and bool(within[reach][square] >> target & 1)
+                           for target, path in zip(targets, paths)] + padding)
+        castable.append([bool(spells[square] >> target & 1) for target in targets] + padding)
+    squares = np.array(squares, dtype=np.intp)
+    paths = np.array([[PATH_MASKS[diagonal][square * 64 + target] or 0 for target in row]
+                      for square, row in enumerate(squares.tolist())], dtype=np.uint64)
+    return (squares, SQUARE_BITS[squares], paths,
+            np.array(movable), np.array(attackable), np.array(castable))
+
+TERRAIN_BITS = np.uint64(TERRAIN)
+TERRAIN_SQUARES = _bits_to_bool(TERRAIN)
+START_SQUARES = np.array([np.zeros(64, dtype=bool)]
+                         + [_bits_to_bool(START_ZONES[player]) for player in Player])
+# [player value] -> start zone squares, and their bits; row 0 only pads the table
+START_LISTS = np.array([list(iter_squares(START_ZONES[Player.ONE]))]
+                       + [list(iter_squares(START_ZONES[player])) for player in Player], dtype=np.intp)
+START_BITS = SQUARE_BITS[START_LISTS]
+# [figure type index] -> _target_table() arrays
+TARGETS = [_target_table(figure_type) for figure_type in FIGURE_TYPES]
+# [direction, square, step] -> square, -1 past the edge
+CHARGE_RAYS = np.array([[_padded(RAYS[direction][square], 4) for square in range(64)]
+                        for direction in CHARGE_NAMES])
+LONG_EYE_RAYS = np.array([[_padded(RAYS[direction][square], 7) for square in range(64)]
+                          for direction in LONG_EYE_NAMES])
+# [square, direction, step] -> bit of each square a charge may pass, up to terrain
+CHARGE_LANES = np.array([[_lane_bits(RAYS[direction][square][:4]) for direction in CHARGE_NAMES]
+                         for square in range(64)], dtype=np.uint64)
+# [square, direction, step] -> bit of each square Long Eye looks along, 0 past the edge
+LONG_EYE_LINES = np.array([[[1 << target if target >= 0 else 0 for target in ray]
+                            for ray in LONG_EYE_RAYS[:, square]] for square in range(64)], dtype=np.uint64)
+# [square, direction, step] -> bits of the squares Long Eye looks past before that step
+LONG_EYE_BEFORE = np.concatenate([np.zeros((64, len(LONG_EYE_NAMES), 1), dtype=np.uint64),
+                                  np.bitwise_or.accumulate(LONG_EYE_LINES, axis=2)[:, :, :-1]], axis=2)
+# [centre] -> blast squares in the order damage is dealt, centre first
+BLAST_ORDER = np.array([_padded([centre] + [square for square in iter_squares(BLAST_MASKS[centre])
+                                            if square != centre], 9)
+                        for centre in range(64)])
+
+MAX_LIFE_OF = np.array(MAX_LIFE)
+ATTACK_OF = np.array(ATTACK)
+PLAGUE_X = np.arange(1, MAX_PLAGUE + 1)
+EARLIER = np.tri(FIGURE_COUNT, k=-1, dtype=bool)  # [i, j]: pool entry j comes before entry i
+DIRECTION_COLUMNS = np.arange(len(LONG_EYE_NAMES))[None, :]  # charge and Long Eye slots per direction
+
+class BatchGames:
+    """Many games stored as NumPy arrays and advanced in lockstep.
+
+    The arrays follow the CompactState layout with a leading game axis:
+    figures are columns indexed by figure id, the board holds ids (-1 when
+    empty), and dead pools hold ids in the order they died. Actions are
+    (figure id, slot) pairs, where a slot indexes the fixed-width action
+    row laid out by the *_SLOTS constants and END_TURN_SLOT ends the turn.
+
+    The rules are the same as GameState's, applied as masked array
+    operations over every game that takes the same kind of action.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.board = np.full((size, 64), -1, dtype=np.int8)
+        self.owner = np.zeros((size, FIGURE_COUNT), dtype=np.int8)      # Player value, 0 if absent
+        self.square = np.full((size, FIGURE_COUNT), -1, dtype=np.int8)  # -1 when off the board
+        self.life = np.zeros((size, FIGURE_COUNT), dtype=np.int8)
+        self.flags = np.zeros((size, FIGURE_COUNT), dtype=np.uint8)
+        self.contained = np.zeros((size, FIGURE_COUNT), dtype=np.int8)
+        self.pool = np.zeros((size, 2, FIGURE_COUNT), dtype=np.int8)
+        self.pool_size = np.zeros((size, 2), dtype=np.int8)
+        self.side = np.full(size, Player.ONE.value, dtype=np.int8)
+        self.scores = np.zeros((size, 2), dtype=np.int8)
+        self.bombs = np.zeros((size, 2), dtype=bool)
+        self.game_over = np.zeros(size, dtype=bool)
+        self.winner = np.zeros(size, dtype=np.int8)
+        self.turn_count = np.zeros(size, dtype=np.int32)
+
+    @classmethod
+    def random_setup(cls, size: int, rng: np.random.Generator) -> "BatchGames":
+        """Start games with each player's roster on random squares of their start zone."""
+        games = cls(size)
+        rows = np.arange(size)
+        for copy, player in enumerate(Player):
+            zone = np.flatnonzero(START_SQUARES[player.value])
+            picks = zone[np.argsort(rng.random((size, len(zone))), axis=1)[:, :len(ROSTER)]]
+            for slot, figure_type in enumerate(ROSTER):
+                fid = 2 * FIGURE_TYPES.index(figure_type) + copy
+                games.owner[:, fid] = player.value
+                games.life[:, fid] = MAX_LIFE[fid]
+                games._put(rows, fid, picks[:, slot])
+        return games
+
+    @classmethod
+    def from_compact(cls, states: List[CompactState]) -> "BatchGames":
+        """Stack CompactStates into one batch."""
+        games = cls(len(states))
+        for i, state in enumerate(states):
+            buf = state.buf
+            for fid in range(FIGURE_COUNT):
+                games.owner[i, fid] = buf[OWNER + fid]
+                games.life[i, fid] = buf[LIFE + fid]
+                games.flags[i, fid] = buf[FLAGS + fid]
+                games.contained[i, fid] = buf[CONTAINED + fid]
+                position = state.position(fid)
+                if position is not None:
+                    games._put(i, fid, position[0] * 8 + position[1])
+            for p, player in enumerate(Player):
+                pool = state.dead_pool(player)
+                games.pool[i, p, :len(pool)] = pool
+                games.pool_size[i, p] = len(pool)
+                games.scores[i, p] = state.score(player)
+                games.bombs[i, p] = state.magic_bomb_used(player)
+            games.side[i] = state.current_player.value
+            games.game_over[i] = state.game_over
+            games.winner[i] = state.winner.value if state.winner else 0
+            games.turn_count[i] = state.turn_count
+        return games
+
+    def to_compact(self, game: int) -> CompactState:
+        """Copy one game of the batch out as a CompactState."""
+        state = CompactState()
+        buf = state.buf
+        buf[:64] = bytes((self.board[game] + 1).astype(np.uint8))
+        for fid in range(FIGURE_COUNT):
+            buf[OWNER + fid] = int(self.owner[game, fid])
+            buf[LIFE + fid] = int(self.life[game, fid])
+            buf[FLAGS + fid] = int(self.flags[game, fid])
+            buf[CONTAINED + fid] = int(self.contained[game, fid])
+            square = self.square[game, fid]
+            buf[SQUARE + fid] = NO_SQUARE if square < 0 else int(square)
+        for p, player in enumerate(Player):
+            start = POOLS[player]
+            buf[start] = int(self.pool_size[game, p])
+            buf[start + 1:start + 1 + FIGURE_COUNT] = bytes(self.pool[game, p].astype(np.uint8))
+            buf[SCORES[player]] = int(self.scores[game, p])
+        buf[BOMBS] = int(self.bombs[game, 0]) | int(self.bombs[game, 1]) << 1
+        buf[SIDE] = int(self.side[game])
+        buf[GAME_OVER] = int(self.game_over[game])
+        buf[WINNER] = int(self.winner[game])
+        buf[TURN:TURN + 4] = int(self.turn_count[game]).to_bytes(4, "little")
+        return state
+
+    def decode(self, game: int, fid: int, slot: int) -> Action:
+        """The Action record a (figure id, slot) pair stands for in one game."""
+        if slot == END_TURN_SLOT:
+            return Action(ActionType.END_TURN)
+        origin = square_position(int(self.square[game, fid]))
+        group = int(np.searchsorted(SLOT_STARTS, slot, side="right")) - 1
+        kind, offset = SLOT_KINDS[group], int(slot - SLOT_STARTS[group])
+        if kind == ActionType.CHARGE:
+            return Action(kind, origin, direction=CHARGE_NAMES[offset])
+        if kind == ActionType.LONG_EYE:
+            return Action(kind, origin, direction=LONG_EYE_NAMES[offset])
+        if kind == ActionType.PLAGUE:
+            return Action(kind, origin, square_position(offset // MAX_PLAGUE),
+                          value=offset % MAX_PLAGUE + 1)
+        if kind == ActionType.VAMPIRIC_PUSH:
+            return Action(kind, origin, square_position(offset // FIGURE_COUNT),
+                          value=offset % FIGURE_COUNT)
+        return Action(kind, origin, square_position(offset))
+
+    # Legal actions
+
+    def legal_mask(self, fid: int) -> np.ndarray:
+        """(games, ACTION_SLOTS) mask of what one figure id may do in every game."""
+        mask = np.zeros((self.size, ACTION_SLOTS), dtype=bool)
+        games, pieces = self.legal_pieces(fid)
+        for start, squares, outer, inner in pieces:
+            if inner is None:
+                rows, columns = np.nonzero(outer)
+                mask[games[rows], start + squares[rows, columns]] = True
+            else:
+                rows, columns, extra = np.nonzero(outer[:, :, None] & inner[:, None, :])
+                mask[games[rows], start + squares[rows, columns] * inner.shape[1] + extra] = True
+        return mask
+
+    def board_view(self):
+        """Bitboards of the occupied squares, the squares held by the side not to move, and the blockers.
+
+        legal_pieces() needs these for every figure, so callers asking
+        about several figures can work them out once and pass them in.
+        """
+        bits = np.where(self.square >= 0, SQUARE_BITS[np.maximum(self.square, 0)], np.uint64(0))
+        occupied = np.bitwise_or.reduce(bits, axis=1)
+        enemy = np.bitwise_or.reduce(np.where(self.owner != self.side[:, None], bits, np.uint64(0)), axis=1)
+        return occupied, enemy, occupied | TERRAIN_BITS
+
+    def legal_pieces(self, fid: int, view=None):
+        """What one figure id may do, as the games it is ready in and a list of slot pieces.
+
+        A piece (start, squares, outer, inner) holds one row per ready game.
+        Column i of outer stands for the square squares[:, i], and with
+        inner None it covers slot start + square. Plague and Vampiric Push
+        pair each square with an inner choice j, covering slot start +
+        square * width + j for inner's width. Rows only list the squares a
+        figure type could ever target from where it stands, so they stay
+        narrow. view is a board_view() result.
+        """
+        square = self.square[:, fid].astype(np.intp)
+        ready = ((square >= 0) & (self.owner[:, fid] == self.side) & ~self.game_over
+                 & (self.flags[:, fid] & ACTED == 0) & (self.contained[:, fid] == 0))
+        games = np.flatnonzero(ready)
+        if not len(games):
+            return games, []
+
+        occupied, enemy, blockers = self.board_view() if view is None else view
+        figure_type = fid // 2
+        square = square[games]
+        life = self.life[games, fid]
+        occupied = occupied[games, None]
+        enemy = enemy[games, None]
+        targets, bits, paths, movable, attackable, castable = (table[square] for table in TARGETS[figure_type])
+        taken = (bits & occupied) != 0
+        hostile = (bits & enemy) != 0
+        clear_line = (paths & blockers[games, None]) == 0
+        pieces = []
+
+        unmoved = (self.flags[games, fid] & MOVED) == 0
+        pieces.append((MOVE_SLOTS, targets, movable & clear_line & ~taken & unmoved[:, None], None))
+        pieces.append((ATTACK_SLOTS, targets, attackable & clear_line & hostile, None))
+
+        if figure_type == KNIGHT:
+            lanes = CHARGE_LANES[square]
+            landing = (lanes != 0) & ((lanes & occupied[:, :, None]) == 0)
+            pieces.append((CHARGE_SLOTS, DIRECTION_COLUMNS[:, :len(CHARGE_NAMES)].repeat(len(games), 0),
+                           _any_last(landing) & unmoved[:, None], None))
+        elif figure_type == ARBALIST:
+            # Long Eye hits an enemy with nothing in front of it
+            sighted = (((LONG_EYE_LINES[square] & enemy[:, :, None]) != 0)
+                       & ((LONG_EYE_BEFORE[square] & occupied[:, :, None]) == 0))
+            pieces.append((LONG_EYE_SLOTS, DIRECTION_COLUMNS.repeat(len(games), 0),
+                           _any_last(sighted), None))
+        elif figure_type == BLACK_MAGE:
+            player = self.owner[games, fid].astype(np.intp)
+            unused = ~self.bombs[games, player - 1]
+            pieces.append((BOMB_SLOTS, targets, castable & unused[:, None], None))
+            pieces.append((PLAGUE_SLOTS, targets, castable & hostile, PLAGUE_X < life[:, None]))
+            # One push per dead type, and only while the mage can pay its life
+            size = self.pool_size[games, player - 1]
+            longest = int(size.max())
+            kinds = self.pool[games, player - 1, :longest] // 2
+            listed = np.arange(longest) < size[:, None]
+            repeated = _any_last((kinds[:, :, None] == kinds[:, None, :]) & EARLIER[:longest, :longest]
+                                 & listed[:, None, :])
+            first_of_type = np.zeros((len(games), FIGURE_COUNT), dtype=bool)
+            first_of_type[:, :longest] = listed & ~repeated
+            free = ((START_BITS[player] & occupied) == 0) & (life > 1)[:, None]
+            pieces.append((PUSH_SLOTS, START_LISTS[player], free, first_of_type))
+        elif figure_type == WHITE_MAGE:
+            standing = self.board[games[:, None], targets].astype(np.intp)
+            weak = self.life[games[:, None], np.maximum(standing, 0)] <= 2
+            pieces.append((CONJURE_SLOTS, targets, castable & hostile & weak, None))
+            pieces.append((HEAL_SLOTS, targets, castable & taken, None))
+            pieces.append((CONTAIN_SLOTS, targets, castable & hostile, None))
+
+        return games, pieces
+
+    # Applying actions
+
+    def step(self, fids: np.ndarray, slots: np.ndarray):
+        """Apply one action per game; finished games are left alone.
+
+        Slots are trusted to come from legal_mask(), so nothing is
+        re-validated here.
+        """
+        live = ~self.game_over
+        end = live & (slots == END_TURN_SLOT)
+        acting = np.flatnonzero(live & (slots != END_TURN_SLOT))
+        if len(acting):
+            fids, slots = fids[acting].astype(np.intp), slots[acting]
+            group = np.searchsorted(SLOT_STARTS, slots, side="right") - 1
+            offsets = slots - SLOT_STARTS[group]
+            for index, kind in enumerate(SLOT_KINDS):
+                chosen = group == index
+                if chosen.any():
+                    getattr(self, _STEPS[kind])(acting[chosen], fids[chosen], offsets[chosen])
+        if end.any():
+            self._end_turn(np.flatnonzero(end))
+
+    def _move(self, games, fids, targets):
+        self._lift(games, fids)
+        self._put(games, fids, targets)
+        self.flags[games, fids] |= MOVED
+
+    def _attack(self, games, fids, targets):
+        victims = self.board[games, targets].astype(np.intp)
+        damage = ATTACK_OF[fids].copy()
+        occult = ((fids // 2 == BLACK_MAGE) | (fids // 2 == WHITE_MAGE)) & (victims // 2 == BARBARIAN)
+        damage[occult] += 1  # Barbarian fear of occult
+        self._damage(games, victims, damage)
+        self.flags[games, fids] |= ACTED
+
+    def _charge(self, games, fids, directions):
+        ray = CHARGE_RAYS[directions, self.square[games, fids]]
+        on_ray = ray >= 0
+        on_ray &= ~np.logical_or.accumulate(on_ray & TERRAIN_SQUARES[ray], axis=1)
+        standing = np.where(on_ray, self.board[games[:, None], np.maximum(ray, 0)], -1)
+        owners = self.owner[games[:, None], np.maximum(standing, 0)]
+        # The knight ends on the last free square and hits every enemy it passes
+        last_free = ray.shape[1] - 1 - np.argmax((on_ray & (standing < 0))[:, ::-1], axis=1)
+        final = ray[np.arange(len(games)), last_free]
+        victims = np.where((standing >= 0) & (owners != self.owner[games, fids][:, None]),
+                           standing, -1)
+        self._lift(games, fids)
+        self._put(games, fids, final)
+        for step in range(ray.shape[1]):
+            hit = victims[:, step] >= 0
+            self._damage(games[hit], victims[hit, step], 2)
+        self.flags[games, fids] |= MOVED | ACTED
+
+    def _long_eye(self, games, fids, directions):
+        ray = LONG_EYE_RAYS[directions, self.square[games, fids]]
+        standing = np.where(ray >= 0, self.board[games[:, None], np.maximum(ray, 0)], -1)
+        victims = standing[np.arange(len(games)), np.argmax(standing >= 0, axis=1)]
+        self._damage(games, victims, 1)
+        self.flags[games, fids] |= ACTED
+
+    def _magic_bomb(self, games, fids, centres):
+        blast = BLAST_ORDER[centres]
+        victims = np.where(blast >= 0, self.board[games[:, None], np.maximum(blast, 0)], -1)
+        players = self.owner[games, fids].astype(np.intp)
+        for step in range(blast.shape[1]):
+            hit = victims[:, step] >= 0
+            self._damage(games[hit], victims[hit, step], 2)
+        self.bombs[games, players - 1] = True
+        self.flags[games, fids] |= ACTED
+
+    def _plague(self, games, fids, offsets):
+        victims = self.board[games, offsets // MAX_PLAGUE].astype(np.intp)
+        x = offsets % MAX_PLAGUE + 1
+        self._damage(games, fids, x)
+        self._damage(games, victims, x + 1)
+        self.flags[games, fids] |= ACTED
+
+    def _vampiric_push(self, games, fids, offsets):
+        targets, index = offsets // FIGURE_COUNT, offsets % FIGURE_COUNT
+        p = self.owner[games, fids].astype(np.intp) - 1
+        raised = self.pool[games, p, index].astype(np.intp)
+        self._damage(games, fids, 1)
+        alive = (self.flags[games, fids] & DEAD) == 0  # a mage on 1 life dies casting
+        games, fids, targets, index, p, raised = (
+            games[alive], fids[alive], targets[alive], index[alive], p[alive], raised[alive])
+
+        # Close the gap the raised figure leaves in the pool
+        size = self.pool_size[games, p].astype(np.intp)
+        for i in range(FIGURE_COUNT - 1):
+            shift = (i >= index) & (i < size - 1)
+            self.pool[games[shift], p[shift], i] = self.pool[games[shift], p[shift], i + 1]
+        self.pool[games, p, size - 1] = 0
+        self.pool_size[games, p] -= 1
+
+        self.flags[games, raised] = 0
+        self.life[games, raised] = 2
+        self.contained[games, raised] = 0
+        self._put(games, raised, targets)
+        self.scores[games, 1 - p] -= 1
+        self.flags[games, fids] |= ACTED
+
+    def _conjure(self, games, fids, targets):
+        victims = self.board[games, targets].astype(np.intp)
+        self.owner[games, victims] = self.owner[games, fids]
+        self.flags[games, fids] |= ACTED
+
+    def _heal(self, games, fids, targets):
+        patients = self.board[games, targets].astype(np.intp)
+        self.life[games, patients] = np.minimum(self.life[games, patients] + 3,
+                                                MAX_LIFE_OF[patients])
+        self.flags[games, fids] |= ACTED
+
+    def _contain(self, games, fids, targets):
+        self.contained[games, self.board[games, targets].astype(np.intp)] = 2
+        self.flags[games, fids] |= ACTED
+
+    def _damage(self, games, fids, damage):
+        """Damage one figure per game, moving the ones that die to their owner's dead pool."""
+        living = (self.flags[games, fids] & DEAD) == 0
+        games, fids = games[living], fids[living]
+        damage = np.broadcast_to(damage, living.shape)[living]
+        life = np.maximum(self.life[games, fids] - damage, 0)
+        self.life[games, fids] = life
+
+        dying = life == 0
+        games, fids = games[dying], fids[dying]
+        self.flags[games, fids] = DEAD
+        self.contained[games, fids] = 0
+        self._lift(games, fids)
+        p = self.owner[games, fids].astype(np.intp) - 1
+        self.pool[games, p, self.pool_size[games, p]] = fids
+        self.pool_size[games, p] += 1
+        self.scores[games, 1 - p] += 1
+
+    def _end_turn(self, games):
+        on_board = self.square[games] >= 0
+        own = on_board & (self.owner[games] == self.side[games][:, None])
+        self.flags[games] = np.where(own, 0, self.flags[games])
+        self.contained[games] -= (on_board & (self.contained[games] > 0)).astype(np.int8)
+        self.side[games] = 3 - self.side[games]
+        self.turn_count[games] += 1
+
+        # Four points wins, checked for player one first; otherwise a side with no figures loses
+        on_board = self.square[games] >= 0
+        one_left = (on_board & (self.owner[games] == Player.ONE.value)).any(axis=1)
+        two_left = (on_board & (self.owner[games] == Player.TWO.value)).any(axis=1)
+        winner = np.select(
+            [self.scores[games, 0] >= 4, self.scores[games, 1] >= 4, ~one_left, ~two_left],
+            [Player.ONE.value, Player.TWO.value, Player.TWO.value, Player.ONE.value], 0)
+        self.winner[games] = winner
+        self.game_over[games] = winner > 0
+
+    def _put(self, games, fids, squares):
+        self.board[games, squares] = fids
+        self.square[games, fids] = squares
+
+    def _lift(self, games, fids):
+        self.board[games, self.square[games, fids].astype(np.intp)] = -1
+        self.square[games, fids] = -1
+
+    # Playing whole batches
+
+    def random_step(self, rng: np.random.Generator):
+        """Advance every game by one action of the random playout policy.
+
+        Like mcts.random_policy, a uniformly random figure among those with
+        legal actions takes a uniformly random one of them, and the turn
+        ends once no figure can act. The action is drawn from the pieces of
+        legal_pieces(): a piece in proportion to how many actions it holds,
+        then a column and an inner choice as the highest of masked random
+        priorities, so no full-width row of slots is ever built.
+        """
+        view = self.board_view()
+        counts = np.zeros((self.size, FIGURE_COUNT), dtype=np.intp)
+        found = []
+        for fid in range(FIGURE_COUNT):
+            games, pieces = self.legal_pieces(fid, view)
+            sizes = np.array([_count_last(outer) * (1 if inner is None else _count_last(inner))
+                              for _, _, outer, inner in pieces], dtype=np.intp).reshape(len(pieces), len(games))
+            counts[games, fid] = sizes.sum(axis=0)
+            found.append((games, pieces, sizes))
+
+        priority = np.where(counts > 0, rng.random(counts.shape), -1.0)
+        chosen_fid = priority.argmax(axis=1)
+        chosen_fid[priority.max(axis=1) < 0] = -1
+        slots = np.full(self.size, END_TURN_SLOT, dtype=np.intp)
+        for fid, (games, pieces, sizes) in enumerate(found):
+            picked = np.flatnonzero(chosen_fid[games] == fid)
+            if not len(picked):
+                continue
+            totals = np.cumsum(sizes[:, picked], axis=0)
+            pick = (rng.random(len(picked)) * totals[-1]).astype(np.intp)
+            piece_of = np.argmax(totals > pick, axis=0)
+            for index, (start, squares, outer, inner) in enumerate(pieces):
+                rows = picked[piece_of == index]
+                if not len(rows):
+                    continue
+                slot = squares[rows, _random_true(outer[rows], rng)]
+                if inner is not None:
+                    slot = slot * inner.shape[1] + _random_true(inner[rows], rng)
+                slots[games[rows]] = start + slot
+        self.step(np.maximum(chosen_fid, 0), slots)
+        return chosen_fid, slots
+
+    def play_random(self, rng: np.random.Generator, max_turns: Optional[int] = 200) -> np.ndarray:
+        """Play every game out with the random policy and return the winners (0 if unfinished)."""
+        while True:
+            running = ~self.game_over
+            if max_turns is not None:
+                running &= self.turn_count < max_turns
+            if not running.any():
+                return self.winner.copy()
+            if max_turns is not None:
+                # Freeze games that hit the turn limit so the rest can finish
+                frozen = ~self.game_over & ~running
+                self.game_over[frozen] = True
+                self.random_step(rng)
+                self.game_over[frozen] = False
+            else:
+                self.random_step(rng)
+
+def _any_last(mask: np.ndarray) -> np.ndarray:
+    """mask.any(axis=-1), as a chain of ORs, which is much quicker for short rows."""
+    result = np.zeros(mask.shape[:-1], dtype=bool)
+    for column in range(mask.shape[-1]):
+        result |= mask[..., column]
+    return result
+
+def _count_last(mask: np.ndarray) -> np.ndarray:
+    """Set entries per row of a 2-D mask; a matrix product beats count_nonzero on short rows."""
+    return (mask @ np.ones(mask.shape[1])).astype(np.intp)
+
+def _random_true(mask: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Column of a uniformly random set entry in each row, as the highest of masked random priorities."""
+    return np.where(mask, rng.random(mask.shape), -1.0).argmax(axis=1)
+
+_STEPS = {
+    ActionType.MOVE: "_move",
+    ActionType.ATTACK: "_attack",
+    ActionType.CHARGE: "_charge",
+    ActionType.LONG_EYE: "_long_eye",
+    ActionType.MAGIC_BOMB: "_magic_bomb",
+    ActionType.PLAGUE: "_plague",
+    ActionType.VAMPIRIC_PUSH: "_vampiric_push",
+    ActionType.CONJURE: "_conjure",
+    ActionType.HEAL: "_heal",
+    ActionType.CONTAIN: "_contain",
+}
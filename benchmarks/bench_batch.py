@@ -0,0 +1,41 @@
+import copy
+
+import numpy as np
+
+from batch import BatchGames
+
+class BatchStep:
+    """One random_step() of a batch twenty actions into its games.
+
+    The subclasses differ only in batch size; dividing the size by the
+    time per call gives plies per second, which should grow with it.
+    """
+    games = 0
+
+    def setup(self):
+        self.rng = np.random.default_rng(0)
+        self.batch = BatchGames.random_setup(self.games, self.rng)
+        for _ in range(20):
+            self.batch.random_step(self.rng)
+
+    def step(self):
+        # Stepping a copy keeps every call on the same positions
+        copy.deepcopy(self.batch).random_step(self.rng)
+
+class BatchStep200(BatchStep):
+    games = 200
+
+    def time_random_step(self):
+        self.step()
+
+class BatchStep2000(BatchStep):
+    games = 2000
+
+    def time_random_step(self):
+        self.step()
+
+class BatchStep10000(BatchStep):
+    games = 10000
+
+    def time_random_step(self):
+        self.step()
@@ -0,0 +1,141 @@
+import random
+
+from benchmarks.common import NOOP, melee_state, scratch
+from main import Game, Player
+from selfplay import RandomPlayer
+
+class Actions:
+    """Each action method called directly on the MELEE position.
+
+    Calls run between scratch() and undo() so every repeat starts from the
+    same position; time_noop_apply_undo measures that wrapper on its own,
+    and run.py subtracts it from the others.
+    """
+    overhead = "time_noop_apply_undo"
+
+    def setup(self):
+        self.state = state = melee_state()
+        self.knight = state.get_figure_at((3, 3))
+        self.arbalist = state.get_figure_at((2, 1))
+        self.black_mage = state.get_figure_at((2, 4))
+        self.white_mage = state.get_figure_at((3, 5))
+        self.enemy_knight = state.get_figure_at((4, 3))
+        self.enemy_barbarian = state.get_figure_at((4, 4))
+        self.dead = state.dead_figures[Player.ONE][0]
+
+    def time_noop_apply_undo(self):
+        self.state.apply(NOOP)
+        self.state.undo()
+
+    def time_move_figure(self):
+        scratch(self.state)
+        self.state.move_figure(self.arbalist, (1, 2))
+        self.state.undo()
+
+    def time_attack(self):
+        scratch(self.state)
+        self.state.attack(self.knight, (4, 3))
+        self.state.undo()
+
+    def time_knight_charge(self):
+        scratch(self.state)
+        self.state.knight_charge(self.knight, "down")
+        self.state.undo()
+
+    def time_arbalist_long_eye(self):
+        scratch(self.state)
+        self.state.arbalist_long_eye(self.arbalist, "down")
+        self.state.undo()
+
+    def time_black_mage_magic_bomb(self):
+        scratch(self.state)
+        self.state.black_mage_magic_bomb(self.black_mage, (4, 4))
+        self.state.undo()
+
+    def time_black_mage_plague(self):
+        scratch(self.state)
+        self.state.black_mage_plague(self.black_mage, self.enemy_barbarian, 1)
+        self.state.undo()
+
+    def time_black_mage_vampiric_push(self):
+        scratch(self.state)
+        self.state.black_mage_vampiric_push(self.black_mage, self.dead, (1, 0))
+        self.state.undo()
+
+    def time_white_mage_conjure(self):
+        scratch(self.state)
+        self.state.white_mage_conjure(self.white_mage, self.enemy_barbarian)
+        self.state.undo()
+
+    def time_white_mage_heal(self):
+        scratch(self.state)
+        self.state.white_mage_heal(self.white_mage, self.knight)
+        self.state.undo()
+
+    def time_white_mage_counter_containment(self):
+        scratch(self.state)
+        self.state.white_mage_counter_containment(self.white_mage, self.enemy_barbarian)
+        self.state.undo()
+
+    def time_deal_damage(self):
+        scratch(self.state)
+        self.state._deal_damage(self.enemy_knight, 1)
+        self.state.undo()
+
+    def time_deal_damage_lethal(self):
+        scratch(self.state)
+        self.state._deal_damage(self.enemy_barbarian, 2)
+        self.state.undo()
+
+    def time_end_turn(self):
+        scratch(self.state)
+        self.state.end_turn()
+        self.state.undo()
+
+    def time_threat_map_move_and_back(self):
+        scratch(self.state)
+        self.state.move_figure(self.arbalist, (1, 2))
+        self.state.threat_map(Player.TWO)
+        self.state.undo()
+        self.state.threat_map(Player.TWO)
+
+class Queries:
+    """Read-only GameState calls on the MELEE position."""
+
+    def setup(self):
+        self.state = melee_state()
+        self.black_mage = self.state.get_figure_at((2, 4))
+
+    def time_is_path_clear_straight(self):
+        self.state._is_path_clear((3, 3), (0, 3))
+
+    def time_is_path_clear_diagonal(self):
+        self.state._is_path_clear((2, 1), (5, 4), diagonal=True)
+
+    def time_check_win_conditions(self):
+        self.state._check_win_conditions()
+
+    def time_legal_actions(self):
+        self.state.legal_actions(Player.ONE)
+
+    def time_figure_actions_black_mage(self):
+        self.state.figure_actions(self.black_mage)
+
+    def time_to_bytes(self):
+        self.state.to_bytes()
+
+    def time_threat_map(self):
+        # Forget the maps first, or every call after the first returns them unchanged
+        state = self.state
+        state.threat_maps = {Player.ONE: [0] * 64, Player.TWO: [0] * 64}
+        state.threat_cache = {}
+        state.threat_board = None
+        state.threat_map(Player.TWO)
+
+class FullGame:
+    """A whole game between random players, from placement to the end."""
+    threshold = 1.5  # whole games vary more from run to run
+
+    def time_random_game(self):
+        game = Game({Player.ONE: RandomPlayer(1), Player.TWO: RandomPlayer(2)})
+        game.play_headless(random.Random(0), max_turns=200)
@@ -0,0 +1,40 @@
+from main import Action, ActionType, Figure, FigureType, GameState, Player
+
+# A mid-game position with every kind of action on offer to Player 1, who is
+# to move. Player 1's Barbarian is in the dead pool, and Player 2's Barbarian
+# is down to 2 life so Conjure and lethal damage have a target.
+MELEE = [
+    (FigureType.KNIGHT, Player.ONE, (3, 3), 5),
+    (FigureType.ARBALIST, Player.ONE, (2, 1), 5),
+    (FigureType.BLACK_MAGE, Player.ONE, (2, 4), 7),
+    (FigureType.WHITE_MAGE, Player.ONE, (3, 5), 4),
+    (FigureType.KNIGHT, Player.TWO, (4, 3), 7),
+    (FigureType.BARBARIAN, Player.TWO, (4, 4), 2),
+    (FigureType.ARBALIST, Player.TWO, (5, 1), 5),
+    (FigureType.BLACK_MAGE, Player.TWO, (5, 4), 7),
+    (FigureType.WHITE_MAGE, Player.TWO, (6, 6), 4),
+]
+
+# Fails at once, since nothing stands on its origin, but still opens an undo record
+NOOP = Action(ActionType.MOVE, (7, 0), (7, 1))
+
+def melee_state() -> GameState:
+    """Build the MELEE position."""
+    state = GameState()
+    for figure_type, player, pos, life in MELEE:
+        figure = Figure(figure_type, player)
+        figure.life = life
+        state._put(figure, pos)
+        state.figures.append(figure)
+        state.live_counts[player] += 1
+    dead = Figure(FigureType.BARBARIAN, Player.ONE)
+    dead.life = 0
+    dead.is_dead = True
+    state.dead_figures[Player.ONE].append(dead)
+    state.scores[Player.TWO] = 1
+    state.hash = state.compute_hash()
+    return state
+
+def scratch(state: GameState):
+    """Open an undo record the way apply() does, so that direct method calls can be undone."""
+    state.apply(NOOP)
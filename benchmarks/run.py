@@ -0,0 +1,116 @@
+import argparse
+import importlib
+import json
+import os
+import pkgutil
+import platform
+import sys
+import timeit
+from typing import Callable, Dict, List, Optional, Tuple
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+# Timings only compare on the machine that recorded them, so each machine
+# keeps its own baseline, untracked by git. A fresh checkout has none, and
+# the first run on a machine records it instead of comparing.
+BASELINE = os.path.join(BENCHMARK_DIR, f"baseline-{platform.node() or 'local'}.json")
+DEFAULT_THRESHOLD = 1.3  # slower than baseline by more than this factor is a regression
+
+def discover(pattern: str = "",
+             default_threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, Callable, float, Optional[Callable]]]:
+    """Find time_* methods on classes in bench_* modules, asv style.
+
+    Returns (name, bound method, threshold, overhead) tuples, running each
+    class's setup() once first. A class's overhead attribute names the
+    method timing the harness its other methods run in, if any.
+    """
+    found = []
+    for module_info in pkgutil.iter_modules([BENCHMARK_DIR]):
+        if not module_info.name.startswith("bench_"):
+            continue
+        module = importlib.import_module(f"benchmarks.{module_info.name}")
+        for class_name, cls in sorted(vars(module).items()):
+            if not isinstance(cls, type) or cls.__module__ != module.__name__:
+                continue
+            names = [f"{module_info.name}.{class_name}.{attr}" for attr in sorted(vars(cls))
+                     if attr.startswith("time_")]
+            names = [name for name in names if pattern in name]
+            if not names:
+                continue
+            instance = cls()
+            if hasattr(instance, "setup"):
+                instance.setup()
+            threshold = getattr(cls, "threshold", default_threshold)
+            overhead = getattr(cls, "overhead", None)
+            for name in names:
+                attr = name.rsplit(".", 1)[1]
+                harness = getattr(instance, overhead) if overhead not in (None, attr) else None
+                found.append((name, getattr(instance, attr), threshold, harness))
+    return found
+
+def measure(func: Callable, repeat: int = 5) -> float:
+    """Best seconds per call over several repeats of at least 0.2 s each."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+def main():
+    """Command line entry point for the micro-benchmarks."""
+    parser = argparse.ArgumentParser(
+        description="Time GameState hot paths against a saved baseline",
+        epilog="Baselines are per machine and not checked in, so the first run on a machine "
+               "has nothing to compare against and saves its timings as the baseline. "
+               "Later runs compare against it; --save replaces it.")
+    parser.add_argument("pattern", nargs="?", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="baseline file (default: benchmarks/baseline-<host>.json, one per machine)")
+    parser.add_argument("--save", action="store_true", help="record these timings as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"slowdown factor counted as a regression (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--repeat", type=int, default=5, help="repeats per benchmark, the best is kept")
+    args = parser.parse_args()
+
+    baseline: Dict[str, float] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+    else:
+        print(f"No baseline at {args.baseline} yet: writing these timings as a new baseline, "
+              "not comparing against one")
+        args.save = True
+
+    results = {}
+    overheads: Dict[Callable, float] = {}
+    regressions = 0
+    for name, func, threshold, harness in discover(args.pattern, args.threshold):
+        # Report the method's own cost, net of the harness it runs in
+        overhead = 0.0
+        if harness is not None:
+            if harness not in overheads:
+                overheads[harness] = measure(harness, args.repeat)
+            overhead = overheads[harness]
+        seconds = max(measure(func, args.repeat) - overhead, 1e-9)
+        results[name] = seconds
+        line = f"{name:<55} {seconds * 1e6:10.2f} us {1 / seconds:12,.0f} ops/s"
+        if name in baseline:
+            ratio = seconds / baseline[name]
+            line += f"  {ratio:5.2f}x baseline"
+            if ratio > threshold:
+                line += f"  REGRESSION (limit {threshold:.2f}x)"
+                regressions += 1
+        print(line, flush=True)
+
+    if args.save:
+        saved = {name: seconds for name, seconds in baseline.items() if name not in results}
+        saved.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "host": platform.node(),
+                       "results": dict(sorted(saved.items()))}, file, indent=2)
+            file.write("\n")
+        print(f"Saved {len(results)} timings to {args.baseline}")
+
+    sys.exit(1 if regressions and not args.save else 0)
+
+
+if __name__ == "__main__":
+    main()
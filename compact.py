@@ -0,0 +1,699 @@
+from typing import List, Optional, Tuple
+
+from main import (Action, ActionType, CHARGE_DIRECTIONS, CHEBYSHEV_MASKS, BLAST_MASKS,
+                  FIGURE_STATS, Figure, FigureType, GameState, LONG_EYE_DIRECTIONS,
+                  MANHATTAN_MASKS, PATH_MASKS, Player, RAYS, START_ZONES, TERRAIN,
+                  iter_squares, square_index, square_position)
+
+# Figure ids are 2 * type index + copy, so the type is implied by the id
+FIGURE_TYPES = list(FigureType)
+FIGURE_COUNT = 2 * len(FIGURE_TYPES)
+TYPE_OF = [FIGURE_TYPES[fid // 2] for fid in range(FIGURE_COUNT)]
+MAX_LIFE = [FIGURE_STATS[figure_type][0] for figure_type in TYPE_OF]
+MOVE = [FIGURE_STATS[figure_type][1] for figure_type in TYPE_OF]
+ATTACK = [FIGURE_STATS[figure_type][2] for figure_type in TYPE_OF]
+REACH = [FIGURE_STATS[figure_type][3] for figure_type in TYPE_OF]
+
+# Layout of the state buffer
+BOARD = 0           # 64 squares, 0 when empty, otherwise figure id + 1
+OWNER = 64          # per figure: Player value, 0 while the figure is not in the game
+SQUARE = 74         # per figure: square, NO_SQUARE when off the board
+LIFE = 84           # per figure
+FLAGS = 94          # per figure: MOVED | ACTED | DEAD
+CONTAINED = 104     # per figure: counter containment turns left
+POOLS = {Player.ONE: 114, Player.TWO: 125}  # dead pool length, then figure ids in death order
+SIDE = 136          # Player value to move
+SCORES = {Player.ONE: 137, Player.TWO: 138}
+BOMBS = 139         # bit per player, set once their Magic Bomb is spent
+GAME_OVER = 140
+WINNER = 141        # Player value, 0 while undecided
+TURN = 142          # 4-byte little-endian turn count
+STATE_BYTES = 146
+
+NO_SQUARE = 0xFF
+MOVED = 1
+ACTED = 2
+DEAD = 4
+
+def opponent_of(player: Player) -> Player:
+    """The other player."""
+    return Player.TWO if player == Player.ONE else Player.ONE
+
+class CompactState:
+    """Struct-of-arrays game state held in one flat buffer.
+
+    Every figure is a fixed column entry indexed by its id, and the board
+    stores ids rather than Figure references, so cloning is a single buffer
+    copy and key() is a hashable snapshot. The buffer may be any writable
+    bytes-like object, such as a multiprocessing.shared_memory block, which
+    lets processes share a position without pickling it.
+
+    The rules match GameState action for action; from_state() and
+    to_state() convert between the two.
+    """
+    __slots__ = ("buf",)
+
+    def __init__(self, buf=None):
+        if buf is None:
+            buf = bytearray(STATE_BYTES)
+            buf[SQUARE:SQUARE + FIGURE_COUNT] = bytes([NO_SQUARE]) * FIGURE_COUNT
+            buf[SIDE] = Player.ONE.value
+        elif len(buf) < STATE_BYTES:
+            raise ValueError(f"State buffer needs {STATE_BYTES} bytes, got {len(buf)}")
+        self.buf = buf
+
+    def clone(self) -> "CompactState":
+        """Independent copy of this state."""
+        return CompactState(bytearray(self.buf[:STATE_BYTES]))
+
+    def key(self) -> bytes:
+        """Immutable snapshot of the whole state, usable as a dict key."""
+        return bytes(self.buf[:STATE_BYTES])
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactState):
+            return NotImplemented
+        return self.key() == other.key()
+
+    __hash__ = None  # mutable; hash key() instead
+
+    @property
+    def current_player(self) -> Player:
+        return Player(self.buf[SIDE])
+
+    @property
+    def turn_count(self) -> int:
+        return int.from_bytes(self.buf[TURN:TURN + 4], "little")
+
+    @property
+    def game_over(self) -> bool:
+        return bool(self.buf[GAME_OVER])
+
+    @property
+    def winner(self) -> Optional[Player]:
+        return Player(self.buf[WINNER]) if self.buf[WINNER] else None
+
+    def score(self, player: Player) -> int:
+        return self.buf[SCORES[player]]
+
+    def magic_bomb_used(self, player: Player) -> bool:
+        return bool(self.buf[BOMBS] >> (player.value - 1) & 1)
+
+    def dead_pool(self, player: Player) -> List[int]:
+        """Ids in a player's dead pool, in the order they died."""
+        start = POOLS[player]
+        return list(self.buf[start + 1:start + 1 + self.buf[start]])
+
+    def figure_at(self, pos: Tuple[int, int]) -> Optional[int]:
+        """Id of the figure on a position, or None."""
+        row, col = pos
+        if not (0 <= row < 8 and 0 <= col < 8):
+            return None
+        return self.buf[BOARD + row * 8 + col] - 1 if self.buf[BOARD + row * 8 + col] else None
+
+    def position(self, fid: int) -> Optional[Tuple[int, int]]:
+        """Position of a figure, or None when it is off the board."""
+        square = self.buf[SQUARE + fid]
+        return None if square == NO_SQUARE else square_position(square)
+
+    def figures(self, player: Optional[Player] = None) -> List[int]:
+        """Ids of the figures on the board, optionally only one player's."""
+        buf = self.buf
+        return [fid for fid in range(FIGURE_COUNT)
+                if buf[SQUARE + fid] != NO_SQUARE
+                and (player is None or buf[OWNER + fid] == player.value)]
+
+    def occupied(self, player: Player) -> int:
+        """Bitboard of a player's figures."""
+        buf = self.buf
+        mask = 0
+        for fid in range(FIGURE_COUNT):
+            if buf[OWNER + fid] == player.value and buf[SQUARE + fid] != NO_SQUARE:
+                mask |= 1 << buf[SQUARE + fid]
+        return mask
+
+    def occupancy(self) -> int:
+        """Bitboard of every occupied square."""
+        buf = self.buf
+        mask = 0
+        for fid in range(FIGURE_COUNT):
+            if buf[SQUARE + fid] != NO_SQUARE:
+                mask |= 1 << buf[SQUARE + fid]
+        return mask
+
+    def place(self, figure_type: FigureType, player: Player, pos: Tuple[int, int]) -> Optional[int]:
+        """Place a new figure in its owner's start zone during setup, returning its id."""
+        row, col = pos
+        if not (0 <= row < 8 and 0 <= col < 8):
+            return None
+        square = row * 8 + col
+        buf = self.buf
+        if buf[BOARD + square] or not START_ZONES[player] >> square & 1:
+            return None
+        base = 2 * FIGURE_TYPES.index(figure_type)
+        for fid in (base, base + 1):
+            if not buf[OWNER + fid]:
+                buf[OWNER + fid] = player.value
+                buf[LIFE + fid] = MAX_LIFE[fid]
+                self._put(fid, square)
+                return fid
+        return None  # both copies of this type are already in play
+
+    @classmethod
+    def from_state(cls, state: GameState) -> "CompactState":
+        """Convert a GameState, numbering the copies of each type as they are met."""
+        compact = cls()
+        buf = compact.buf
+        copies = {figure_type: 0 for figure_type in FIGURE_TYPES}
+
+        def assign(figure: Figure) -> int:
+            if copies[figure.type] >= 2:
+                raise ValueError(f"More than two {figure.type.value} figures")
+            fid = 2 * FIGURE_TYPES.index(figure.type) + copies[figure.type]
+            copies[figure.type] += 1
+            buf[OWNER + fid] = figure.player.value
+            buf[LIFE + fid] = figure.life
+            buf[FLAGS + fid] = ((MOVED if figure.has_moved else 0)
+                                | (ACTED if figure.has_acted else 0)
+                                | (DEAD if figure.is_dead else 0))
+            buf[CONTAINED + fid] = figure.counter_containment_turns
+            return fid
+
+        for figure in state.figures:
+            compact._put(assign(figure), square_index(figure.position))
+        for player in Player:
+            for figure in state.dead_figures[player]:
+                compact._pool_append(player, assign(figure))
+            buf[SCORES[player]] = state.scores[player]
+            if state.magic_bomb_used[player]:
+                buf[BOMBS] |= 1 << (player.value - 1)
+        buf[SIDE] = state.current_player.value
+        buf[GAME_OVER] = state.game_over
+        buf[WINNER] = state.winner.value if state.winner else 0
+        buf[TURN:TURN + 4] = state.turn_count.to_bytes(4, "little")
+        return compact
+
+    def to_state(self) -> GameState:
+        """Build the equivalent GameState."""
+        buf = self.buf
+        state = GameState()
+        made = {}
+        for fid in range(FIGURE_COUNT):
+            if not buf[OWNER + fid]:
+                continue
+            figure = Figure(TYPE_OF[fid], Player(buf[OWNER + fid]))
+            figure.life = buf[LIFE + fid]
+            figure.has_moved = bool(buf[FLAGS + fid] & MOVED)
+            figure.has_acted = bool(buf[FLAGS + fid] & ACTED)
+            figure.is_dead = bool(buf[FLAGS + fid] & DEAD)
+            figure.counter_containment_turns = buf[CONTAINED + fid]
+            made[fid] = figure
+
+        # GameState keeps figures in placement order; board order is the closest stand-in
+        for square in range(64):
+            if buf[BOARD + square]:
+                figure = made[buf[BOARD + square] - 1]
+                state._put(figure, square_position(square))
+                state.figures.append(figure)
+                state.live_counts[figure.player] += 1
+        for player in Player:
+            for fid in self.dead_pool(player):
+                state.dead_figures[player].append(made[fid])
+            state.scores[player] = buf[SCORES[player]]
+            state.magic_bomb_used[player] = self.magic_bomb_used(player)
+        state.current_player = self.current_player
+        state.turn_count = self.turn_count
+        state.game_over = self.game_over
+        state.winner = self.winner
+        state.hash = state.compute_hash()
+        return state
+
+    # Board and pool bookkeeping
+
+    def _put(self, fid: int, square: int):
+        self.buf[BOARD + square] = fid + 1
+        self.buf[SQUARE + fid] = square
+
+    def _lift(self, fid: int):
+        self.buf[BOARD + self.buf[SQUARE + fid]] = 0
+        self.buf[SQUARE + fid] = NO_SQUARE
+
+    def _pool_append(self, player: Player, fid: int):
+        start = POOLS[player]
+        self.buf[start + 1 + self.buf[start]] = fid
+        self.buf[start] += 1
+
+    def _pool_remove(self, player: Player, fid: int):
+        start = POOLS[player]
+        count = self.buf[start]
+        pool = bytes(self.buf[start + 1:start + 1 + count])
+        i = pool.index(fid)
+        self.buf[start + 1 + i:start + count] = pool[i + 1:]
+        self.buf[start + count] = 0  # keep key() canonical
+        self.buf[start] = count - 1
+
+    def _ready(self, fid: int) -> Optional[str]:
+        """Why a caster cannot act, or None when it can."""
+        if self.buf[FLAGS + fid] & ACTED:
+            return "Already acted"
+        if self.buf[CONTAINED + fid]:
+            return "Mage is contained"
+        return None
+
+    def _blockers(self) -> int:
+        return self.occupancy() | TERRAIN
+
+    # Actions, mirroring the GameState methods
+
+    def move_figure(self, fid: int, pos: Tuple[int, int]):
+        """Move a figure to a new position."""
+        buf = self.buf
+        if buf[FLAGS + fid] & (MOVED | ACTED):
+            return False, "Figure has already moved or acted this turn"
+        if buf[CONTAINED + fid]:
+            return False, "Figure is contained and cannot move"
+        row, col = pos
+        if not (0 <= row < 8 and 0 <= col < 8):
+            return False, "Position is off the board"
+        square = row * 8 + col
+        if TERRAIN >> square & 1:
+            return False, "Cannot move to terrain"
+        if buf[BOARD + square]:
+            return False, "Position is occupied"
+        origin = buf[SQUARE + fid]
+        diagonal = TYPE_OF[fid] == FigureType.ARBALIST
+        if not (CHEBYSHEV_MASKS if diagonal else MANHATTAN_MASKS)[MOVE[fid]][origin] >> square & 1:
+            return False, "Move is out of range"
+        path = PATH_MASKS[diagonal][origin * 64 + square]
+        if path is None or path & self._blockers():
+            return False, "Path is blocked"
+
+        self._lift(fid)
+        self._put(fid, square)
+        buf[FLAGS + fid] |= MOVED
+        return True, "Move successful"
+
+    def knight_charge(self, fid: int, direction: str):
+        """Perform knight charge special action."""
+        buf = self.buf
+        if TYPE_OF[fid] != FigureType.KNIGHT:
+            return False, "Only knights can charge"
+        if buf[FLAGS + fid] & (MOVED | ACTED):
+            return False, "Cannot charge after moving or acting"
+        if buf[CONTAINED + fid]:
+            return False, "Knight is contained"
+        if direction not in CHARGE_DIRECTIONS:
+            return False, "Invalid direction"
+
+        owner = buf[OWNER + fid]
+        damaged = []
+        final = None
+        for square in RAYS[direction][buf[SQUARE + fid]][:4]:
+            if TERRAIN >> square & 1:
+                break
+            target = buf[BOARD + square] - 1
+            if target < 0:
+                final = square
+            elif buf[OWNER + target] != owner:
+                damaged.append(target)
+        if final is None:
+            return False, "No valid charge destination"
+
+        self._lift(fid)
+        self._put(fid, final)
+        for target in damaged:
+            self._deal_damage(target, 2)
+        buf[FLAGS + fid] |= MOVED | ACTED
+        return True, f"Charge successful, damaged {len(damaged)} figures"
+
+    def attack(self, fid: int, pos: Tuple[int, int]):
+        """Perform a basic attack."""
+        buf = self.buf
+        if buf[FLAGS + fid] & ACTED:
+            return False, "Figure has already acted"
+        if buf[CONTAINED + fid]:
+            return False, "Figure is contained and cannot attack"
+        target = self.figure_at(pos)
+        if target is None:
+            return False, "No target at position"
+        if buf[OWNER + target] == buf[OWNER + fid]:
+            return False, "Cannot attack friendly figures"
+        origin, square = buf[SQUARE + fid], buf[SQUARE + target]
+        diagonal = TYPE_OF[fid] == FigureType.ARBALIST
+        if not (CHEBYSHEV_MASKS if diagonal else MANHATTAN_MASKS)[REACH[fid]][origin] >> square & 1:
+            return False, "Target out of reach"
+        path = PATH_MASKS[diagonal][origin * 64 + square]
+        if path is None or path & self._blockers():
+            return False, "No line of sight"
+
+        damage = ATTACK[fid]
+        if (TYPE_OF[fid] in (FigureType.BLACK_MAGE, FigureType.WHITE_MAGE)
+                and TYPE_OF[target] == FigureType.BARBARIAN):
+            damage += 1  # Barbarian fear of occult
+        self._deal_damage(target, damage)
+        buf[FLAGS + fid] |= ACTED
+        return True, f"Attack successful, dealt {damage} damage"
+
+    def arbalist_long_eye(self, fid: int, direction: str):
+        """Arbalist's Long Eye special action."""
+        buf = self.buf
+        if TYPE_OF[fid] != FigureType.ARBALIST:
+            return False, "Only Arbalist can use Long Eye"
+        if buf[FLAGS + fid] & ACTED:
+            return False, "Already acted this turn"
+        if buf[CONTAINED + fid]:
+            return False, "Arbalist is contained"
+        if direction not in LONG_EYE_DIRECTIONS:
+            return False, "Invalid direction"
+        target = self._long_eye_target(fid, direction)
+        if target is None:
+            return False, "No target in line"
+        self._deal_damage(target, 1)
+        buf[FLAGS + fid] |= ACTED
+        return True, "Long Eye hit target"
+
+    def black_mage_magic_bomb(self, fid: int, pos: Tuple[int, int]):
+        """Black Mage's Magic Bomb spell."""
+        buf = self.buf
+        if TYPE_OF[fid] != FigureType.BLACK_MAGE:
+            return False, "Only Black Mage can use Magic Bomb"
+        reason = self._ready(fid)
+        if reason:
+            return False, reason
+        player = Player(buf[OWNER + fid])
+        if self.magic_bomb_used(player):
+            return False, "Magic Bomb already used this game"
+        row, col = pos
+        if not (0 <= row < 8 and 0 <= col < 8):
+            return False, "Target is off the board"
+        center = row * 8 + col
+        if not MANHATTAN_MASKS[REACH[fid]][buf[SQUARE + fid]] >> center & 1:
+            return False, "Target out of reach"
+
+        # Figures in the 3x3 blast, centre first
+        hit = BLAST_MASKS[center] & self.occupancy()
+        squares = list(iter_squares(hit & ~(1 << center)))
+        if hit >> center & 1:
+            squares.insert(0, center)
+        damaged = [buf[BOARD + square] - 1 for square in squares]
+        for target in damaged:
+            self._deal_damage(target, 2)
+
+        buf[BOMBS] |= 1 << (player.value - 1)
+        buf[FLAGS + fid] |= ACTED
+        return True, f"Magic Bomb damaged {len(damaged)} figures"
+
+    def black_mage_plague(self, fid: int, target: int, x: int):
+        """Black Mage's Plague spell."""
+        buf = self.buf
+        if TYPE_OF[fid] != FigureType.BLACK_MAGE:
+            return False, "Only Black Mage can use Plague"
+        reason = self._ready(fid)
+        if reason:
+            return False, reason
+        if x < 1 or x >= buf[LIFE + fid]:
+            return False, "Invalid X value"
+        if buf[OWNER + target] == buf[OWNER + fid]:
+            return False, "Cannot plague friendly figures"
+        if not MANHATTAN_MASKS[REACH[fid]][buf[SQUARE + fid]] >> buf[SQUARE + target] & 1:
+            return False, "Target out of reach"
+
+        self._deal_damage(fid, x)
+        self._deal_damage(target, x + 1)
+        buf[FLAGS + fid] |= ACTED
+        return True, f"Plague cast: Mage lost {x} life, target lost {x+1} life"
+
+    def black_mage_vampiric_push(self, fid: int, dead: int, pos: Tuple[int, int]):
+        """Black Mage's Vampiric Push spell."""
+        buf = self.buf
+        if TYPE_OF[fid] != FigureType.BLACK_MAGE:
+            return False, "Only Black Mage can use Vampiric Push"
+        reason = self._ready(fid)
+        if reason:
+            return False, reason
+        player = Player(buf[OWNER + fid])
+        # A dead figure sits in the pool of the player who owned it when it died
+        if not (buf[FLAGS + dead] & DEAD and buf[OWNER + dead] == player.value):
+            return False, "Figure not in your dead pool"
+        row, col = pos
+        if not (0 <= row < 8 and 0 <= col < 8) or not START_ZONES[player] >> (row * 8 + col) & 1:
+            return False, "Must resurrect in your start zone"
+        if buf[BOARD + row * 8 + col]:
+            return False, "Position is occupied"
+
+        self._deal_damage(fid, 1)
+        if buf[FLAGS + fid] & DEAD:
+            return False, "Mage died during cast"
+
+        self._pool_remove(player, dead)
+        buf[FLAGS + dead] = 0
+        buf[LIFE + dead] = 2
+        buf[CONTAINED + dead] = 0
+        self._put(dead, row * 8 + col)
+        score = SCORES[opponent_of(player)]
+        buf[score] -= 1
+        buf[FLAGS + fid] |= ACTED
+        return True, "Vampiric Push successful"
+
+    def white_mage_conjure(self, fid: int, target: int):
+        """White Mage's Conjure spell."""
+        buf = self.buf
+        if TYPE_OF[fid] != FigureType.WHITE_MAGE:
+            return False, "Only White Mage can use Conjure"
+        reason = self._ready(fid)
+        if reason:
+            return False, reason
+        if buf[OWNER + target] == buf[OWNER + fid]:
+            return False, "Cannot conjure friendly figures"
+        if buf[LIFE + target] > 2:
+            return False, "Target has too much life"
+        if not MANHATTAN_MASKS[REACH[fid]][buf[SQUARE + fid]] >> buf[SQUARE + target] & 1:
+            return False, "Target out of reach"
+
+        buf[OWNER + target] = buf[OWNER + fid]
+        buf[FLAGS + fid] |= ACTED
+        return True, f"Conjured {TYPE_OF[target].value}"
+
+    def white_mage_heal(self, fid: int, target: int):
+        """White Mage's Heal spell."""
+        buf = self.buf
+        if TYPE_OF[fid] != FigureType.WHITE_MAGE:
+            return False, "Only White Mage can use Heal"
+        reason = self._ready(fid)
+        if reason:
+            return False, reason
+        if not MANHATTAN_MASKS[REACH[fid]][buf[SQUARE + fid]] >> buf[SQUARE + target] & 1:
+            return False, "Target out of reach"
+
+        old_life = buf[LIFE + target]
+        buf[LIFE + target] = min(old_life + 3, MAX_LIFE[target])
+        buf[FLAGS + fid] |= ACTED
+        return True, f"Healed {TYPE_OF[target].value} for {buf[LIFE + target] - old_life} life"
+
+    def white_mage_counter_containment(self, fid: int, target: int):
+        """White Mage's Counter Containment spell."""
+        buf = self.buf
+        if TYPE_OF[fid] != FigureType.WHITE_MAGE:
+            return False, "Only White Mage can use Counter Containment"
+        reason = self._ready(fid)
+        if reason:
+            return False, reason
+        if buf[OWNER + target] == buf[OWNER + fid]:
+            return False, "Cannot contain friendly figures"
+        if not MANHATTAN_MASKS[REACH[fid]][buf[SQUARE + fid]] >> buf[SQUARE + target] & 1:
+            return False, "Target out of reach"
+
+        buf[CONTAINED + target] = 2
+        buf[FLAGS + fid] |= ACTED
+        return True, f"Contained {TYPE_OF[target].value} for 2 turns"
+
+    def _deal_damage(self, fid: int, damage: int):
+        """Deal damage to a figure, moving it to its owner's dead pool when it dies."""
+        buf = self.buf
+        if buf[FLAGS + fid] & DEAD:
+            return
+        life = max(buf[LIFE + fid] - damage, 0)
+        buf[LIFE + fid] = life
+        if life == 0:
+            buf[FLAGS + fid] = DEAD
+            buf[CONTAINED + fid] = 0
+            self._lift(fid)
+            owner = Player(buf[OWNER + fid])
+            self._pool_append(owner, fid)
+            buf[SCORES[opponent_of(owner)]] += 1
+
+    def end_turn(self):
+        """End the current turn and switch players."""
+        buf = self.buf
+        side = buf[SIDE]
+        for fid in range(FIGURE_COUNT):
+            if buf[SQUARE + fid] == NO_SQUARE:
+                continue
+            if buf[OWNER + fid] == side:
+                buf[FLAGS + fid] = 0
+            if buf[CONTAINED + fid]:
+                buf[CONTAINED + fid] -= 1
+
+        buf[SIDE] = 3 - side
+        buf[TURN:TURN + 4] = (self.turn_count + 1).to_bytes(4, "little")
+        self._check_win_conditions()
+
+    def _check_win_conditions(self):
+        buf = self.buf
+        for player in (Player.ONE, Player.TWO):
+            if buf[SCORES[player]] >= 4:
+                buf[GAME_OVER] = 1
+                buf[WINNER] = player.value
+                return
+        if not self.occupied(Player.ONE):
+            buf[GAME_OVER] = 1
+            buf[WINNER] = Player.TWO.value
+        elif not self.occupied(Player.TWO):
+            buf[GAME_OVER] = 1
+            buf[WINNER] = Player.ONE.value
+
+    # Action generation and dispatch
+
+    def legal_actions(self, player: Player) -> List[Action]:
+        """Enumerate every legal action for a player, ending with END_TURN."""
+        if self.buf[GAME_OVER]:
+            return []
+        buf = self.buf
+        actions = []
+        for square in range(64):
+            fid = buf[BOARD + square] - 1
+            if fid >= 0 and buf[OWNER + fid] == player.value:
+                actions.extend(self.figure_actions(fid))
+        actions.append(Action(ActionType.END_TURN))
+        return actions
+
+    def figure_actions(self, fid: int) -> List[Action]:
+        """Enumerate every legal action for a single figure."""
+        buf = self.buf
+        square = buf[SQUARE + fid]
+        if square == NO_SQUARE or buf[FLAGS + fid] & ACTED or buf[CONTAINED + fid]:
+            return []
+
+        actions = []
+        pos = square_position(square)
+        figure_type = TYPE_OF[fid]
+        player = Player(buf[OWNER + fid])
+        enemies = self.occupied(opponent_of(player))
+        blockers = self._blockers()
+
+        if not buf[FLAGS + fid] & MOVED:
+            moves = 0
+            if figure_type == FigureType.ARBALIST:
+                paths = PATH_MASKS[True]
+                for target in iter_squares(CHEBYSHEV_MASKS[MOVE[fid]][square] & ~blockers):
+                    if not paths[square * 64 + target] & blockers:
+                        moves |= 1 << target
+            else:
+                for direction in CHARGE_DIRECTIONS:
+                    for target in RAYS[direction][square][:MOVE[fid]]:
+                        if blockers >> target & 1:
+                            break
+                        moves |= 1 << target
+            # Square order, as GameState lists them
+            for target in iter_squares(moves):
+                actions.append(Action(ActionType.MOVE, pos, square_position(target)))
+            if figure_type == FigureType.KNIGHT:
+                for direction in CHARGE_DIRECTIONS:
+                    for target in RAYS[direction][square][:4]:
+                        if TERRAIN >> target & 1:
+                            break
+                        if not buf[BOARD + target]:
+                            actions.append(Action(ActionType.CHARGE, pos, direction=direction))
+                            break
+
+        diagonal = figure_type == FigureType.ARBALIST
+        reach = (CHEBYSHEV_MASKS if diagonal else MANHATTAN_MASKS)[REACH[fid]][square]
+        paths = PATH_MASKS[diagonal]
+        for target in iter_squares(enemies & reach):
+            path = paths[square * 64 + target]
+            if path is not None and not path & blockers:
+                actions.append(Action(ActionType.ATTACK, pos, square_position(target)))
+
+        if figure_type == FigureType.ARBALIST:
+            for direction in LONG_EYE_DIRECTIONS:
+                if self._long_eye_target(fid, direction) is not None:
+                    actions.append(Action(ActionType.LONG_EYE, pos, direction=direction))
+        elif figure_type == FigureType.BLACK_MAGE:
+            if not self.magic_bomb_used(player):
+                for target in iter_squares(reach):
+                    actions.append(Action(ActionType.MAGIC_BOMB, pos, square_position(target)))
+            for target in iter_squares(enemies & reach):
+                target_pos = square_position(target)
+                for x in range(1, buf[LIFE + fid]):
+                    actions.append(Action(ActionType.PLAGUE, pos, target_pos, value=x))
+            # The mage pays 1 life first, so a mage on 1 life can never resurrect
+            if buf[LIFE + fid] > 1:
+                free = [square_position(target)
+                        for target in iter_squares(START_ZONES[player] & ~self.occupancy())]
+                seen = set()
+                for i, dead in enumerate(self.dead_pool(player)):
+                    if dead // 2 in seen:
+                        continue
+                    seen.add(dead // 2)
+                    for target in free:
+                        actions.append(Action(ActionType.VAMPIRIC_PUSH, pos, target, value=i))
+        elif figure_type == FigureType.WHITE_MAGE:
+            for target in iter_squares(enemies & reach):
+                target_pos = square_position(target)
+                if buf[LIFE + buf[BOARD + target] - 1] <= 2:
+                    actions.append(Action(ActionType.CONJURE, pos, target_pos))
+                actions.append(Action(ActionType.HEAL, pos, target_pos))
+                actions.append(Action(ActionType.CONTAIN, pos, target_pos))
+            for target in iter_squares(self.occupied(player) & reach):
+                actions.append(Action(ActionType.HEAL, pos, square_position(target)))
+
+        return actions
+
+    def _long_eye_target(self, fid: int, direction: str) -> Optional[int]:
+        """First enemy hit by Long Eye in the given direction, if any."""
+        buf = self.buf
+        for square in RAYS[direction][buf[SQUARE + fid]]:
+            target = buf[BOARD + square] - 1
+            if target >= 0:
+                return target if buf[OWNER + target] != buf[OWNER + fid] else None
+        return None
+
+    def perform(self, action: Action):
+        """Carry out an action record through the matching action method."""
+        kind = action.kind
+        if kind == ActionType.END_TURN:
+            self.end_turn()
+            return True, "Turn ended"
+
+        fid = self.figure_at(action.origin)
+        if fid is None:
+            return False, "No figure at origin"
+
+        if kind == ActionType.MOVE:
+            return self.move_figure(fid, action.target)
+        if kind == ActionType.ATTACK:
+            return self.attack(fid, action.target)
+        if kind == ActionType.CHARGE:
+            return self.knight_charge(fid, action.direction)
+        if kind == ActionType.LONG_EYE:
+            return self.arbalist_long_eye(fid, action.direction)
+        if kind == ActionType.MAGIC_BOMB:
+            return self.black_mage_magic_bomb(fid, action.target)
+        if kind == ActionType.VAMPIRIC_PUSH:
+            pool = self.dead_pool(Player(self.buf[OWNER + fid]))
+            if not 0 <= action.value < len(pool):
+                return False, "Invalid figure selection"
+            return self.black_mage_vampiric_push(fid, pool[action.value], action.target)
+
+        target = self.figure_at(action.target)
+        if target is None:
+            return False, "No target at that position"
+        if kind == ActionType.PLAGUE:
+            return self.black_mage_plague(fid, target, action.value)
+        if kind == ActionType.CONJURE:
+            return self.white_mage_conjure(fid, target)
+        if kind == ActionType.HEAL:
+            return self.white_mage_heal(fid, target)
+        if kind == ActionType.CONTAIN:
+            return self.white_mage_counter_containment(fid, target)
+        return False, "Unknown action"
@@ -1,6 +1,10 @@
+import argparse
 import copy
+import random
+import struct
+import sys
 from enum import Enum
-from typing import List, Tuple, Optional, Dict, Set
+from typing import List, Tuple, Optional, Dict, Set, NamedTuple
 
 class FigureType(Enum):
     KNIGHT = "Knight"
@@ -13,7 +17,23 @@ class Player(Enum):
     ONE = 1
     TWO = 2
 
+# Per-type stats: (max_life, move, attack, reach)
+FIGURE_STATS = {
+    FigureType.KNIGHT: (7, 4, 3, 1),
+    FigureType.BARBARIAN: (8, 3, 4, 1),
+    FigureType.ARBALIST: (5, 2, 2, 3),
+    FigureType.BLACK_MAGE: (7, 2, 1, 2),
+    FigureType.WHITE_MAGE: (4, 2, 1, 2),
+}
+
+# Points that win the game
+WINNING_SCORE = 4
+
 class Figure:
+    __slots__ = ("type", "player", "position", "has_moved", "has_acted",
+                 "counter_containment_turns", "max_life", "move", "attack", "reach",
+                 "life", "is_dead")
+
     def __init__(self, figure_type: FigureType, player: Player):
         self.type = figure_type
         self.player = player
@@ -21,71 +41,361 @@ class Figure:
         self.has_moved = False
         self.has_acted = False
         self.counter_containment_turns = 0
-
-        # Set stats based on type
-        if figure_type == FigureType.KNIGHT:
-            self.max_life = 7
-            self.move = 4
-            self.attack = 3
-            self.reach = 1
-        elif figure_type == FigureType.BARBARIAN:
-            self.max_life = 8
-            self.move = 3
-            self.attack = 4
-            self.reach = 1
-        elif figure_type == FigureType.ARBALIST:
-            self.max_life = 5
-            self.move = 2
-            self.attack = 2
-            self.reach = 3
-        elif figure_type == FigureType.BLACK_MAGE:
-            self.max_life = 7
-            self.move = 2
-            self.attack = 1
-            self.reach = 2
-        elif figure_type == FigureType.WHITE_MAGE:
-            self.max_life = 4
-            self.move = 2
-            self.attack = 1
-            self.reach = 2
-
+        self.max_life, self.move, self.attack, self.reach = FIGURE_STATS[figure_type]
         self.life = self.max_life
         self.is_dead = False
 
     def __repr__(self):
         return f"{self.type.value} (P{self.player.value}) [{self.life}/{self.max_life}]"
 
+class ActionType(Enum):
+    MOVE = 0
+    ATTACK = 1
+    CHARGE = 2
+    LONG_EYE = 3
+    MAGIC_BOMB = 4
+    PLAGUE = 5
+    VAMPIRIC_PUSH = 6
+    CONJURE = 7
+    HEAL = 8
+    CONTAIN = 9
+    END_TURN = 10
+
+# Packed action record: kind, origin square, target square (0xFF for none), and
+# the direction code in the low nibble with value in the high nibble
+ACTION_RECORD = struct.Struct("<4B")
+NO_SQUARE = 0xFF
+NO_DIRECTION = 0xF
+
+def _pack_square(pos: Optional[Tuple[int, int]]) -> int:
+    if pos is None:
+        return NO_SQUARE
+    row, col = pos
+    if not (0 <= row < 8 and 0 <= col < 8):
+        raise ValueError(f"Position {pos} is off the board")
+    return row * 8 + col
+
+class Action(NamedTuple):
+    """A single legal action.
+
+    origin is the acting figure's position. target is the destination or
+    targeted square, direction is used by charges and Long Eye, and value
+    holds Plague's X or the dead pool index for Vampiric Push.
+    """
+    kind: ActionType
+    origin: Optional[Tuple[int, int]] = None
+    target: Optional[Tuple[int, int]] = None
+    direction: Optional[str] = None
+    value: int = 0
+
+    def __str__(self):
+        name = self.kind.name.lower().replace("_", " ")
+        if self.kind == ActionType.END_TURN:
+            return name
+        text = f"{name} {self.origin}"
+        if self.direction is not None:
+            text += f" {self.direction}"
+        if self.target is not None:
+            text += f" -> {self.target}"
+        if self.kind == ActionType.PLAGUE:
+            text += f" (X={self.value})"
+        elif self.kind == ActionType.VAMPIRIC_PUSH:
+            text += f" (dead #{self.value})"
+        return text
+
+    def pack(self) -> bytes:
+        """Encode as an ACTION_RECORD.
+
+        Raises ValueError for actions with off-board squares, unknown
+        directions or out of range values, which the rules always reject.
+        """
+        if self.direction is None:
+            direction = NO_DIRECTION
+        elif self.direction in DIRECTION_CODES:
+            direction = DIRECTION_CODES[self.direction]
+        else:
+            raise ValueError(f"Unknown direction {self.direction!r}")
+        if not 0 <= self.value < 16:
+            raise ValueError(f"Value {self.value} does not fit an action record")
+        return ACTION_RECORD.pack(self.kind.value, _pack_square(self.origin),
+                                  _pack_square(self.target), direction | self.value << 4)
+
+    @classmethod
+    def unpack(cls, data) -> "Action":
+        """Decode an ACTION_RECORD."""
+        kind, origin, target, packed = ACTION_RECORD.unpack(data)
+        direction = packed & 0xF
+        return cls(ActionType(kind),
+                   None if origin == NO_SQUARE else square_position(origin),
+                   None if target == NO_SQUARE else square_position(target),
+                   None if direction == NO_DIRECTION else DIRECTION_NAMES[direction],
+                   packed >> 4)
+
+CHARGE_DIRECTIONS = {
+    "up": (-1, 0), "down": (1, 0), "left": (0, -1), "right": (0, 1)
+}
+
+LONG_EYE_DIRECTIONS = {
+    "up": (-1, 0), "down": (1, 0), "left": (0, -1), "right": (0, 1),
+    "up-left": (-1, -1), "up-right": (-1, 1),
+    "down-left": (1, -1), "down-right": (1, 1)
+}
+
+# Directions by their code in action records; charge directions come first
+DIRECTION_NAMES = list(LONG_EYE_DIRECTIONS)
+DIRECTION_CODES = {name: code for code, name in enumerate(DIRECTION_NAMES)}
+
+# Board text: a two-letter abbreviation and the player number for each figure
+FIGURE_ABBREVIATIONS = {
+    FigureType.KNIGHT: "Kn",
+    FigureType.BARBARIAN: "Ba",
+    FigureType.ARBALIST: "Ar",
+    FigureType.BLACK_MAGE: "BM",
+    FigureType.WHITE_MAGE: "WM"
+}
+FIGURE_CELLS = {(player, figure_type): f"{abbreviation}{player.value}"
+                for player in Player for figure_type, abbreviation in FIGURE_ABBREVIATIONS.items()}
+TERRAIN_CELL = "XX"
+EMPTY_CELL = "..."
+BOARD_HEADER = "  0 1 2 3 4 5 6 7"
+
+# Squares are numbered row * 8 + col, so any set of squares fits in a 64-bit mask
+def square_index(pos: Tuple[int, int]) -> int:
+    """Square number of an on-board position."""
+    return pos[0] * 8 + pos[1]
+
+def square_position(square: int) -> Tuple[int, int]:
+    """Position of a square number."""
+    return divmod(square, 8)
+
+def iter_squares(mask: int):
+    """Yield the square numbers set in a bitboard, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+START_ZONES = {
+    Player.ONE: 0x000000000000FFFF,  # rows 0-1
+    Player.TWO: 0xFFFF000000000000,  # rows 6-7
+}
+
+TERRAIN = (1 << square_index((3, 0))) | (1 << square_index((4, 7)))  # 4th row from left, 5th row from right
+
+# Geometry tables, computed once at import
+MAX_RANGE = 4  # longest move or reach on any figure
+
+def _neighborhood_mask(square: int, distance: int, diagonal: bool) -> int:
+    """Squares within a Chebyshev (diagonal) or Manhattan distance, the square included."""
+    row, col = square_position(square)
+    mask = 0
+    for other in range(64):
+        r, c = square_position(other)
+        if diagonal:
+            within = max(abs(r - row), abs(c - col)) <= distance
+        else:
+            within = abs(r - row) + abs(c - col) <= distance
+        if within:
+            mask |= 1 << other
+    return mask
+
+def _ray(square: int, step: Tuple[int, int]) -> List[int]:
+    """Squares from a square to the board edge in one direction, nearest first."""
+    row, col = square_position(square)
+    dr, dc = step
+    squares = []
+    row, col = row + dr, col + dc
+    while 0 <= row < 8 and 0 <= col < 8:
+        squares.append(row * 8 + col)
+        row, col = row + dr, col + dc
+    return squares
+
+def _path_mask(from_square: int, to_square: int, diagonal: bool) -> Optional[int]:
+    """Squares strictly between two squares along the walk used for movement and
+    line of sight, or None when a straight mover has no straight path."""
+    fr, fc = square_position(from_square)
+    tr, tc = square_position(to_square)
+    if not diagonal and fr != tr and fc != tc:
+        return None
+
+    steps = max(abs(tr - fr), abs(tc - fc))
+    if steps == 0:
+        return 0
+
+    # Same float stepping and truncation as the rules have always used
+    dr = (tr - fr) / steps
+    dc = (tc - fc) / steps
+    mask = 0
+    for i in range(1, steps):
+        mask |= 1 << (int(fr + dr * i) * 8 + int(fc + dc * i))
+    return mask
+
+# [distance][square] -> squares within that many steps
+MANHATTAN_MASKS = [[_neighborhood_mask(square, distance, False) for square in range(64)]
+                   for distance in range(MAX_RANGE + 1)]
+CHEBYSHEV_MASKS = [[_neighborhood_mask(square, distance, True) for square in range(64)]
+                   for distance in range(MAX_RANGE + 1)]
+
+# [direction][square] -> squares along the ray, used by Long Eye and charges
+RAYS = {direction: [_ray(square, step) for square in range(64)]
+        for direction, step in LONG_EYE_DIRECTIONS.items()}
+
+# [diagonal][from_square * 64 + to_square] -> squares walked in between
+PATH_MASKS = [[_path_mask(from_square, to_square, diagonal)
+               for from_square in range(64) for to_square in range(64)]
+              for diagonal in (False, True)]
+
+# [square] -> 3x3 Magic Bomb footprint, clipped to the board
+BLAST_MASKS = [CHEBYSHEV_MASKS[1][square] for square in range(64)]
+
+def _threat_region(figure_type: FigureType, square: int) -> int:
+    """Squares whose occupants can change what a figure on a square threatens."""
+    _, _, _, reach = FIGURE_STATS[figure_type]
+    region = (CHEBYSHEV_MASKS if figure_type == FigureType.ARBALIST else MANHATTAN_MASKS)[reach][square]
+    if figure_type == FigureType.ARBALIST:
+        lanes = [RAYS[direction][square] for direction in LONG_EYE_DIRECTIONS]
+    elif figure_type == FigureType.KNIGHT:
+        lanes = [RAYS[direction][square][:4] for direction in CHARGE_DIRECTIONS]
+    else:
+        lanes = []
+    for lane in lanes:
+        for target in lane:
+            region |= 1 << target
+    return region
+
+def _bomb_footprint(square: int) -> int:
+    """Squares a Magic Bomb cast from a square can catch."""
+    _, _, _, reach = FIGURE_STATS[FigureType.BLACK_MAGE]
+    footprint = 0
+    for center in iter_squares(MANHATTAN_MASKS[reach][square]):
+        footprint |= BLAST_MASKS[center]
+    return footprint
+
+# [square] -> every square a Black Mage's Magic Bomb can catch from there
+BOMB_FOOTPRINTS = [_bomb_footprint(square) for square in range(64)]
+
+# [square] -> (target bit, path mask) for each square an Arbalist there can shoot at
+ARBALIST_SIGHT_LINES = [[(1 << target, PATH_MASKS[True][square * 64 + target])
+                         for target in iter_squares(CHEBYSHEV_MASKS[FIGURE_STATS[FigureType.ARBALIST][3]][square]
+                                                    & ~(1 << square))]
+                        for square in range(64)]
+
+# [figure_type][square] -> occupancy a figure's threats depend on
+THREAT_REGIONS = {figure_type: [_threat_region(figure_type, square) for square in range(64)]
+                  for figure_type in FigureType}
+
+# Zobrist keys, drawn from a fixed seed so hashes are stable between runs
+_zobrist_rng = random.Random(0x4D6F746C6579)
+
+def _zobrist_keys(count: int) -> List[int]:
+    return [_zobrist_rng.getrandbits(64) for _ in range(count)]
+
+ZOBRIST_PIECES = {(player, figure_type): _zobrist_keys(64)
+                  for player in Player for figure_type in FigureType}
+ZOBRIST_LIFE = [_zobrist_keys(9) for _ in range(64)]  # indexed by life, up to 8
+ZOBRIST_MOVED = _zobrist_keys(64)
+ZOBRIST_ACTED = _zobrist_keys(64)
+ZOBRIST_CONTAINED = [[0] + _zobrist_keys(2) for _ in range(64)]  # indexed by turns left
+ZOBRIST_SCORES = {player: _zobrist_keys(33) for player in Player}  # one per possible death
+ZOBRIST_DEAD = {(player, figure_type): [0] + _zobrist_keys(16)  # indexed by copies in the pool
+                for player in Player for figure_type in FigureType}
+ZOBRIST_BOMB = {player: _zobrist_rng.getrandbits(64) for player in Player}
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)  # set while Player.TWO is to move
+
+# Packed position record: one 16-bit word per figure slot (two slots per type,
+# in FigureType order), both scores, a flags byte and the turn count
+STATE_RECORD = struct.Struct("<10H2BBI")
+WORD_PRESENT = 0x8000
+WORD_CONTAINED_SHIFT = 13
+WORD_ACTED = 0x1000
+WORD_MOVED = 0x0800
+WORD_LIFE_SHIFT = 7
+WORD_OWNER_TWO = 0x0040
+WORD_LOCATION = 0x003F  # square on the board, or rank in the dead pool
+
+def _figure_word(figure: Figure, location: int) -> int:
+    """Pack one figure into its record word."""
+    word = WORD_PRESENT | figure.life << WORD_LIFE_SHIFT | location
+    if figure.player == Player.TWO:
+        word |= WORD_OWNER_TWO
+    if not figure.is_dead:
+        # Dead figures keep stale turn flags that resurrection resets anyway
+        word |= figure.counter_containment_turns << WORD_CONTAINED_SHIFT
+        if figure.has_moved:
+            word |= WORD_MOVED
+        if figure.has_acted:
+            word |= WORD_ACTED
+    return word
+
+class _Delta:
+    """What GameState.apply needs to put back on undo.
+
+    Whole-state scalars are saved up front; figures and the figure/dead
+    lists are saved lazily, the first time an action touches them.
+    """
+    __slots__ = ("scalars", "figures", "lists")
+
+    def __init__(self, scalars):
+        self.scalars = scalars
+        self.figures = {}
+        self.lists = None
+
 class GameState:
     def __init__(self):
-        self.board = [[None for _ in range(8)] for _ in range(8)]
+        self.squares = [None] * 64  # Figure on each square
         self.current_player = Player.ONE
         self.figures = []
         self.dead_figures = {Player.ONE: [], Player.TWO: []}
         self.scores = {Player.ONE: 0, Player.TWO: 0}
-        self.terrain = [(3, 0), (4, 7)]  # 4th row from left, 5th row from right
+        self.live_counts = {Player.ONE: 0, Player.TWO: 0}  # figures on the board
+        self.terrain = TERRAIN
         self.magic_bomb_used = {Player.ONE: False, Player.TWO: False}
         self.turn_count = 0
         self.game_over = False
         self.winner = None
 
+        # Bitboards mirroring the figures on the board
+        self.occupied = {Player.ONE: 0, Player.TWO: 0}
+        self.pieces = {figure_type: 0 for figure_type in FigureType}
+        self.moved = 0
+        self.acted = 0
+        self.contained = 0
+
+        # Deltas recorded by apply(), newest last
+        self.history = []
+
+        # Per-figure move and attack target bitboards and special actions,
+        # keyed by what they depend on
+        self.move_cache = {}
+        self.attack_cache = {}
+        self.special_cache = {}
+
+        # Damage each player threatens per square, summed from per-figure
+        # contributions that are refreshed when what they depend on changes
+        self.threat_maps = {Player.ONE: [0] * 64, Player.TWO: [0] * 64}
+        self.threat_cache = {}
+        self.threat_board = None  # the bitboards the maps were last refreshed for
+
+        # Zobrist hash, kept up to date by every mutation
+        self.hash = self.compute_hash()
+
     def get_start_zone(self, player: Player):
         """Get the start zone rows for a player."""
-        if player == Player.ONE:
-            return [(row, col) for row in range(2) for col in range(8)]
-        else:
-            return [(row, col) for row in range(6, 8) for col in range(8)]
+        return [square_position(square) for square in iter_squares(START_ZONES[player])]
 
     def place_figure(self, figure: Figure, pos: Tuple[int, int]):
         """Place a figure on the board during setup."""
-        row, col = pos
-        if self.board[row][col] is not None:
+        if not self.is_valid_position(pos):
+            return False
+        square = square_index(pos)
+        if self.squares[square] is not None:
             return False
-        if pos not in self.get_start_zone(figure.player):
+        if not START_ZONES[figure.player] >> square & 1:
             return False
 
-        self.board[row][col] = figure
-        figure.position = pos
+        self._put(figure, pos)
         self.figures.append(figure)
+        self.live_counts[figure.player] += 1
         return True
 
     def is_valid_position(self, pos: Tuple[int, int]):
@@ -95,14 +405,194 @@ class GameState:
 
     def is_terrain(self, pos: Tuple[int, int]):
         """Check if a position is terrain."""
-        return pos in self.terrain
+        return self.is_valid_position(pos) and bool(self.terrain >> square_index(pos) & 1)
 
     def get_figure_at(self, pos: Tuple[int, int]):
         """Get the figure at a given position."""
         if not self.is_valid_position(pos):
             return None
-        row, col = pos
-        return self.board[row][col]
+        return self.squares[square_index(pos)]
+
+    def occupancy(self) -> int:
+        """Bitboard of every occupied square."""
+        return self.occupied[Player.ONE] | self.occupied[Player.TWO]
+
+    def figures_of(self, player: Player, figure_type: Optional[FigureType] = None) -> List[Figure]:
+        """A player's figures on the board, optionally of one type, in square order."""
+        mask = self.occupied[player]
+        if figure_type is not None:
+            mask &= self.pieces[figure_type]
+        squares = self.squares
+        return [squares[square] for square in iter_squares(mask)]
+
+    def _touch(self, figure: Figure):
+        """Save a figure's state into the open delta before it changes."""
+        if self.history:
+            saved = self.history[-1].figures
+            if figure not in saved:
+                saved[figure] = (figure.position, figure.player, figure.life, figure.is_dead,
+                                 figure.has_moved, figure.has_acted,
+                                 figure.counter_containment_turns)
+
+    def _touch_lists(self):
+        """Save the figure and dead pool lists into the open delta before they change."""
+        if self.history and self.history[-1].lists is None:
+            self.history[-1].lists = (self.figures[:], self.dead_figures[Player.ONE][:],
+                                      self.dead_figures[Player.TWO][:])
+
+    def compute_hash(self) -> int:
+        """Compute the Zobrist hash from scratch; self.hash tracks it incrementally."""
+        h = 0
+        for figure in self.figures:
+            h ^= self._figure_key(figure)
+        for player in Player:
+            h ^= ZOBRIST_SCORES[player][self.scores[player]]
+            if self.magic_bomb_used[player]:
+                h ^= ZOBRIST_BOMB[player]
+            copies = {}
+            for figure in self.dead_figures[player]:
+                copies[figure.type] = copies.get(figure.type, 0) + 1
+                h ^= ZOBRIST_DEAD[player, figure.type][copies[figure.type]]
+        if self.current_player == Player.TWO:
+            h ^= ZOBRIST_SIDE
+        return h
+
+    def to_bytes(self) -> bytes:
+        """Pack the position into a STATE_RECORD.
+
+        The copies of each type are sorted, so equal positions give equal
+        bytes however they were reached. Undo history is not included.
+        """
+        words = {figure_type: [] for figure_type in FigureType}
+        for figure in self.figures:
+            words[figure.type].append(_figure_word(figure, square_index(figure.position)))
+        for player in Player:
+            for rank, figure in enumerate(self.dead_figures[player]):
+                words[figure.type].append(_figure_word(figure, rank))
+
+        slots = []
+        for figure_type, packed in words.items():
+            if len(packed) > 2:
+                raise ValueError(f"More than two {figure_type.value} figures")
+            slots.extend(sorted(packed) + [0] * (2 - len(packed)))
+
+        flags = (self.magic_bomb_used[Player.ONE] | self.magic_bomb_used[Player.TWO] << 1
+                 | (self.current_player == Player.TWO) << 2 | self.game_over << 3
+                 | (self.winner.value if self.winner else 0) << 4)
+        return STATE_RECORD.pack(*slots, self.scores[Player.ONE], self.scores[Player.TWO],
+                                 flags, self.turn_count)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "GameState":
+        """Rebuild a position packed by to_bytes()."""
+        *slots, score_one, score_two, flags, turn_count = STATE_RECORD.unpack(data)
+        state = cls()
+        figure_types = list(FigureType)
+        live = {}
+        pools = {Player.ONE: {}, Player.TWO: {}}
+        for slot, word in enumerate(slots):
+            if not word & WORD_PRESENT:
+                continue
+            figure = Figure(figure_types[slot // 2],
+                            Player.TWO if word & WORD_OWNER_TWO else Player.ONE)
+            figure.life = word >> WORD_LIFE_SHIFT & 0xF
+            if figure.life:
+                figure.has_moved = bool(word & WORD_MOVED)
+                figure.has_acted = bool(word & WORD_ACTED)
+                figure.counter_containment_turns = word >> WORD_CONTAINED_SHIFT & 0x3
+                live[word & WORD_LOCATION] = figure
+            else:
+                figure.is_dead = True
+                pools[figure.player][word & WORD_LOCATION] = figure
+
+        for square in sorted(live):
+            state._put(live[square], square_position(square))
+            state.figures.append(live[square])
+            state.live_counts[live[square].player] += 1
+        for player, pool in pools.items():
+            state.dead_figures[player] = [pool[rank] for rank in sorted(pool)]
+        state.scores = {Player.ONE: score_one, Player.TWO: score_two}
+        state.magic_bomb_used = {Player.ONE: bool(flags & 1), Player.TWO: bool(flags & 2)}
+        state.current_player = Player.TWO if flags & 4 else Player.ONE
+        state.game_over = bool(flags & 8)
+        state.winner = Player(flags >> 4) if flags >> 4 else None
+        state.turn_count = turn_count
+        state.hash = state.compute_hash()
+        return state
+
+    def _figure_key(self, figure: Figure) -> int:
+        """Zobrist key of a figure on its current square."""
+        square = square_index(figure.position)
+        key = (ZOBRIST_PIECES[figure.player, figure.type][square]
+               ^ ZOBRIST_LIFE[square][figure.life]
+               ^ ZOBRIST_CONTAINED[square][figure.counter_containment_turns])
+        if figure.has_moved:
+            key ^= ZOBRIST_MOVED[square]
+        if figure.has_acted:
+            key ^= ZOBRIST_ACTED[square]
+        return key
+
+    def _add_score(self, player: Player, points: int):
+        """Adjust a player's score."""
+        scores = ZOBRIST_SCORES[player]
+        self.hash ^= scores[self.scores[player]]
+        self.scores[player] += points
+        self.hash ^= scores[self.scores[player]]
+
+    def _dead_key(self, player: Player, figure_type: FigureType) -> int:
+        """Zobrist key of the last copy of a type in a player's dead pool."""
+        copies = sum(1 for figure in self.dead_figures[player] if figure.type == figure_type)
+        return ZOBRIST_DEAD[player, figure_type][copies]
+
+    def _put(self, figure: Figure, pos: Tuple[int, int]):
+        """Put a figure on a square and mirror it in the bitboards."""
+        square = square_index(pos)
+        bit = 1 << square
+        self.squares[square] = figure
+        figure.position = pos
+        self.occupied[figure.player] |= bit
+        self.pieces[figure.type] |= bit
+        if figure.has_moved:
+            self.moved |= bit
+        if figure.has_acted:
+            self.acted |= bit
+        if figure.counter_containment_turns > 0:
+            self.contained |= bit
+        self.hash ^= self._figure_key(figure)
+
+    def _lift(self, figure: Figure):
+        """Take a figure off its square and clear it from the bitboards."""
+        square = square_index(figure.position)
+        clear = ~(1 << square)
+        self.hash ^= self._figure_key(figure)
+        self.squares[square] = None
+        self.occupied[figure.player] &= clear
+        self.pieces[figure.type] &= clear
+        self.moved &= clear
+        self.acted &= clear
+        self.contained &= clear
+
+    def _set_moved(self, figure: Figure):
+        """Flag a figure as moved this turn."""
+        if figure.has_moved:
+            return
+        self._touch(figure)
+        square = square_index(figure.position)
+        figure.has_moved = True
+        self.moved |= 1 << square
+        self.hash ^= ZOBRIST_MOVED[square]
+
+    def _set_acted(self, figure: Figure):
+        """Flag a figure as having acted this turn."""
+        if figure.has_acted:
+            return
+        self._touch(figure)
+        figure.has_acted = True
+        if figure.is_dead:
+            return  # a mage caught in its own blast has already left the board
+        square = square_index(figure.position)
+        self.acted |= 1 << square
+        self.hash ^= ZOBRIST_ACTED[square]
 
     def move_figure(self, figure: Figure, new_pos: Tuple[int, int]):
         """Move a figure to a new position."""
@@ -112,36 +602,36 @@ class GameState:
         if figure.counter_containment_turns > 0:
             return False, "Figure is contained and cannot move"
 
-        if self.is_terrain(new_pos):
-            return False, "Cannot move to terrain"
+        if not (self.is_valid_position(new_pos)
+                and self.move_targets(figure) >> square_index(new_pos) & 1):
+            return False, self._move_error(figure, new_pos)
 
-        if self.get_figure_at(new_pos) is not None:
-            return False, "Position is occupied"
+        # Move the figure
+        self._touch(figure)
+        self._lift(figure)
+        self._put(figure, new_pos)
+        self._set_moved(figure)
+
+        return True, "Move successful"
 
-        # Check if move is within range
-        old_row, old_col = figure.position
-        new_row, new_col = new_pos
+    def _move_error(self, figure: Figure, new_pos: Tuple[int, int]) -> str:
+        """Why a figure cannot move to a square outside its move targets."""
+        if not self.is_valid_position(new_pos):
+            return "Position is off the board"
 
-        # Arbalist can move diagonally
-        if figure.type == FigureType.ARBALIST:
-            distance = max(abs(new_row - old_row), abs(new_col - old_col))
-        else:
-            distance = abs(new_row - old_row) + abs(new_col - old_col)
+        if self.is_terrain(new_pos):
+            return "Cannot move to terrain"
 
-        if distance > figure.move:
-            return False, "Move is out of range"
+        if self.get_figure_at(new_pos) is not None:
+            return "Position is occupied"
 
-        # Check path is clear (except for knight charge)
-        if not self._is_path_clear(figure.position, new_pos, figure.type == FigureType.ARBALIST):
-            return False, "Path is blocked"
+        # Check if move is within range (Arbalist can move diagonally)
+        distance = self._distance(figure.position, new_pos, figure.type == FigureType.ARBALIST)
 
-        # Move the figure
-        self.board[old_row][old_col] = None
-        self.board[new_row][new_col] = figure
-        figure.position = new_pos
-        figure.has_moved = True
+        if distance > figure.move:
+            return "Move is out of range"
 
-        return True, "Move successful"
+        return "Path is blocked"
 
     def knight_charge(self, knight: Figure, direction: str):
         """Perform knight charge special action."""
@@ -154,51 +644,39 @@ class GameState:
         if knight.counter_containment_turns > 0:
             return False, "Knight is contained"
 
-        row, col = knight.position
         damaged_figures = []
 
         # Determine direction vector
-        if direction == "up":
-            dr, dc = -1, 0
-        elif direction == "down":
-            dr, dc = 1, 0
-        elif direction == "left":
-            dr, dc = 0, -1
-        elif direction == "right":
-            dr, dc = 0, 1
-        else:
+        if direction not in CHARGE_DIRECTIONS:
             return False, "Invalid direction"
 
         # Find final position and damage figures along the way
         final_pos = None
-        for i in range(1, 5):  # Charge up to 4 spaces
-            new_row, new_col = row + i * dr, col + i * dc
-            if not self.is_valid_position((new_row, new_col)):
-                break
-            if self.is_terrain((new_row, new_col)):
+        for square in RAYS[direction][square_index(knight.position)][:4]:  # Charge up to 4 spaces
+            if self.terrain >> square & 1:
                 break
 
-            target = self.get_figure_at((new_row, new_col))
+            target = self.squares[square]
             if target:
                 if target.player != knight.player:
                     damaged_figures.append(target)
             else:
-                final_pos = (new_row, new_col)
+                final_pos = square_position(square)
 
         if final_pos is None:
             return False, "No valid charge destination"
 
         # Move knight
-        self.board[row][col] = None
-        self.board[final_pos[0]][final_pos[1]] = knight
-        knight.position = final_pos
+        self._touch(knight)
+        self._lift(knight)
+        self._put(knight, final_pos)
 
         # Deal damage
         for target in damaged_figures:
             self._deal_damage(target, 2)
 
-        knight.has_moved = True
-        knight.has_acted = True
+        self._set_moved(knight)
+        self._set_acted(knight)
 
         return True, f"Charge successful, damaged {len(damaged_figures)} figures"
 
@@ -211,29 +689,8 @@ class GameState:
             return False, "Figure is contained and cannot attack"
 
         target = self.get_figure_at(target_pos)
-        if not target:
-            return False, "No target at position"
-
-        if target.player == attacker.player:
-            return False, "Cannot attack friendly figures"
-
-        # Check reach
-        att_row, att_col = attacker.position
-        tar_row, tar_col = target_pos
-
-        if attacker.type == FigureType.ARBALIST:
-            # Arbalist can attack diagonally
-            distance = max(abs(tar_row - att_row), abs(tar_col - att_col))
-        else:
-            distance = abs(tar_row - att_row) + abs(tar_col - att_col)
-
-        if distance > attacker.reach:
-            return False, "Target out of reach"
-
-        # Check line of sight (no blocking for basic attacks)
-        if not self._is_path_clear(attacker.position, target_pos,
-                                   attacker.type == FigureType.ARBALIST, check_target=False):
-            return False, "No line of sight"
+        if not (target and self.attack_targets(attacker) >> square_index(target_pos) & 1):
+            return False, self._attack_error(attacker, target_pos)
 
         # Deal damage
         damage = attacker.attack
@@ -241,10 +698,27 @@ class GameState:
             damage += 1  # Barbarian fear of occult
 
         self._deal_damage(target, damage)
-        attacker.has_acted = True
+        self._set_acted(attacker)
 
         return True, f"Attack successful, dealt {damage} damage"
 
+    def _attack_error(self, attacker: Figure, target_pos: Tuple[int, int]) -> str:
+        """Why a figure cannot attack a square outside its attack targets."""
+        target = self.get_figure_at(target_pos)
+        if not target:
+            return "No target at position"
+
+        if target.player == attacker.player:
+            return "Cannot attack friendly figures"
+
+        # Check reach (Arbalist can attack diagonally)
+        distance = self._distance(attacker.position, target_pos, attacker.type == FigureType.ARBALIST)
+
+        if distance > attacker.reach:
+            return "Target out of reach"
+
+        return "No line of sight"
+
     def arbalist_long_eye(self, arbalist: Figure, direction: str):
         """Arbalist's Long Eye special action."""
         if arbalist.type != FigureType.ARBALIST:
@@ -256,31 +730,17 @@ class GameState:
         if arbalist.counter_containment_turns > 0:
             return False, "Arbalist is contained"
 
-        row, col = arbalist.position
-
-        # Direction vectors (including diagonals)
-        directions = {
-            "up": (-1, 0), "down": (1, 0), "left": (0, -1), "right": (0, 1),
-            "up-left": (-1, -1), "up-right": (-1, 1),
-            "down-left": (1, -1), "down-right": (1, 1)
-        }
-
-        if direction not in directions:
+        # Directions include diagonals
+        if direction not in LONG_EYE_DIRECTIONS:
             return False, "Invalid direction"
 
-        dr, dc = directions[direction]
-
         # Find first enemy in line
-        for i in range(1, 8):
-            new_row, new_col = row + i * dr, col + i * dc
-            if not self.is_valid_position((new_row, new_col)):
-                break
-
-            target = self.get_figure_at((new_row, new_col))
+        for square in RAYS[direction][square_index(arbalist.position)]:
+            target = self.squares[square]
             if target:
                 if target.player != arbalist.player:
                     self._deal_damage(target, 1)
-                    arbalist.has_acted = True
+                    self._set_acted(arbalist)
                     return True, "Long Eye hit target"
                 else:
                     break  # Blocked by friendly
@@ -301,31 +761,28 @@ class GameState:
         if self.magic_bomb_used[mage.player]:
             return False, "Magic Bomb already used this game"
 
+        if not self.is_valid_position(target_pos):
+            return False, "Target is off the board"
+
         # Check reach
         if not self._in_reach(mage.position, target_pos, mage.reach):
             return False, "Target out of reach"
 
-        # Get all affected positions
-        affected = [target_pos]
-        row, col = target_pos
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                if dr == 0 and dc == 0:
-                    continue
-                adj_pos = (row + dr, col + dc)
-                if self.is_valid_position(adj_pos):
-                    affected.append(adj_pos)
+        # Figures in the 3x3 blast, centre first
+        center = square_index(target_pos)
+        hit = BLAST_MASKS[center] & self.occupancy()
+        squares = list(iter_squares(hit & ~(1 << center)))
+        if hit >> center & 1:
+            squares.insert(0, center)
 
         # Deal damage to all figures in affected area
-        damaged = []
-        for pos in affected:
-            target = self.get_figure_at(pos)
-            if target:
-                self._deal_damage(target, 2)
-                damaged.append(target)
+        damaged = [self.squares[square] for square in squares]
+        for target in damaged:
+            self._deal_damage(target, 2)
 
         self.magic_bomb_used[mage.player] = True
-        mage.has_acted = True
+        self.hash ^= ZOBRIST_BOMB[mage.player]
+        self._set_acted(mage)
 
         return True, f"Magic Bomb damaged {len(damaged)} figures"
 
@@ -355,7 +812,7 @@ class GameState:
         # Target loses X+1 life
         self._deal_damage(target, x + 1)
 
-        mage.has_acted = True
+        self._set_acted(mage)
 
         return True, f"Plague cast: Mage lost {x} life, target lost {x+1} life"
 
@@ -373,7 +830,7 @@ class GameState:
         if dead_figure not in self.dead_figures[mage.player]:
             return False, "Figure not in your dead pool"
 
-        if pos not in self.get_start_zone(mage.player):
+        if not self.is_valid_position(pos) or not START_ZONES[mage.player] >> square_index(pos) & 1:
             return False, "Must resurrect in your start zone"
 
         if self.get_figure_at(pos) is not None:
@@ -384,21 +841,24 @@ class GameState:
 
         if not mage.is_dead:  # Only resurrect if mage survives
             # Resurrect figure
+            self._touch(dead_figure)
+            self._touch_lists()
+            self.hash ^= self._dead_key(mage.player, dead_figure.type)
             self.dead_figures[mage.player].remove(dead_figure)
             dead_figure.is_dead = False
             dead_figure.life = 2
-            dead_figure.position = pos
             dead_figure.has_moved = False
             dead_figure.has_acted = False
             dead_figure.counter_containment_turns = 0
-            self.board[pos[0]][pos[1]] = dead_figure
+            self._put(dead_figure, pos)
             self.figures.append(dead_figure)
+            self.live_counts[dead_figure.player] += 1
 
             # Adjust score
             opponent = Player.TWO if mage.player == Player.ONE else Player.ONE
-            self.scores[opponent] -= 1
+            self._add_score(opponent, -1)
 
-            mage.has_acted = True
+            self._set_acted(mage)
             return True, "Vampiric Push successful"
 
         return False, "Mage died during cast"
@@ -424,10 +884,18 @@ class GameState:
             return False, "Target out of reach"
 
         # Take control of target
-        old_player = target.player
+        self._touch(target)
+        square = square_index(target.position)
+        bit = 1 << square
+        self.occupied[target.player] &= ~bit
+        self.hash ^= ZOBRIST_PIECES[target.player, target.type][square]
+        self.live_counts[target.player] -= 1
         target.player = mage.player
+        self.live_counts[target.player] += 1
+        self.occupied[target.player] |= bit
+        self.hash ^= ZOBRIST_PIECES[target.player, target.type][square]
 
-        mage.has_acted = True
+        self._set_acted(mage)
 
         return True, f"Conjured {target.type.value}"
 
@@ -446,11 +914,14 @@ class GameState:
             return False, "Target out of reach"
 
         # Heal target
+        self._touch(target)
         old_life = target.life
         target.life = min(target.life + 3, target.max_life)
         healed = target.life - old_life
+        life_keys = ZOBRIST_LIFE[square_index(target.position)]
+        self.hash ^= life_keys[old_life] ^ life_keys[target.life]
 
-        mage.has_acted = True
+        self._set_acted(mage)
 
         return True, f"Healed {target.type.value} for {healed} life"
 
@@ -472,27 +943,453 @@ class GameState:
             return False, "Target out of reach"
 
         # Apply containment
+        self._touch(target)
+        square = square_index(target.position)
+        contained_keys = ZOBRIST_CONTAINED[square]
+        self.hash ^= contained_keys[target.counter_containment_turns] ^ contained_keys[2]
         target.counter_containment_turns = 2
+        self.contained |= 1 << square
 
-        mage.has_acted = True
+        self._set_acted(mage)
 
         return True, f"Contained {target.type.value} for 2 turns"
 
+    def legal_actions(self, player: Player) -> List[Action]:
+        """Enumerate every legal action for a player, ending with END_TURN."""
+        if self.game_over:
+            return []
+
+        actions = []
+        for square in iter_squares(self.occupied[player] & ~self.acted & ~self.contained):
+            actions.extend(self.figure_actions(self.squares[square]))
+
+        actions.append(Action(ActionType.END_TURN))
+        return actions
+
+    def figure_actions(self, figure: Figure) -> List[Action]:
+        """Enumerate every legal action for a single figure."""
+        if figure.is_dead or figure.has_acted or figure.counter_containment_turns > 0:
+            return []
+
+        actions = []
+        pos = figure.position
+        # A knight's specials are its charges, which are moves as well
+        knight = figure.type == FigureType.KNIGHT
+
+        if not figure.has_moved:
+            for target in iter_squares(self.move_targets(figure)):
+                actions.append(Action(ActionType.MOVE, pos, square_position(target)))
+            if knight:
+                actions.extend(self.special_actions(figure))
+
+        for target in iter_squares(self.attack_targets(figure)):
+            actions.append(Action(ActionType.ATTACK, pos, square_position(target)))
+
+        if not knight:
+            actions.extend(self.special_actions(figure))
+
+        return actions
+
+    def move_targets(self, figure: Figure) -> int:
+        """Bitboard of the squares a figure can move to, ignoring its turn flags.
+
+        The answer only depends on the figure's square and on which squares
+        within its move range are blocked, so it is cached per figure and
+        reused until a figure moves, dies or appears within that range.
+        """
+        square = square_index(figure.position)
+        diagonal = figure.type == FigureType.ARBALIST
+        region = (CHEBYSHEV_MASKS if diagonal else MANHATTAN_MASKS)[figure.move][square]
+        blockers = (self.occupancy() | self.terrain) & region
+        cached = self.move_cache.get(figure)
+        if cached is not None and cached[0] == square and cached[1] == blockers:
+            return cached[2]
+
+        targets = 0
+        if diagonal:
+            paths = PATH_MASKS[True]
+            for target in iter_squares(region & ~blockers):
+                if not paths[square * 64 + target] & blockers:
+                    targets |= 1 << target
+        else:
+            # Everything else moves in straight lines, so walk each line until blocked
+            for direction in CHARGE_DIRECTIONS:
+                for target in RAYS[direction][square][:figure.move]:
+                    if blockers >> target & 1:
+                        break
+                    targets |= 1 << target
+        self.move_cache[figure] = (square, blockers, targets)
+        return targets
+
+    def attack_targets(self, figure: Figure) -> int:
+        """Bitboard of the enemies a figure can attack, ignoring its turn flags.
+
+        Cached like move_targets(), keyed on the enemies in reach as well,
+        so a conjured figure gets its new side's targets.
+        """
+        square = square_index(figure.position)
+        diagonal = figure.type == FigureType.ARBALIST
+        region = (CHEBYSHEV_MASKS if diagonal else MANHATTAN_MASKS)[figure.reach][square]
+        opponent = Player.TWO if figure.player == Player.ONE else Player.ONE
+        enemies = self.occupied[opponent] & region
+        blockers = (self.occupancy() | self.terrain) & region
+        cached = self.attack_cache.get(figure)
+        if (cached is not None and cached[0] == square and cached[1] == enemies
+                and cached[2] == blockers):
+            return cached[3]
+
+        targets = 0
+        paths = PATH_MASKS[diagonal]
+        for target in iter_squares(enemies):
+            path = paths[square * 64 + target]
+            if path is not None and not path & blockers:
+                targets |= 1 << target
+        self.attack_cache[figure] = (square, enemies, blockers, targets)
+        return targets
+
+    def special_actions(self, figure: Figure) -> List[Action]:
+        """A figure's charge, Long Eye or spell actions, ignoring its turn flags.
+
+        Cached like move_targets(), keyed on the occupancy of the figure's
+        threat region plus whatever else its specials read: a Black Mage's
+        life, bomb flag, start zone and dead pool, and which enemies in a
+        White Mage's reach are weak enough to conjure. The returned list is
+        shared with the cache, so copy it before changing it.
+        """
+        square = square_index(figure.position)
+        region = THREAT_REGIONS[figure.type][square]
+        opponent = Player.TWO if figure.player == Player.ONE else Player.ONE
+        enemies = self.occupied[opponent]
+        key = (square, figure.player, self.occupied[figure.player] & region, enemies & region)
+        if figure.type == FigureType.BLACK_MAGE:
+            key += (figure.life, self.magic_bomb_used[figure.player],
+                    self.occupancy() & START_ZONES[figure.player],
+                    tuple(dead.type for dead in self.dead_figures[figure.player]))
+        elif figure.type == FigureType.WHITE_MAGE:
+            weak = 0
+            for target in iter_squares(enemies & region):
+                if self.squares[target].life <= 2:
+                    weak |= 1 << target
+            key += (weak,)
+        cached = self.special_cache.get(figure)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        pos = figure.position
+        actions = []
+        if figure.type == FigureType.KNIGHT:
+            for direction in CHARGE_DIRECTIONS:
+                if self._charge_destination(figure, direction) is not None:
+                    actions.append(Action(ActionType.CHARGE, pos, direction=direction))
+        elif figure.type == FigureType.ARBALIST:
+            for direction in LONG_EYE_DIRECTIONS:
+                if self._long_eye_target(figure, direction) is not None:
+                    actions.append(Action(ActionType.LONG_EYE, pos, direction=direction))
+        elif figure.type == FigureType.BLACK_MAGE:
+            actions = self._black_mage_actions(figure, enemies)
+        elif figure.type == FigureType.WHITE_MAGE:
+            actions = self._white_mage_actions(figure, enemies)
+        self.special_cache[figure] = (key, actions)
+        return actions
+
+    def threat_map(self, player: Player) -> List[int]:
+        """Damage a player's figures could deal to an enemy on each square, indexed by square.
+
+        Each figure adds the most damage any one of its actions could deal
+        there: its basic attack, Long Eye, a charge, or Magic Bomb while the
+        bomb is unused. Turn flags are ignored, and so are Plague and the
+        Barbarian's extra damage from mages. Only figures whose
+        surroundings changed since the last call are recomputed. The
+        returned list is live, so copy it before changing the position if
+        the old values are needed.
+        """
+        self._refresh_threats()
+        return self.threat_maps[player]
+
+    def threatened(self, player: Player) -> int:
+        """Bitboard of the squares a player's figures threaten."""
+        self._refresh_threats()
+        mask = 0
+        for owner, _, _, squares in self.threat_cache.values():
+            if owner == player:
+                mask |= squares
+        return mask
+
+    def _refresh_threats(self):
+        """Bring threat_maps up to date with the figures on the board."""
+        # Threats follow from each figure's type, owner and square and the
+        # bomb flags, so an unchanged board needs no work at all
+        board = (self.occupied[Player.ONE], self.occupied[Player.TWO], *self.pieces.values(),
+                 self.magic_bomb_used[Player.ONE], self.magic_bomb_used[Player.TWO])
+        if board == self.threat_board:
+            return
+        self.threat_board = board
+
+        cache = self.threat_cache
+        for figure in [figure for figure in cache if figure.is_dead]:
+            self._add_threats(cache.pop(figure), -1)
+
+        one, two = board[0], board[1]
+        for figure in self.figures:
+            square = square_index(figure.position)
+            region = THREAT_REGIONS[figure.type][square]
+            key = (square, one & region, two & region,
+                   figure.type == FigureType.BLACK_MAGE and self.magic_bomb_used[figure.player])
+            entry = cache.get(figure)
+            if entry is not None:
+                if entry[0] == figure.player and entry[1] == key:
+                    continue
+                self._add_threats(entry, -1)
+            damages = self._figure_threats(figure)
+            squares = 0
+            for target, _ in damages:
+                squares |= 1 << target
+            entry = (figure.player, key, damages, squares)
+            cache[figure] = entry
+            self._add_threats(entry, 1)
+
+    def _add_threats(self, entry, sign: int):
+        """Add or remove one figure's cached contribution to its owner's threat map."""
+        owner, _, damages, _ = entry
+        threats = self.threat_maps[owner]
+        for square, damage in damages:
+            threats[square] += sign * damage
+
+    def _figure_threats(self, figure: Figure) -> List[Tuple[int, int]]:
+        """Most damage a figure could deal with one action, as (square, damage) pairs."""
+        square = square_index(figure.position)
+        occupancy = self.occupancy()
+        blockers = occupancy | self.terrain
+
+        # Basic attacks need a clear line up to, but not including, the target
+        if figure.type == FigureType.ARBALIST:
+            attacks = 0
+            for target, path in ARBALIST_SIGHT_LINES[square]:
+                if not path & blockers:
+                    attacks |= target
+        else:
+            attacks = 0
+            for direction in CHARGE_DIRECTIONS:
+                for target in RAYS[direction][square][:figure.reach]:
+                    attacks |= 1 << target
+                    if blockers >> target & 1:
+                        break
+        layers = [(figure.attack, attacks)]
+
+        if figure.type == FigureType.ARBALIST:
+            # Long Eye hits the first figure in line, if it is an enemy
+            friends = self.occupied[figure.player]
+            lines = 0
+            for direction in LONG_EYE_DIRECTIONS:
+                for target in RAYS[direction][square]:
+                    if friends >> target & 1:
+                        break
+                    lines |= 1 << target
+                    if occupancy >> target & 1:
+                        break
+            layers.append((1, lines))
+        elif figure.type == FigureType.KNIGHT:
+            # A charge damages every enemy in its lane, as long as it has somewhere to stop
+            lanes = 0
+            for direction in CHARGE_DIRECTIONS:
+                lane = 0
+                for target in RAYS[direction][square][:4]:
+                    if self.terrain >> target & 1:
+                        break
+                    lane |= 1 << target
+                empty = lane & ~occupancy
+                if empty & (empty - 1):
+                    lanes |= lane
+                elif empty:
+                    lanes |= lane & ~empty
+            layers.append((2, lanes))
+        elif figure.type == FigureType.BLACK_MAGE and not self.magic_bomb_used[figure.player]:
+            layers.append((2, BOMB_FOOTPRINTS[square]))
+
+        # Each square keeps the highest damage that reaches it
+        damages = []
+        covered = self.terrain
+        for damage, mask in sorted(layers, reverse=True):
+            for target in iter_squares(mask & ~covered):
+                damages.append((target, damage))
+            covered |= mask
+        return damages
+
+    def _charge_destination(self, knight: Figure, direction: str):
+        """Square a knight charge in the given direction would end on."""
+        final_pos = None
+        for square in RAYS[direction][square_index(knight.position)][:4]:
+            if self.terrain >> square & 1:
+                break
+            if self.squares[square] is None:
+                final_pos = square_position(square)
+        return final_pos
+
+    def _long_eye_target(self, arbalist: Figure, direction: str):
+        """First enemy hit by Long Eye in the given direction, if any."""
+        for square in RAYS[direction][square_index(arbalist.position)]:
+            target = self.squares[square]
+            if target:
+                return target if target.player != arbalist.player else None
+        return None
+
+    def _black_mage_actions(self, mage: Figure, enemies: int):
+        """Magic Bomb, Plague and Vampiric Push actions for a Black Mage."""
+        pos = mage.position
+        reach = MANHATTAN_MASKS[mage.reach][square_index(pos)]
+        actions = []
+
+        if not self.magic_bomb_used[mage.player]:
+            for target in iter_squares(reach):
+                actions.append(Action(ActionType.MAGIC_BOMB, pos, square_position(target)))
+
+        for target in iter_squares(enemies & reach):
+            target_pos = square_position(target)
+            for x in range(1, mage.life):
+                actions.append(Action(ActionType.PLAGUE, pos, target_pos, value=x))
+
+        # The mage pays 1 life first, so a mage on 1 life can never resurrect
+        if mage.life > 1:
+            free = [square_position(square)
+                    for square in iter_squares(START_ZONES[mage.player] & ~self.occupancy())]
+            seen = set()
+            for i, dead in enumerate(self.dead_figures[mage.player]):
+                # Resurrected figures come back identical, so one per type is enough
+                if dead.type in seen:
+                    continue
+                seen.add(dead.type)
+                for target in free:
+                    actions.append(Action(ActionType.VAMPIRIC_PUSH, pos, target, value=i))
+
+        return actions
+
+    def _white_mage_actions(self, mage: Figure, enemies: int):
+        """Conjure, Heal and Counter Containment actions for a White Mage."""
+        pos = mage.position
+        reach = MANHATTAN_MASKS[mage.reach][square_index(pos)]
+        actions = []
+        for target in iter_squares(enemies & reach):
+            target_pos = square_position(target)
+            if self.squares[target].life <= 2:
+                actions.append(Action(ActionType.CONJURE, pos, target_pos))
+            actions.append(Action(ActionType.HEAL, pos, target_pos))
+            actions.append(Action(ActionType.CONTAIN, pos, target_pos))
+        for target in iter_squares(self.occupied[mage.player] & reach):
+            actions.append(Action(ActionType.HEAL, pos, square_position(target)))
+        return actions
+
+    def perform(self, action: Action):
+        """Carry out an action record through the matching action method."""
+        kind = action.kind
+        if kind == ActionType.END_TURN:
+            self.end_turn()
+            return True, "Turn ended"
+
+        figure = self.get_figure_at(action.origin)
+        if figure is None:
+            return False, "No figure at origin"
+
+        if kind == ActionType.MOVE:
+            return self.move_figure(figure, action.target)
+        if kind == ActionType.ATTACK:
+            return self.attack(figure, action.target)
+        if kind == ActionType.CHARGE:
+            return self.knight_charge(figure, action.direction)
+        if kind == ActionType.LONG_EYE:
+            return self.arbalist_long_eye(figure, action.direction)
+        if kind == ActionType.MAGIC_BOMB:
+            return self.black_mage_magic_bomb(figure, action.target)
+        if kind == ActionType.VAMPIRIC_PUSH:
+            pool = self.dead_figures[figure.player]
+            if not 0 <= action.value < len(pool):
+                return False, "Invalid figure selection"
+            return self.black_mage_vampiric_push(figure, pool[action.value], action.target)
+
+        target = self.get_figure_at(action.target)
+        if target is None:
+            return False, "No target at that position"
+        if kind == ActionType.PLAGUE:
+            return self.black_mage_plague(figure, target, action.value)
+        if kind == ActionType.CONJURE:
+            return self.white_mage_conjure(figure, target)
+        if kind == ActionType.HEAL:
+            return self.white_mage_heal(figure, target)
+        if kind == ActionType.CONTAIN:
+            return self.white_mage_counter_containment(figure, target)
+        return False, "Unknown action"
+
+    def apply(self, action: Action):
+        """Perform an action, recording what it changes so undo() can revert it.
+
+        Every apply() must be paired with an undo(), even when the action
+        fails, since a failed Vampiric Push still costs the mage its life.
+        """
+        self.history.append(_Delta((
+            self.occupied[Player.ONE], self.occupied[Player.TWO], tuple(self.pieces.values()),
+            self.moved, self.acted, self.contained,
+            self.scores[Player.ONE], self.scores[Player.TWO],
+            self.live_counts[Player.ONE], self.live_counts[Player.TWO],
+            self.magic_bomb_used[Player.ONE], self.magic_bomb_used[Player.TWO],
+            self.current_player, self.turn_count, self.game_over, self.winner, self.hash,
+        )))
+        return self.perform(action)
+
+    def undo(self):
+        """Revert the most recent apply()."""
+        delta = self.history.pop()
+
+        # Clear the touched figures' squares before putting anyone back
+        for figure in delta.figures:
+            if not figure.is_dead:
+                self.squares[square_index(figure.position)] = None
+        for figure, saved in delta.figures.items():
+            (figure.position, figure.player, figure.life, figure.is_dead,
+             figure.has_moved, figure.has_acted, figure.counter_containment_turns) = saved
+            if not figure.is_dead:
+                self.squares[square_index(figure.position)] = figure
+
+        if delta.lists is not None:
+            self.figures, self.dead_figures[Player.ONE], self.dead_figures[Player.TWO] = delta.lists
+
+        (self.occupied[Player.ONE], self.occupied[Player.TWO], pieces,
+         self.moved, self.acted, self.contained,
+         self.scores[Player.ONE], self.scores[Player.TWO],
+         self.live_counts[Player.ONE], self.live_counts[Player.TWO],
+         self.magic_bomb_used[Player.ONE], self.magic_bomb_used[Player.TWO],
+         self.current_player, self.turn_count, self.game_over, self.winner, self.hash) = delta.scalars
+        for figure_type, mask in zip(self.pieces, pieces):
+            self.pieces[figure_type] = mask
+
     def end_turn(self):
         """End the current turn and switch players."""
         # Reset figure states
-        for figure in self.figures:
-            if figure.player == self.current_player:
-                figure.has_moved = False
-                figure.has_acted = False
+        own = self.occupied[self.current_player]
+        for square in iter_squares((self.moved | self.acted) & own):
+            figure = self.squares[square]
+            self._touch(figure)
+            if figure.has_moved:
+                self.hash ^= ZOBRIST_MOVED[square]
+            if figure.has_acted:
+                self.hash ^= ZOBRIST_ACTED[square]
+            figure.has_moved = False
+            figure.has_acted = False
+        self.moved &= ~own
+        self.acted &= ~own
 
         # Decrement containment counters
-        for figure in self.figures:
-            if figure.counter_containment_turns > 0:
-                figure.counter_containment_turns -= 1
+        for square in iter_squares(self.contained):
+            figure = self.squares[square]
+            self._touch(figure)
+            contained_keys = ZOBRIST_CONTAINED[square]
+            self.hash ^= contained_keys[figure.counter_containment_turns]
+            figure.counter_containment_turns -= 1
+            self.hash ^= contained_keys[figure.counter_containment_turns]
+            if figure.counter_containment_turns == 0:
+                self.contained &= ~(1 << square)
 
         # Switch player
         self.current_player = Player.TWO if self.current_player == Player.ONE else Player.ONE
+        self.hash ^= ZOBRIST_SIDE
         self.turn_count += 1
 
         # Check win conditions
@@ -500,18 +1397,26 @@ class GameState:
 
     def _deal_damage(self, target: Figure, damage: int):
         """Deal damage to a figure."""
-        target.life -= damage
-        if target.life <= 0 and not target.is_dead:
-            target.life = 0
+        if target.is_dead:
+            return
+
+        self._touch(target)
+        life = max(target.life - damage, 0)
+        life_keys = ZOBRIST_LIFE[square_index(target.position)]
+        self.hash ^= life_keys[target.life] ^ life_keys[life]
+        target.life = life
+        if life == 0:
             target.is_dead = True
-            row, col = target.position
-            self.board[row][col] = None
+            self._touch_lists()
+            self._lift(target)
             self.figures.remove(target)
+            self.live_counts[target.player] -= 1
             self.dead_figures[target.player].append(target)
+            self.hash ^= self._dead_key(target.player, target.type)
 
             # Award point to opponent
             opponent = Player.TWO if target.player == Player.ONE else Player.ONE
-            self.scores[opponent] += 1
+            self._add_score(opponent, 1)
 
     def _in_reach(self, from_pos: Tuple[int, int], to_pos: Tuple[int, int], reach: int):
         """Check if a position is within reach."""
@@ -520,94 +1425,113 @@ class GameState:
         distance = abs(tr - fr) + abs(tc - fc)
         return distance <= reach
 
-    def _is_path_clear(self, from_pos: Tuple[int, int], to_pos: Tuple[int, int],
-                       diagonal: bool = False, check_target: bool = True):
-        """Check if path between two positions is clear."""
+    def _distance(self, from_pos: Tuple[int, int], to_pos: Tuple[int, int], diagonal: bool = False):
+        """Chebyshev distance for diagonal movers, Manhattan distance otherwise."""
         fr, fc = from_pos
         tr, tc = to_pos
+        if diagonal:
+            return max(abs(tr - fr), abs(tc - fc))
+        return abs(tr - fr) + abs(tc - fc)
 
-        if not diagonal:
-            # Must be straight line
-            if fr != tr and fc != tc:
-                return False
-
-        # Generate path
-        steps = max(abs(tr - fr), abs(tc - fc))
-
-        if steps == 0:
-            return True
-
-        dr = (tr - fr) / steps if steps > 0 else 0
-        dc = (tc - fc) / steps if steps > 0 else 0
+    def _is_path_clear(self, from_pos: Tuple[int, int], to_pos: Tuple[int, int],
+                       diagonal: bool = False, check_target: bool = True):
+        """Check if path between two positions is clear."""
+        from_square = square_index(from_pos)
+        to_square = square_index(to_pos)
 
-        for i in range(1, steps + (0 if check_target else 1)):
-            r = int(fr + dr * i)
-            c = int(fc + dc * i)
-            if self.get_figure_at((r, c)) is not None:
-                return False
-            if self.is_terrain((r, c)):
-                return False
+        # Straight movers need a straight line
+        path = PATH_MASKS[diagonal][from_square * 64 + to_square]
+        if path is None:
+            return False
 
-        return True
+        # The target square is only walked when check_target is set
+        if check_target and from_square != to_square:
+            path |= 1 << to_square
+
+        return not path & (self.occupancy() | self.terrain)
+
+    def decided_winner(self) -> Optional[Player]:
+        """The player who would win if the turn ended now, or None.
+
+        Reads the live scores and figure counts, so search code can call it
+        mid-turn to spot a decisive kill. It is only provisional until
+        end_turn: a Vampiric Push can still take a point back.
+        """
+        scores = self.scores
+        if scores[Player.ONE] >= WINNING_SCORE:
+            return Player.ONE
+        if scores[Player.TWO] >= WINNING_SCORE:
+            return Player.TWO
+        if not self.live_counts[Player.ONE]:
+            return Player.TWO
+        if not self.live_counts[Player.TWO]:
+            return Player.ONE
+        return None
 
     def _check_win_conditions(self):
         """Check if game is over."""
-        # Check for 4 points
-        for player in [Player.ONE, Player.TWO]:
-            if self.scores[player] >= 4:
-                self.game_over = True
-                self.winner = player
-                return
-
-        # Check if a player has no figures
-        player_one_figures = [f for f in self.figures if f.player == Player.ONE]
-        player_two_figures = [f for f in self.figures if f.player == Player.TWO]
-
-        if not player_one_figures:
+        winner = self.decided_winner()
+        if winner is not None:
             self.game_over = True
-            self.winner = Player.TWO
-        elif not player_two_figures:
-            self.game_over = True
-            self.winner = Player.ONE
+            self.winner = winner
+
+    def board_cells(self) -> List[str]:
+        """The text shown on each square, indexed by square number."""
+        cells = [EMPTY_CELL] * 64
+        for square in iter_squares(self.terrain):
+            cells[square] = TERRAIN_CELL
+        squares = self.squares
+        for square in iter_squares(self.occupancy()):
+            figure = squares[square]
+            cells[square] = FIGURE_CELLS[figure.player, figure.type]
+        return cells
+
+    def status_lines(self) -> List[str]:
+        """The score and turn lines shown under the board."""
+        lines = [f"Scores - P1: {self.scores[Player.ONE]}, P2: {self.scores[Player.TWO]}",
+                 f"Current Player: {self.current_player.value}"]
+        for player in [Player.ONE, Player.TWO]:
+            if self.magic_bomb_used[player]:
+                lines.append(f"Player {player.value} has used Magic Bomb")
+        return lines
+
+    def render_board(self) -> str:
+        """The text display_board prints, built in one piece."""
+        cells = self.board_cells()
+        lines = ["", BOARD_HEADER]
+        for row in range(8):
+            lines.append(f"{row} " + "".join(cell + " " for cell in cells[row * 8:row * 8 + 8]))
+        lines.append("")
+        lines.extend(self.status_lines())
+        return "\n".join(lines) + "\n"
 
     def display_board(self):
         """Display the current board state."""
-        print("\n  0 1 2 3 4 5 6 7")
-        for row in range(8):
-            print(f"{row} ", end="")
-            for col in range(8):
-                if (row, col) in self.terrain:
-                    print("XX", end="")
-                else:
-                    figure = self.board[row][col]
-                    if figure:
-                        # Display figure abbreviation with player indicator
-                        abbr = {
-                            FigureType.KNIGHT: "Kn",
-                            FigureType.BARBARIAN: "Ba",
-                            FigureType.ARBALIST: "Ar",
-                            FigureType.BLACK_MAGE: "BM",
-                            FigureType.WHITE_MAGE: "WM"
-                        }
-                        player_symbol = "1" if figure.player == Player.ONE else "2"
-                        print(f"{abbr[figure.type]}{player_symbol}", end="")
-                    else:
-                        print("...", end="")
-                print(" ", end="")
-            print()
+        sys.stdout.write(self.render_board())
 
-        print(f"\nScores - P1: {self.scores[Player.ONE]}, P2: {self.scores[Player.TWO]}")
-        print(f"Current Player: {self.current_player.value}")
-        if self.magic_bomb_used[Player.ONE]:
-            print("Player 1 has used Magic Bomb")
-        if self.magic_bomb_used[Player.TWO]:
-            print("Player 2 has used Magic Bomb")
 
+ROSTER = [
+    FigureType.KNIGHT,
+    FigureType.BARBARIAN,
+    FigureType.ARBALIST,
+    FigureType.BLACK_MAGE,
+    FigureType.WHITE_MAGE
+]
 
 class Game:
-    def __init__(self):
+    def __init__(self, agents: Optional[Dict[Player, object]] = None, recorder=None):
         self.state = GameState()
         self.setup_complete = False
+        # Computer players, anything with a choose_action(state) method
+        self.agents = agents or {}
+        # Anything with a record(state, action) method, such as replay.ReplayWriter
+        self.recorder = recorder
+
+    def act(self, action: Action):
+        """Perform an action on the game state, passing it to the recorder first."""
+        if self.recorder is not None:
+            self.recorder.record(self.state, action)
+        return self.state.perform(action)
 
     def setup_game(self):
         """Interactive setup for placing figures."""
@@ -619,18 +1543,15 @@ class Game:
         print()
 
         # Players choose their figures
-        available_types = [
-            FigureType.KNIGHT,
-            FigureType.BARBARIAN,
-            FigureType.ARBALIST,
-            FigureType.BLACK_MAGE,
-            FigureType.WHITE_MAGE
-        ]
-
         for player in [Player.ONE, Player.TWO]:
             self.current_player = player
+            if player in self.agents:
+                self.place_randomly(player)
+                print(f"\nPlayer {player.value} (computer) placed their figures")
+                continue
+
             print(f"\nPlayer {player.value} - Place your figures in your start zone")
-            for fig_type in available_types:
+            for fig_type in ROSTER:
                 figure = Figure(fig_type, player)
 
                 while True:
@@ -651,6 +1572,13 @@ class Game:
         self.setup_complete = True
         print("\n=== Setup complete! Game begins ===")
 
+    def place_randomly(self, player: Player, rng: Optional[random.Random] = None):
+        """Place a player's figures on random squares of their start zone."""
+        rng = rng or random
+        squares = rng.sample(self.state.get_start_zone(player), len(ROSTER))
+        for fig_type, pos in zip(ROSTER, squares):
+            self.state.place_figure(Figure(fig_type, player), pos)
+
     def play(self):
         """Main game loop."""
         if not self.setup_complete:
@@ -662,13 +1590,14 @@ class Game:
 
             print(f"\n=== Player {self.state.current_player.value}'s Turn ===")
 
-            # Get player's figures
-            player_figures = [f for f in self.state.figures
-                            if f.player == self.state.current_player]
-
-            if not player_figures:
+            if not self.state.live_counts[self.state.current_player]:
                 print("No figures to control!")
-                self.state.end_turn()
+                self.act(Action(ActionType.END_TURN))
+                continue
+
+            agent = self.agents.get(self.state.current_player)
+            if agent is not None:
+                self.play_agent_turn(agent)
                 continue
 
             # Player actions
@@ -677,7 +1606,7 @@ class Game:
                 action = input("Choose action: ").strip().lower()
 
                 if action == "end":
-                    self.state.end_turn()
+                    self.act(Action(ActionType.END_TURN))
                     break
                 elif action == "move":
                     self.handle_move()
@@ -693,14 +1622,47 @@ class Game:
         print(f"Winner: Player {self.state.winner.value}")
         print(f"Final Scores - P1: {self.state.scores[Player.ONE]}, P2: {self.state.scores[Player.TWO]}")
 
+    def play_agent_turn(self, agent):
+        """Let a computer player take actions until its turn ends."""
+        player = self.state.current_player
+        while not self.state.game_over and self.state.current_player == player:
+            action, msg = self.agent_step(agent)
+            print(f"Player {player.value}: {action} - {msg}")
+
+    def agent_step(self, agent):
+        """Ask a computer player for one action and carry it out."""
+        action = agent.choose_action(self.state)
+        success, msg = self.act(action)
+        if not success:
+            # Never let a misbehaving agent stall the game
+            self.act(Action(ActionType.END_TURN))
+        return action, msg
+
+    def play_headless(self, rng: Optional[random.Random] = None, max_turns: Optional[int] = None):
+        """Play a game between computer players without any input or output.
+
+        Figures are placed randomly from rng unless setup is already done.
+        Returns the winner, or None if max_turns ran out first.
+        """
+        if not self.setup_complete:
+            for player in [Player.ONE, Player.TWO]:
+                self.place_randomly(player, rng)
+            self.setup_complete = True
+
+        while not self.state.game_over:
+            if max_turns is not None and self.state.turn_count >= max_turns:
+                return None
+            self.agent_step(self.agents[self.state.current_player])
+        return self.state.winner
+
     def display_figures(self):
         """Display all figures and their status."""
-        print("\n--- Active Figures ---")
+        lines = ["", "--- Active Figures ---"]
         for player in [Player.ONE, Player.TWO]:
-            print(f"Player {player.value}:")
-            figures = [f for f in self.state.figures if f.player == player]
+            lines.append(f"Player {player.value}:")
+            figures = self.state.figures_of(player)
             if not figures:
-                print("  No active figures")
+                lines.append("  No active figures")
             for fig in figures:
                 status = []
                 if fig.has_moved:
@@ -710,14 +1672,15 @@ class Game:
                 if fig.counter_containment_turns > 0:
                     status.append(f"contained({fig.counter_containment_turns})")
                 status_str = f" [{', '.join(status)}]" if status else ""
-                print(f"  {fig}{status_str} at {fig.position}")
+                lines.append(f"  {fig}{status_str} at {fig.position}")
 
         # Show dead figures
         for player in [Player.ONE, Player.TWO]:
             if self.state.dead_figures[player]:
-                print(f"Player {player.value} dead figures:")
+                lines.append(f"Player {player.value} dead figures:")
                 for fig in self.state.dead_figures[player]:
-                    print(f"  {fig.type.value}")
+                    lines.append(f"  {fig.type.value}")
+        print("\n".join(lines))
 
     def get_figure_at_position(self):
         """Helper to get a figure by position input."""
@@ -744,7 +1707,7 @@ class Game:
             new_row = int(input("Move to row (0-7): "))
             new_col = int(input("Move to col (0-7): "))
 
-            success, msg = self.state.move_figure(figure, (new_row, new_col))
+            success, msg = self.act(Action(ActionType.MOVE, figure.position, (new_row, new_col)))
             print(msg)
         except ValueError:
             print("Invalid input")
@@ -759,7 +1722,7 @@ class Game:
             target_row = int(input("Target row (0-7): "))
             target_col = int(input("Target col (0-7): "))
 
-            success, msg = self.state.attack(figure, (target_row, target_col))
+            success, msg = self.act(Action(ActionType.ATTACK, figure.position, (target_row, target_col)))
             print(msg)
         except ValueError:
             print("Invalid input")
@@ -772,12 +1735,12 @@ class Game:
 
         if figure.type == FigureType.KNIGHT:
             direction = input("Charge direction (up/down/left/right): ").strip().lower()
-            success, msg = self.state.knight_charge(figure, direction)
+            success, msg = self.act(Action(ActionType.CHARGE, figure.position, direction=direction))
             print(msg)
 
         elif figure.type == FigureType.ARBALIST:
             direction = input("Long Eye direction (up/down/left/right/up-left/up-right/down-left/down-right): ")
-            success, msg = self.state.arbalist_long_eye(figure, direction)
+            success, msg = self.act(Action(ActionType.LONG_EYE, figure.position, direction=direction))
             print(msg)
 
         elif figure.type == FigureType.BLACK_MAGE:
@@ -788,7 +1751,7 @@ class Game:
                 try:
                     row = int(input("Bomb target row (0-7): "))
                     col = int(input("Bomb target col (0-7): "))
-                    success, msg = self.state.black_mage_magic_bomb(figure, (row, col))
+                    success, msg = self.act(Action(ActionType.MAGIC_BOMB, figure.position, (row, col)))
                     print(msg)
                 except ValueError:
                     print("Invalid input")
@@ -800,7 +1763,7 @@ class Game:
                     target = self.state.get_figure_at((row, col))
                     if target:
                         x = int(input(f"Sacrifice life (1-{figure.life-1}): "))
-                        success, msg = self.state.black_mage_plague(figure, target, x)
+                        success, msg = self.act(Action(ActionType.PLAGUE, figure.position, (row, col), value=x))
                         print(msg)
                     else:
                         print("No target at that position")
@@ -819,10 +1782,10 @@ class Game:
                 try:
                     fig_idx = int(input("Choose figure to resurrect: "))
                     if 0 <= fig_idx < len(self.state.dead_figures[figure.player]):
-                        dead_fig = self.state.dead_figures[figure.player][fig_idx]
                         row = int(input("Resurrect at row (0-7): "))
                         col = int(input("Resurrect at col (0-7): "))
-                        success, msg = self.state.black_mage_vampiric_push(figure, dead_fig, (row, col))
+                        success, msg = self.act(Action(ActionType.VAMPIRIC_PUSH, figure.position,
+                                                       (row, col), value=fig_idx))
                         print(msg)
                     else:
                         print("Invalid figure selection")
@@ -839,7 +1802,7 @@ class Game:
                     col = int(input("Target col (0-7): "))
                     target = self.state.get_figure_at((row, col))
                     if target:
-                        success, msg = self.state.white_mage_conjure(figure, target)
+                        success, msg = self.act(Action(ActionType.CONJURE, figure.position, (row, col)))
                         print(msg)
                     else:
                         print("No target at that position")
@@ -852,7 +1815,7 @@ class Game:
                     col = int(input("Target col (0-7): "))
                     target = self.state.get_figure_at((row, col))
                     if target:
-                        success, msg = self.state.white_mage_heal(figure, target)
+                        success, msg = self.act(Action(ActionType.HEAL, figure.position, (row, col)))
                         print(msg)
                     else:
                         print("No target at that position")
@@ -865,7 +1828,7 @@ class Game:
                     col = int(input("Target col (0-7): "))
                     target = self.state.get_figure_at((row, col))
                     if target:
-                        success, msg = self.state.white_mage_counter_containment(figure, target)
+                        success, msg = self.act(Action(ActionType.CONTAIN, figure.position, (row, col)))
                         print(msg)
                     else:
                         print("No target at that position")
@@ -881,7 +1844,32 @@ class Game:
 
 def main():
     """Main function to start the game."""
-    game = Game()
+    parser = argparse.ArgumentParser(description="Motley Crew tactical board game")
+    parser.add_argument("--ai", type=int, choices=[1, 2], action="append", default=[],
+                        help="let the computer play this player (repeatable)")
+    parser.add_argument("--think-time", type=float, default=5.0,
+                        help="seconds the computer may think per turn")
+    parser.add_argument("--log", metavar="PATH",
+                        help="write every action to a new binary replay log")
+    args = parser.parse_args()
+
+    # The modules below import this one as "main", so share this copy when run as a script
+    sys.modules.setdefault("main", sys.modules[__name__])
+
+    agents = {}
+    if args.ai:
+        from search import AlphaBetaPlayer
+        agents = {Player(number): AlphaBetaPlayer(turn_time=args.think_time) for number in args.ai}
+
+    recorder = None
+    if args.log:
+        from replay import ReplayWriter
+        try:
+            recorder = ReplayWriter(args.log)
+        except FileExistsError:
+            parser.error(f"{args.log} already exists; choose a new log file")
+
+    game = Game(agents, recorder)
     try:
         game.play()
     except KeyboardInterrupt:
@@ -889,6 +1877,9 @@ def main():
     except Exception as e:
         print(f"\nAn error occurred: {e}")
         print("Game terminated.")
+    finally:
+        if recorder is not None:
+            recorder.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,281 @@
+import copy
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from main import Action, ActionType, GameState, Player, iter_squares
+from search import evaluate
+
+END_TURN = Action(ActionType.END_TURN)
+
+# A playout policy picks the next action for the side to move
+PlayoutPolicy = Callable[[GameState, random.Random], Action]
+
+def random_policy(state: GameState, rng: random.Random) -> Action:
+    """Give a random ready figure a random action, ending the turn once nobody can act.
+
+    Only the chosen figure's actions are generated, which makes this much
+    cheaper per ply than sampling from legal_actions().
+    """
+    player = state.current_player
+    ready = list(iter_squares(state.occupied[player] & ~state.acted & ~state.contained))
+    rng.shuffle(ready)
+    for square in ready:
+        actions = state.figure_actions(state.squares[square])
+        if actions:
+            return rng.choice(actions)
+    return END_TURN
+
+def win_probability(state: GameState, player: Player, scale: float = 40.0) -> float:
+    """Squash the static evaluation into a 0-1 result for a player."""
+    if state.game_over:
+        return 1.0 if state.winner == player else 0.0
+    return 1.0 / (1.0 + math.exp(-evaluate(state, player) / scale))
+
+class Node:
+    """A node of the search tree, reached by playing action from its parent."""
+    __slots__ = ("action", "parent", "player", "children", "untried", "visits", "wins")
+
+    def __init__(self, action: Optional[Action], parent: Optional["Node"], player: Optional[Player]):
+        self.action = action
+        self.parent = parent
+        self.player = player  # who played action, and whose wins are counted here
+        self.children: List[Node] = []
+        self.untried: Optional[List[Action]] = None
+        self.visits = 0
+        self.wins = 0.0
+
+    def select_child(self, exploration: float) -> "Node":
+        """Pick the child with the highest UCT score."""
+        log_visits = math.log(self.visits)
+        best, best_score = None, -1.0
+        for child in self.children:
+            score = (child.wins / child.visits
+                     + exploration * math.sqrt(log_visits / child.visits))
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+class MCTSPlayer:
+    """UCT Monte Carlo tree search player.
+
+    The tree is walked with GameState.apply/undo on the live state, so no
+    copies are made. Playouts stop at a terminal position or after
+    max_playout_plies, where the static evaluation stands in for the result.
+    """
+
+    def __init__(self, time_limit: float = 1.0, iterations: Optional[int] = None,
+                 exploration: float = 1.4, playout_policy: PlayoutPolicy = random_policy,
+                 max_playout_plies: int = 10, seed: Optional[int] = None):
+        self.time_limit = time_limit
+        self.iterations = iterations
+        self.exploration = exploration
+        self.playout_policy = playout_policy
+        self.max_playout_plies = max_playout_plies
+        self.rng = random.Random(seed)
+        self.playout_plies = 0
+
+    def choose_action(self, state: GameState) -> Action:
+        """Pick the most visited action after searching from the current position.
+
+        Ties, common when the budget barely covers the root's actions, go to
+        the action with the most wins.
+        """
+        root = self.search(state)
+        if not root.children:
+            return END_TURN
+        return max(root.children, key=lambda child: (child.visits, child.wins)).action
+
+    def search(self, state: GameState) -> Node:
+        """Grow a tree from the current position and return its root."""
+        root = Node(None, None, None)
+        deadline = time.perf_counter() + self.time_limit
+        self.playout_plies = 0
+        done = 0
+        while True:
+            if self.iterations is not None:
+                if done >= self.iterations:
+                    break
+            elif time.perf_counter() >= deadline:
+                break
+            self.iterate(state, root)
+            done += 1
+        return root
+
+    def iterate(self, state: GameState, root: Node):
+        """Run one selection, expansion, playout and backpropagation pass."""
+        depth = len(state.history)
+        try:
+            node = self._descend(state, root)
+            result = self._playout(state)
+        finally:
+            while len(state.history) > depth:
+                state.undo()
+        self._backpropagate(node, result)
+
+    def _descend(self, state: GameState, root: Node, virtual_loss: int = 0) -> Node:
+        """Select down the tree and expand one new child, applying actions as it goes.
+
+        A virtual loss adds visits without wins along the path, steering
+        other threads sharing the tree towards different lines.
+        """
+        node = root
+        node.visits += virtual_loss
+        while node.untried is not None and not node.untried and node.children:
+            node = node.select_child(self.exploration)
+            node.visits += virtual_loss
+            state.apply(node.action)
+
+        if node.untried is None:
+            node.untried = state.legal_actions(state.current_player)
+            self.rng.shuffle(node.untried)
+            # Untried actions are popped from the end, so ending the turn, which
+            # forfeits every remaining figure's action, is expanded last
+            node.untried.sort(key=lambda action: action.kind != ActionType.END_TURN)
+        if node.untried:
+            action = node.untried.pop()
+            child = Node(action, node, state.current_player)
+            child.visits = virtual_loss
+            node.children.append(child)
+            state.apply(action)
+            node = child
+        return node
+
+    def _playout(self, state: GameState) -> float:
+        """Play on with the playout policy and return Player.ONE's result."""
+        result, plies = self._rollout(state, self.rng)
+        self.playout_plies += plies
+        return result
+
+    def _rollout(self, state: GameState, rng: random.Random):
+        """Play on with the playout policy, returning Player.ONE's result and the plies played."""
+        plies = 0
+        while plies < self.max_playout_plies and not state.game_over:
+            state.apply(self.playout_policy(state, rng))
+            plies += 1
+        return win_probability(state, Player.ONE), plies
+
+    @staticmethod
+    def _backpropagate(node: Node, result: float, virtual_loss: int = 0):
+        """Add a playout result to every node on the path, replacing virtual losses."""
+        while node is not None:
+            node.visits += 1 - virtual_loss
+            if node.player is not None:
+                node.wins += result if node.player == Player.ONE else 1.0 - result
+            node = node.parent
+
+    @staticmethod
+    def root_statistics(root: Node) -> Dict[Action, List[float]]:
+        """Visits and wins of each root action."""
+        return {child.action: [child.visits, child.wins] for child in root.children}
+
+
+def _root_worker(record: bytes, seed: int, options: dict) -> Dict[Action, List[float]]:
+    """Search one independent tree in a worker process, from a GameState.to_bytes() record."""
+    player = MCTSPlayer(seed=seed, **options)
+    return MCTSPlayer.root_statistics(player.search(GameState.from_bytes(record)))
+
+class RootParallelMCTSPlayer:
+    """Root-parallel MCTS across processes.
+
+    Every worker grows its own tree from the same position with a different
+    seed, and the root visit counts are summed before picking the most
+    visited action. Trees share nothing, so playouts per second scale with
+    the number of workers.
+    """
+
+    def __init__(self, workers: Optional[int] = None, seed: Optional[int] = None, **options):
+        self.workers = workers or os.cpu_count() or 1
+        self.options = options  # passed through to each worker's MCTSPlayer
+        self.rng = random.Random(seed)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def choose_action(self, state: GameState) -> Action:
+        """Pick the action with the most visits summed over every worker's tree, then the most wins."""
+        totals = self.search(state)
+        if not totals:
+            return END_TURN
+        return max(totals, key=lambda action: totals[action])
+
+    def search(self, state: GameState) -> Dict[Action, List[float]]:
+        """Run one tree per worker and merge their root statistics."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+        record = state.to_bytes()  # far smaller and quicker to ship than a pickled GameState
+        futures = [self._pool.submit(_root_worker, record, self.rng.getrandbits(32), self.options)
+                   for _ in range(self.workers)]
+
+        totals: Dict[Action, List[float]] = {}
+        for future in futures:
+            for action, (visits, wins) in future.result().items():
+                merged = totals.setdefault(action, [0, 0.0])
+                merged[0] += visits
+                merged[1] += wins
+        return totals
+
+    def close(self):
+        """Shut down the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+class SharedTreeMCTSPlayer(MCTSPlayer):
+    """Tree-parallel MCTS: several threads grow one tree, kept apart by virtual loss.
+
+    Each thread searches its own copy of the state. Tree updates happen under
+    a lock and playouts run outside it, each thread drawing from its own
+    random generator and counting its own playout plies. Under the GIL the threads interleave
+    rather than run in parallel, so this only scales on free-threaded Python
+    builds; use RootParallelMCTSPlayer for multi-core throughput otherwise.
+    """
+
+    def __init__(self, threads: int = 4, virtual_loss: int = 1, **options):
+        super().__init__(**options)
+        if virtual_loss < 1:
+            raise ValueError("virtual_loss must be at least 1")
+        self.threads = threads
+        self.virtual_loss = virtual_loss
+        self._lock = threading.Lock()
+
+    def search(self, state: GameState) -> Node:
+        """Grow one shared tree from the current position with every thread."""
+        root = Node(None, None, None)
+        deadline = time.perf_counter() + self.time_limit
+        self.playout_plies = 0
+        budget = [self.iterations]
+        seed = self.rng.getrandbits(32)
+        plies = [0] * self.threads
+
+        def worker(index: int, local: GameState):
+            rng = random.Random(seed + index)
+            while True:
+                with self._lock:
+                    if budget[0] is not None:
+                        if budget[0] <= 0:
+                            return
+                        budget[0] -= 1
+                    elif time.perf_counter() >= deadline:
+                        return
+                    node = self._descend(local, root, self.virtual_loss)
+                result, played = self._rollout(local, rng)
+                plies[index] += played
+                while local.history:
+                    local.undo()
+                with self._lock:
+                    self._backpropagate(node, result, self.virtual_loss)
+
+        workers = []
+        for index in range(self.threads):
+            local = copy.deepcopy(state)
+            local.history = []
+            workers.append(threading.Thread(target=worker, args=(index, local)))
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.playout_plies = sum(plies)
+        return root
@@ -0,0 +1,91 @@
+import argparse
+import sys
+import time
+from typing import Dict
+
+from main import Action, GameState
+
+# Reference positions as GameState.to_bytes() records
+REFERENCE_SETUPS = {
+    # Mirrored opening: knights, barbarians and mages on the second row, arbalists behind
+    "opening": "8983f6830b8474848482fb828283fd830e82718200000000000000",
+    # Turn 20 of a random game: figures in contact, dead pools on both sides,
+    # a contained knight and both Magic Bombs spent
+    "skirmish": "e880b3a10080418000817f8240809782f581068202010314000000",
+}
+
+# Leaf counts for depths 1, 2, ... from each reference setup. A ply is one action.
+REFERENCE_COUNTS = {
+    "opening": [50, 2073, 69179, 1804684],
+    "skirmish": [36, 961, 18562, 259896, 2951169],
+}
+
+def reference_state(name: str) -> GameState:
+    """A fresh copy of a reference setup."""
+    return GameState.from_bytes(bytes.fromhex(REFERENCE_SETUPS[name]))
+
+def perft(state: GameState, depth: int) -> int:
+    """Count the legal action sequences of a given length, walking them with apply/undo."""
+    actions = state.legal_actions(state.current_player)
+    if depth <= 1:
+        return len(actions) if depth == 1 else 1
+    nodes = 0
+    for action in actions:
+        state.apply(action)
+        try:
+            nodes += perft(state, depth - 1)
+        finally:
+            state.undo()
+    return nodes
+
+def divide(state: GameState, depth: int) -> Dict[Action, int]:
+    """Sequence counts split by first action, for narrowing down a mismatch."""
+    counts = {}
+    for action in state.legal_actions(state.current_player):
+        state.apply(action)
+        try:
+            counts[action] = perft(state, depth - 1)
+        finally:
+            state.undo()
+    return counts
+
+def main():
+    """Command line entry point for the perft benchmark."""
+    parser = argparse.ArgumentParser(description="Count legal action sequences from reference setups")
+    parser.add_argument("--depth", type=int, default=3, help="deepest depth to count (default: 3)")
+    parser.add_argument("--setup", action="append", choices=sorted(REFERENCE_SETUPS),
+                        help="reference setup to run (repeatable, default: all)")
+    parser.add_argument("--divide", action="store_true",
+                        help="print the count under each first action at the deepest depth")
+    args = parser.parse_args()
+
+    mismatches = 0
+    for name in args.setup or REFERENCE_SETUPS:
+        state = reference_state(name)
+        expected = REFERENCE_COUNTS[name]
+        for depth in range(1, args.depth + 1):
+            start = time.perf_counter()
+            nodes = perft(state, depth)
+            elapsed = time.perf_counter() - start
+            if depth > len(expected):
+                verdict = "no reference"
+            elif nodes == expected[depth - 1]:
+                verdict = "ok"
+            else:
+                verdict = f"MISMATCH, expected {expected[depth - 1]}"
+                mismatches += 1
+            print(f"{name:<10} depth {depth}: {nodes:>10} nodes in {elapsed:7.3f}s "
+                  f"({nodes / max(elapsed, 1e-9):>10,.0f} nodes/s) {verdict}")
+        if state.to_bytes().hex() != REFERENCE_SETUPS[name]:
+            print(f"{name}: position not restored after undo")
+            mismatches += 1
+
+        if args.divide:
+            for action, nodes in divide(state, args.depth).items():
+                print(f"  {action}: {nodes}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
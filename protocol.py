@@ -0,0 +1,95 @@
+import asyncio
+import struct
+from enum import Enum
+from typing import List, Tuple
+
+from main import ACTION_RECORD, STATE_RECORD, Action
+
+# Every message is a frame header followed by its payload
+FRAME = struct.Struct("<HB")  # payload length, MessageType value
+
+class MessageType(Enum):
+    # Client requests
+    NEW = 1      # seed u32, player u8 to sit at (0 for none)
+    JOIN = 2     # game u32, player u8
+    ACT = 3      # game u32, ACTION_RECORD
+    LEGAL = 4    # game u32
+    STATE = 5    # game u32
+    LEAVE = 6    # game u32
+    # Server replies and events
+    STATUS = 64  # game u32, STATE_RECORD
+    RESULT = 65  # game u32, success u8, state delta
+    ACTIONS = 66  # game u32, ACTION_RECORDs
+    UPDATE = 67  # game u32, ACTION_RECORD, state delta; sent to the other seated player
+    ERROR = 68   # ErrorCode u8
+    OVER = 69    # game u32, winner u8 (0 for a draw); sent to every seated player when a game ends
+
+class ErrorCode(Enum):
+    BAD_MESSAGE = 1
+    NO_GAME = 2
+    BAD_PLAYER = 3
+    SEAT_TAKEN = 4
+    NOT_YOUR_TURN = 5
+    NOT_YOUR_FIGURE = 6
+    GAME_OVER = 7
+
+GAME = struct.Struct("<I")
+NEW_REQUEST = struct.Struct("<IB")
+JOIN_REQUEST = struct.Struct("<IB")
+RESULT_HEADER = struct.Struct("<IB")
+OVER_MESSAGE = struct.Struct("<IB")
+
+# STATE_RECORD fields in order: ten figure words, the two scores, flags and turn count.
+# A delta is a mask of the fields that changed followed by their new values.
+DELTA_MASK = struct.Struct("<H")
+STATE_FIELDS = [struct.Struct("<" + code) for code in "H" * 10 + "BBBI"]
+
+class ProtocolError(Exception):
+    """A request the server refuses, reported to the client as an ERROR message."""
+
+    def __init__(self, code: ErrorCode):
+        super().__init__(code.name)
+        self.code = code
+
+def frame(kind: MessageType, payload: bytes = b"") -> bytes:
+    """Wrap a payload into a message."""
+    return FRAME.pack(len(payload), kind.value) + payload
+
+async def read_message(reader: asyncio.StreamReader) -> Tuple[MessageType, bytes]:
+    """Read one message. Raises asyncio.IncompleteReadError when the stream ends."""
+    length, kind = FRAME.unpack(await reader.readexactly(FRAME.size))
+    payload = await reader.readexactly(length)
+    try:
+        return MessageType(kind), payload
+    except ValueError:
+        raise ProtocolError(ErrorCode.BAD_MESSAGE)
+
+def state_delta(before: bytes, after: bytes) -> bytes:
+    """Encode the STATE_RECORD fields that differ between two records."""
+    old = STATE_RECORD.unpack(before)
+    new = STATE_RECORD.unpack(after)
+    mask = 0
+    values = []
+    for field, (was, now, packer) in enumerate(zip(old, new, STATE_FIELDS)):
+        if was != now:
+            mask |= 1 << field
+            values.append(packer.pack(now))
+    return DELTA_MASK.pack(mask) + b"".join(values)
+
+def apply_delta(record: bytes, delta: bytes) -> bytes:
+    """Bring a STATE_RECORD up to date with a delta from state_delta()."""
+    fields = list(STATE_RECORD.unpack(record))
+    (mask,) = DELTA_MASK.unpack_from(delta)
+    offset = DELTA_MASK.size
+    for field, packer in enumerate(STATE_FIELDS):
+        if mask >> field & 1:
+            (fields[field],) = packer.unpack_from(delta, offset)
+            offset += packer.size
+    return STATE_RECORD.pack(*fields)
+
+def pack_actions(actions: List[Action]) -> bytes:
+    return b"".join(action.pack() for action in actions)
+
+def unpack_actions(data: bytes) -> List[Action]:
+    return [Action.unpack(data[offset:offset + ACTION_RECORD.size])
+            for offset in range(0, len(data), ACTION_RECORD.size)]
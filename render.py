@@ -0,0 +1,112 @@
+import argparse
+import sys
+import time
+from typing import List, TextIO
+
+from main import TERRAIN_CELL, GameState
+from replay import ReplayReader
+
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+CLEAR_BELOW = "\x1b[J"
+
+# Screen lines of a frame, counting from 1: the column header, eight board
+# rows, a blank line, then the status lines
+BOARD_TOP = 2
+STATUS_TOP = BOARD_TOP + 9
+
+def move_to(line: int, column: int) -> str:
+    """ANSI sequence putting the cursor at a 1-based line and column."""
+    return f"\x1b[{line};{column}H"
+
+def cell_columns(terrain: int) -> List[int]:
+    """Screen column of each square's text.
+
+    Terrain cells are narrower than the others, so the columns follow
+    from the terrain mask alone and never change during a game.
+    """
+    columns = []
+    for row in range(8):
+        column = 3  # after the row number and its space
+        for col in range(8):
+            columns.append(column)
+            column += (len(TERRAIN_CELL) if terrain >> (row * 8 + col) & 1 else 3) + 1
+    return columns
+
+class TerminalRenderer:
+    """Draws positions on an ANSI terminal, rewriting only what changed.
+
+    The first frame clears the screen and draws the whole board. After
+    that a frame moves the cursor to each square whose text changed and
+    rewrites the status lines only when they differ, so a quiet move costs
+    a few dozen bytes. Every frame goes out in a single write.
+    """
+
+    def __init__(self, out: TextIO = sys.stdout):
+        self.out = out
+        self.terrain = None
+        self.columns = None
+        self.cells = None
+        self.status = None
+
+    def reset(self):
+        """Redraw everything on the next frame, e.g. after the screen was disturbed."""
+        self.cells = None
+
+    def frame(self, state: GameState) -> str:
+        """The terminal text taking the screen from the last frame to this position."""
+        cells = state.board_cells()
+        status = state.status_lines()
+        if self.cells is None or state.terrain != self.terrain:
+            if state.terrain != self.terrain:
+                self.terrain = state.terrain
+                self.columns = cell_columns(state.terrain)
+            text = CLEAR_SCREEN + state.render_board().lstrip("\n")
+        else:
+            parts = []
+            for square, (old, new) in enumerate(zip(self.cells, cells)):
+                if old != new:
+                    parts.append(move_to(BOARD_TOP + square // 8, self.columns[square]) + new)
+            if status != self.status:
+                parts.append(move_to(STATUS_TOP, 1) + CLEAR_BELOW + "\n".join(status) + "\n")
+            elif parts:
+                # Leave the cursor under the frame
+                parts.append(move_to(STATUS_TOP + len(status), 1))
+            text = "".join(parts)
+        self.cells = cells
+        self.status = status
+        return text
+
+    def draw(self, state: GameState):
+        """Write the next frame, if anything changed."""
+        text = self.frame(state)
+        if text:
+            self.out.write(text)
+            self.out.flush()
+
+def main():
+    """Command line entry point for watching a replay log."""
+    parser = argparse.ArgumentParser(description="Watch a replay log on the terminal")
+    parser.add_argument("log", help="replay log written by ReplayWriter")
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds between actions")
+    parser.add_argument("--start", type=int, default=0, help="ply to start watching from")
+    args = parser.parse_args()
+
+    renderer = TerminalRenderer()
+    with ReplayReader(args.log) as reader:
+        state = reader.state_at(args.start)
+        renderer.draw(state)
+        try:
+            for action in reader.actions(args.start):
+                time.sleep(args.delay)
+                state.perform(action)
+                renderer.draw(state)
+                below = STATUS_TOP + len(renderer.status)
+                sys.stdout.write(f"{move_to(below, 1)}{CLEAR_BELOW}{action}\n")
+            if reader.drawn:
+                sys.stdout.write("Stopped as a draw\n")
+        except KeyboardInterrupt:
+            print()
+
+
+if __name__ == "__main__":
+    main()
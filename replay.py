@@ -0,0 +1,181 @@
+import mmap
+import struct
+import time
+import uuid
+from typing import Iterator, Optional
+
+from main import ACTION_RECORD, NO_DIRECTION, NO_SQUARE, STATE_RECORD, Action, GameState
+
+MAGIC = b"MCRL"
+VERSION = 2  # version 1 logs never hold a DRAW_RECORD and read the same
+# magic, version, snapshot interval
+HEADER = struct.Struct("<4sHH")
+# Closes the log of a game the host stopped as a draw; no action has this kind
+DRAW_RECORD = ACTION_RECORD.pack(0xFF, NO_SQUARE, NO_SQUARE, NO_DIRECTION)
+
+class ReplayWriter:
+    """Append-only binary log of one game.
+
+    After the header the file is a run of blocks, each a STATE_RECORD
+    snapshot of the position followed by the next `interval` actions as
+    ACTION_RECORDs. Every record has a fixed width, so the offset of any
+    ply is simple arithmetic. A game the host stopped as a draw, at a turn
+    limit rather than by the rules, ends with a DRAW_RECORD in the place of
+    the next action.
+
+    A new log refuses to overwrite an existing file (FileExistsError). To
+    carry on an interrupted log pass resume, the position play continues
+    from; it must match the last position the log recorded, so one game is
+    never spliced onto another.
+    """
+
+    def __init__(self, path: str, interval: int = 64, resume: Optional[GameState] = None):
+        if resume is not None:
+            with ReplayReader(path) as existing:
+                interval = existing.interval
+                self.plies = len(existing)
+                if self.plies and existing.final_state().to_bytes() != resume.to_bytes():
+                    raise ValueError(f"{path} does not end at the position being resumed")
+            self.file = open(path, "ab")
+            # Drop any record torn by a crash so new ones line up again
+            self.file.truncate(_block_offset(self.plies, interval))
+        else:
+            self.file = open(path, "xb")
+            self.file.write(HEADER.pack(MAGIC, VERSION, interval))
+            self.plies = 0
+        self.interval = interval
+
+    def record(self, state: GameState, action: Action):
+        """Log an action about to be performed on state.
+
+        Actions that cannot be packed (off-board squares, unknown
+        directions) are rejected by the rules without changing anything,
+        so they are left out.
+        """
+        try:
+            packed = action.pack()
+        except ValueError:
+            return
+        if self.plies % self.interval == 0:
+            self.file.write(state.to_bytes())
+        self.file.write(packed)
+        self.plies += 1
+
+    def record_draw(self, state: GameState):
+        """Mark the game as stopped as a draw at state, the position after the last action."""
+        if self.plies % self.interval == 0:
+            self.file.write(state.to_bytes())
+        self.file.write(DRAW_RECORD)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ReplayReader:
+    """Random access to a ReplayWriter log through a read-only memory map.
+
+    state_at(ply) loads the nearest snapshot at or before the ply and
+    replays at most `interval` actions from it. drawn tells whether the
+    log ends with a DRAW_RECORD, which is not counted as a ply.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.interval = _read_header(self.map[:HEADER.size])
+        self.plies = _count_plies(len(self.map), self.interval)
+        self.drawn = bool(self.plies) and self._record(self.plies - 1) == DRAW_RECORD
+        if self.drawn:
+            self.plies -= 1
+
+    def __len__(self) -> int:
+        return self.plies
+
+    def action(self, ply: int) -> Action:
+        """The action played at a ply, counting from 0."""
+        if not 0 <= ply < self.plies:
+            raise IndexError(f"Ply {ply} is outside the log's {self.plies} plies")
+        return Action.unpack(self._record(ply))
+
+    def _record(self, ply: int) -> bytes:
+        """The raw ACTION_RECORD at a ply."""
+        offset = (_block_offset(ply - ply % self.interval, self.interval) + STATE_RECORD.size
+                  + ply % self.interval * ACTION_RECORD.size)
+        return self.map[offset:offset + ACTION_RECORD.size]
+
+    def actions(self, start: int = 0) -> Iterator[Action]:
+        """Every action from a ply onwards."""
+        for ply in range(start, self.plies):
+            yield self.action(ply)
+
+    def state_at(self, ply: int) -> GameState:
+        """The position after the first `ply` actions.
+
+        The final position of a drawn log is marked game over, as it was
+        when play stopped.
+        """
+        if not 0 <= ply <= self.plies or not (self.plies or self.drawn):
+            raise IndexError(f"Ply {ply} is outside the log's {self.plies} plies")
+        # The last block's snapshot is only written once its first action, or the DRAW_RECORD, is
+        last = self.plies if self.drawn else self.plies - 1
+        block = min(ply, last) // self.interval * self.interval
+        offset = _block_offset(block, self.interval)
+        state = GameState.from_bytes(self.map[offset:offset + STATE_RECORD.size])
+        for action_ply in range(block, ply):
+            state.perform(self.action(action_ply))
+        if self.drawn and ply == self.plies:
+            state.game_over = True
+        return state
+
+    def final_state(self) -> GameState:
+        """The position after the last logged action."""
+        return self.state_at(self.plies)
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def run_prefix() -> str:
+    """A file name prefix unique to one run, so logs from different runs never collide."""
+    return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+
+def _read_header(data: bytes) -> int:
+    """Check a log header and return its snapshot interval."""
+    if len(data) < HEADER.size:
+        raise ValueError("Not a replay log: file is too short")
+    magic, version, interval = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("Not a replay log")
+    if not 1 <= version <= VERSION:
+        raise ValueError(f"Unsupported replay log version {version}")
+    return interval
+
+def _block_offset(ply: int, interval: int) -> int:
+    """File offset of a ply's action record, or of its block's snapshot when the ply opens a block."""
+    blocks, rest = divmod(ply, interval)
+    block_size = STATE_RECORD.size + interval * ACTION_RECORD.size
+    offset = HEADER.size + blocks * block_size
+    if rest:
+        offset += STATE_RECORD.size + rest * ACTION_RECORD.size
+    return offset
+
+def _count_plies(size: int, interval: int) -> int:
+    """Number of complete action records in a log of the given size."""
+    block_size = STATE_RECORD.size + interval * ACTION_RECORD.size
+    blocks, rest = divmod(size - HEADER.size, block_size)
+    if rest > STATE_RECORD.size:
+        return blocks * interval + (rest - STATE_RECORD.size) // ACTION_RECORD.size
+    return blocks * interval
@@ -0,0 +1,217 @@
+import time
+from typing import Dict, List, Optional
+
+from main import (Action, ActionType, BLAST_MASKS, FigureType, GameState, Player,
+                  iter_squares, square_index)
+from transposition import Bound, TranspositionTable
+
+WIN = 100000.0
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out."""
+
+def opponent_of(player: Player) -> Player:
+    """The other player."""
+    return Player.TWO if player == Player.ONE else Player.ONE
+
+def evaluate(state: GameState, player: Player) -> float:
+    """Static evaluation of a position from a player's point of view."""
+    if state.game_over:
+        return WIN if state.winner == player else -WIN
+
+    opponent = opponent_of(player)
+    value = 100.0 * (state.scores[player] - state.scores[opponent])
+    for figure in state.figures:
+        worth = 10 + figure.life
+        value += worth if figure.player == player else -worth
+    if not state.magic_bomb_used[player]:
+        value += 3
+    if not state.magic_bomb_used[opponent]:
+        value -= 3
+    return value
+
+def action_impact(state: GameState, action: Action):
+    """Rough (damage, kills) an action deals to the enemy, used for move ordering."""
+    kind = action.kind
+    if kind in (ActionType.MOVE, ActionType.END_TURN, ActionType.HEAL, ActionType.CONTAIN,
+                ActionType.VAMPIRIC_PUSH):
+        return 0, 0
+
+    actor = state.get_figure_at(action.origin)
+    if kind == ActionType.CHARGE or kind == ActionType.LONG_EYE:
+        return (2 if kind == ActionType.CHARGE else 1), 0
+
+    if kind == ActionType.MAGIC_BOMB:
+        damage = kills = 0
+        for square in iter_squares(BLAST_MASKS[square_index(action.target)] & state.occupancy()):
+            figure = state.squares[square]
+            sign = 1 if figure.player != actor.player else -1
+            damage += 2 * sign
+            if figure.life <= 2:
+                kills += sign
+        return damage, kills
+
+    target = state.get_figure_at(action.target)
+    if kind == ActionType.CONJURE:
+        return target.life, 1
+    if kind == ActionType.PLAGUE:
+        damage = action.value + 1
+    else:
+        damage = actor.attack
+        if actor.type in (FigureType.BLACK_MAGE, FigureType.WHITE_MAGE) and target.type == FigureType.BARBARIAN:
+            damage += 1
+    return damage, (1 if damage >= target.life else 0)
+
+class AlphaBetaPlayer:
+    """Iterative-deepening alpha-beta player.
+
+    A ply is a single action, so one player's turn spans several plies and
+    the side to move only changes on END_TURN. Values are negamax scores
+    for the side to move, negated across a change of side, which lets the
+    transposition table be reused from one decision to the next.
+    """
+
+    def __init__(self, turn_time: float = 5.0, max_depth: int = 64,
+                 tt_bytes: int = 32 * 1024 * 1024):
+        self.turn_time = turn_time
+        self.max_depth = max_depth
+        self.tt = TranspositionTable(tt_bytes)
+        self.history: Dict[Action, int] = {}
+        self.killers: List[List[Action]] = []
+        self.nodes = 0
+        self.deadline = 0.0
+        self._turn = None
+        self._turn_deadline = 0.0
+
+    def choose_action(self, state: GameState) -> Action:
+        """Pick an action for the side to move within this turn's time budget."""
+        actions = state.legal_actions(state.current_player)
+        if len(actions) == 1:
+            return actions[0]
+
+        now = time.perf_counter()
+        if self._turn != (state.turn_count, state.current_player):
+            self._turn = (state.turn_count, state.current_player)
+            self._turn_deadline = now + self.turn_time
+        # Share what is left of the turn among the figures that can still act
+        ready = state.occupied[state.current_player] & ~state.acted & ~state.contained
+        decisions_left = bin(ready).count("1") + 1
+        self.deadline = now + max(self._turn_deadline - now, 0.0) / decisions_left
+
+        return self.search(state, actions)
+
+    def search(self, state: GameState, actions: Optional[List[Action]] = None) -> Action:
+        """Run iterative deepening until the deadline and return the best action found."""
+        if actions is None:
+            actions = state.legal_actions(state.current_player)
+        self.tt.new_search()
+        self.nodes = 0
+        self.history.clear()
+        best_action = actions[0]
+
+        for depth in range(1, self.max_depth + 1):
+            try:
+                value, action = self._root(state, actions, depth, best_action)
+            except SearchTimeout:
+                break
+            best_action = action
+            if abs(value) >= WIN or time.perf_counter() >= self.deadline:
+                break
+        return best_action
+
+    def _root(self, state: GameState, actions: List[Action], depth: int, previous: Action):
+        """Search every root action to the given depth."""
+        side = state.current_player
+        alpha, beta = -WIN - 1, WIN + 1
+        best_value, best_action = -WIN - 1, previous
+
+        for action in self._order(state, actions, previous, 0):
+            value = self._child(state, action, side, depth, alpha, beta, 1)
+            if value > best_value:
+                best_value, best_action = value, action
+            alpha = max(alpha, value)
+
+        self.tt.store(state.hash, best_value, depth, Bound.EXACT, best_action)
+        return best_value, best_action
+
+    def _child(self, state: GameState, action: Action, side: Player, depth: int,
+               alpha: float, beta: float, ply: int) -> float:
+        """Apply an action, search the resulting position and undo it again."""
+        state.apply(action)
+        try:
+            if state.current_player == side:
+                return self._search(state, depth - 1, alpha, beta, ply)
+            return -self._search(state, depth - 1, -beta, -alpha, ply)
+        finally:
+            state.undo()
+
+    def _search(self, state: GameState, depth: int, alpha: float, beta: float, ply: int) -> float:
+        self.nodes += 1
+        if not self.nodes & 1023 and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+        side = state.current_player
+        if state.game_over or depth <= 0:
+            return evaluate(state, side)
+
+        alpha_start = alpha
+        tt_action = None
+        entry = self.tt.probe(state.hash)
+        if entry is not None:
+            tt_action = entry.action
+            if entry.depth >= depth:
+                if entry.bound == Bound.EXACT:
+                    return entry.value
+                if entry.bound == Bound.LOWER:
+                    alpha = max(alpha, entry.value)
+                else:
+                    beta = min(beta, entry.value)
+                if alpha >= beta:
+                    return entry.value
+
+        best_value, best_action = -WIN - 1, None
+        for action in self._order(state, state.legal_actions(side), tt_action, ply):
+            value = self._child(state, action, side, depth, alpha, beta, ply + 1)
+            if value > best_value:
+                best_value, best_action = value, action
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                if action_impact(state, action)[1] <= 0:
+                    self._remember_cutoff(action, depth, ply)
+                break
+
+        if best_value <= alpha_start:
+            bound = Bound.UPPER
+        elif best_value >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        self.tt.store(state.hash, best_value, depth, bound, best_action)
+        return best_value
+
+    def _remember_cutoff(self, action: Action, depth: int, ply: int):
+        """Update the killer and history tables after a quiet beta cutoff."""
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[2:]
+        self.history[action] = self.history.get(action, 0) + depth * depth
+
+    def _order(self, state: GameState, actions: List[Action], first: Optional[Action], ply: int):
+        """Sort actions: hash move, lethal and damaging actions, killers, then by history."""
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+
+        def key(action):
+            if action == first:
+                return (3, 0, 0)
+            damage, kills = action_impact(state, action)
+            if kills > 0 or damage > 0:
+                return (2, kills, damage)
+            if action in killers:
+                return (1, 0, 0)
+            return (0, history.get(action, 0), 0)
+
+        return sorted(actions, key=key, reverse=True)
@@ -0,0 +1,140 @@
+import argparse
+import inspect
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from main import Action, Game, GameState, Player
+from mcts import MCTSPlayer, random_policy
+from replay import ReplayWriter, run_prefix
+from search import AlphaBetaPlayer
+
+class RandomPlayer:
+    """Plays random legal actions, giving every figure a turn before ending."""
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+
+    def choose_action(self, state: GameState) -> Action:
+        return random_policy(state, self.rng)
+
+AGENTS = {
+    "random": RandomPlayer,
+    "alphabeta": AlphaBetaPlayer,
+    "mcts": MCTSPlayer,
+}
+
+def parse_agent(spec: str):
+    """Split an agent spec like "mcts:time_limit=0.5,exploration=1.2" into name and options."""
+    name, _, params = spec.partition(":")
+    if name not in AGENTS:
+        raise ValueError(f"Unknown agent {name!r}, expected one of {', '.join(AGENTS)}")
+    options = {}
+    for param in filter(None, params.split(",")):
+        key, _, value = param.partition("=")
+        try:
+            options[key] = json.loads(value)
+        except json.JSONDecodeError:
+            options[key] = value  # bare strings need no quotes
+    return name, options
+
+def make_agent(spec: str, seed: int):
+    """Build an agent from its spec, seeding it when it takes a seed."""
+    name, options = parse_agent(spec)
+    agent_class = AGENTS[name]
+    if "seed" in inspect.signature(agent_class).parameters:
+        options.setdefault("seed", seed)
+    return agent_class(**options)
+
+def play_game(index: int, seed: int, agent_one: str, agent_two: str,
+              max_turns: Optional[int] = None, replay_dir: Optional[str] = None,
+              replay_prefix: Optional[str] = None) -> Dict:
+    """Play one headless game and summarise its result, logging its actions to replay_dir if given.
+
+    Log names start with replay_prefix, a fresh run_prefix() when not given.
+    """
+    rng = random.Random(seed)
+    recorder = None
+    replay = None
+    if replay_dir is not None:
+        replay = os.path.join(replay_dir, f"{replay_prefix or run_prefix()}-game-{index:06d}.mcr")
+        recorder = ReplayWriter(replay)
+    game = Game({Player.ONE: make_agent(agent_one, rng.getrandbits(32)),
+                 Player.TWO: make_agent(agent_two, rng.getrandbits(32))}, recorder)
+    start = time.perf_counter()
+    try:
+        winner = game.play_headless(rng, max_turns)
+    finally:
+        if recorder is not None:
+            recorder.close()
+    state = game.state
+    return {
+        "game": index,
+        "seed": seed,
+        "agents": [agent_one, agent_two],
+        "winner": winner.value if winner else None,
+        "scores": [state.scores[Player.ONE], state.scores[Player.TWO]],
+        "turns": state.turn_count,
+        "seconds": round(time.perf_counter() - start, 3),
+        "replay": replay,
+    }
+
+def run_selfplay(games: int, agent_one: str, agent_two: str, output: str,
+                 seed: int = 0, workers: Optional[int] = None,
+                 max_turns: Optional[int] = 200, replay_dir: Optional[str] = None) -> Dict[str, int]:
+    """Play a batch of games across a process pool, appending one JSON line per game.
+
+    Game i is seeded with seed + i, so any game can be replayed on its own.
+    Replay logs of one run share a prefix unique to the run.
+    Returns the tally of wins and unfinished games.
+    """
+    # Fail on a bad spec here rather than in every worker
+    parse_agent(agent_one)
+    parse_agent(agent_two)
+    prefix = run_prefix()
+    if replay_dir is not None:
+        os.makedirs(replay_dir, exist_ok=True)
+
+    tally = {"player_one": 0, "player_two": 0, "unfinished": 0}
+    with ProcessPoolExecutor(workers or os.cpu_count() or 1) as pool, open(output, "a") as out:
+        futures = [pool.submit(play_game, i, seed + i, agent_one, agent_two, max_turns,
+                               replay_dir, prefix)
+                   for i in range(games)]
+        for future in futures:
+            result = future.result()
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            if result["winner"] == 1:
+                tally["player_one"] += 1
+            elif result["winner"] == 2:
+                tally["player_two"] += 1
+            else:
+                tally["unfinished"] += 1
+    return tally
+
+def main():
+    """Command line entry point for batch self-play."""
+    parser = argparse.ArgumentParser(description="Play Motley Crew games between computer players")
+    parser.add_argument("games", type=int, help="number of games to play")
+    parser.add_argument("--one", default="random", help="agent spec for player 1, e.g. mcts:time_limit=0.2")
+    parser.add_argument("--two", default="random", help="agent spec for player 2")
+    parser.add_argument("--output", default="selfplay.jsonl", help="file to append results to")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--max-turns", type=int, default=200, help="turn limit before a game is abandoned")
+    parser.add_argument("--replays", metavar="DIR", help="write a replay log per game into this directory")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tally = run_selfplay(args.games, args.one, args.two, args.output,
+                         args.seed, args.workers, args.max_turns, args.replays)
+    elapsed = time.perf_counter() - start
+    print(f"{args.games} games in {elapsed:.1f}s - P1 wins: {tally['player_one']}, "
+          f"P2 wins: {tally['player_two']}, unfinished: {tally['unfinished']}")
+
+
+if __name__ == "__main__":
+    main()
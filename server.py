@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import os
+import random
+import struct
+from typing import Dict, Optional
+
+from main import Action, ActionType, Game, Player
+from protocol import (GAME, JOIN_REQUEST, NEW_REQUEST, OVER_MESSAGE, RESULT_HEADER, ErrorCode,
+                      MessageType, ProtocolError, frame, pack_actions, read_message, state_delta)
+from replay import ReplayWriter, run_prefix
+
+# Actions that name a target square; every action but END_TURN names its origin
+TARGETED_ACTIONS = {ActionType.MOVE, ActionType.ATTACK, ActionType.MAGIC_BOMB, ActionType.PLAGUE,
+                    ActionType.VAMPIRIC_PUSH, ActionType.CONJURE, ActionType.HEAL,
+                    ActionType.CONTAIN}
+
+class HostedGame:
+    """One game on the server and the connections seated at it."""
+
+    def __init__(self, number: int, game: Game, creator: Optional[asyncio.StreamWriter] = None):
+        self.number = number
+        self.game = game
+        self.creator = creator  # the connection that asked for the game
+        self.seats: Dict[Player, asyncio.StreamWriter] = {}
+
+    def status(self) -> bytes:
+        """A STATUS message with the full position."""
+        return frame(MessageType.STATUS, GAME.pack(self.number) + self.game.state.to_bytes())
+
+class GameServer:
+    """Hosts many games on one event loop.
+
+    Clients speak the binary messages in protocol.py and get exactly one
+    reply per request, in order:
+
+        NEW, JOIN, STATE  -> STATUS with the full STATE_RECORD
+        ACT               -> RESULT with the success flag and a state delta
+        LEGAL             -> ACTIONS for the player to move
+        LEAVE             -> STATUS
+
+    Refused requests get an ERROR instead. When an action is played the
+    other seated player is also sent an UPDATE with the action and delta,
+    so clients keep their copy of the position current without polling.
+    When a game ends, won or drawn at max_turns, every seated player,
+    the one who acted included, is then sent an OVER naming the winner.
+    """
+
+    def __init__(self, max_turns: Optional[int] = None, replay_dir: Optional[str] = None):
+        self.max_turns = max_turns
+        self.replay_dir = replay_dir
+        self.replay_prefix = run_prefix()  # game numbers restart with every server
+        self.games: Dict[int, HostedGame] = {}
+        self.next_number = 1
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one client connection until it closes."""
+        try:
+            while True:
+                try:
+                    kind, payload = await read_message(reader)
+                    reply = self.dispatch(kind, payload, writer)
+                except ProtocolError as e:
+                    reply = frame(MessageType.ERROR, bytes([e.code.value]))
+                send(writer, reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.release(writer)
+            writer.close()
+
+    def dispatch(self, kind: MessageType, payload: bytes, writer: asyncio.StreamWriter) -> bytes:
+        """Carry out one request and build its reply."""
+        try:
+            if kind == MessageType.NEW:
+                seed, player = NEW_REQUEST.unpack(payload)
+                hosted = self.new_game(seed, writer)
+                if player:
+                    self.sit(hosted, player, writer)
+                return hosted.status()
+            if kind == MessageType.JOIN:
+                number, player = JOIN_REQUEST.unpack(payload)
+                hosted = self.find_game(number)
+                self.sit(hosted, player, writer)
+                return hosted.status()
+            if kind == MessageType.ACT:
+                (number,) = GAME.unpack_from(payload)
+                action = Action.unpack(payload[GAME.size:])
+                return self.play(self.find_game(number), action, writer)
+
+            (number,) = GAME.unpack(payload)
+            hosted = self.find_game(number)
+        except (struct.error, ValueError, IndexError):
+            raise ProtocolError(ErrorCode.BAD_MESSAGE)
+
+        if kind == MessageType.LEGAL:
+            state = hosted.game.state
+            return frame(MessageType.ACTIONS, GAME.pack(hosted.number)
+                         + pack_actions(state.legal_actions(state.current_player)))
+        if kind == MessageType.STATE:
+            return hosted.status()
+        if kind == MessageType.LEAVE:
+            reply = hosted.status()
+            self.release(writer, hosted)
+            return reply
+        raise ProtocolError(ErrorCode.BAD_MESSAGE)
+
+    def new_game(self, seed: int, creator: Optional[asyncio.StreamWriter] = None) -> HostedGame:
+        """Create a game with both sides placed randomly."""
+        number = self.next_number
+        self.next_number += 1
+        recorder = None
+        if self.replay_dir is not None:
+            recorder = ReplayWriter(os.path.join(self.replay_dir, f"{self.replay_prefix}-game-{number:06d}.mcr"))
+        game = Game(recorder=recorder)
+        rng = random.Random(seed)
+        for player in [Player.ONE, Player.TWO]:
+            game.place_randomly(player, rng)
+        game.setup_complete = True
+        hosted = HostedGame(number, game, creator)
+        self.games[number] = hosted
+        return hosted
+
+    def find_game(self, number: int) -> HostedGame:
+        if number not in self.games:
+            raise ProtocolError(ErrorCode.NO_GAME)
+        return self.games[number]
+
+    def sit(self, hosted: HostedGame, number: int, writer: asyncio.StreamWriter):
+        """Seat a connection as one of a game's players."""
+        if number not in (1, 2):
+            raise ProtocolError(ErrorCode.BAD_PLAYER)
+        player = Player(number)
+        if hosted.seats.get(player, writer) is not writer:
+            raise ProtocolError(ErrorCode.SEAT_TAKEN)
+        hosted.seats[player] = writer
+
+    def play(self, hosted: HostedGame, action: Action, writer: asyncio.StreamWriter) -> bytes:
+        """Play an action for the seated player whose turn it is."""
+        state = hosted.game.state
+        if state.game_over:
+            raise ProtocolError(ErrorCode.GAME_OVER)
+        if hosted.seats.get(state.current_player) is not writer:
+            raise ProtocolError(ErrorCode.NOT_YOUR_TURN)
+        if action.kind != ActionType.END_TURN:
+            if action.origin is None or (action.kind in TARGETED_ACTIONS and action.target is None):
+                raise ProtocolError(ErrorCode.BAD_MESSAGE)
+            figure = state.get_figure_at(action.origin)
+            if figure is None or figure.player != state.current_player:
+                raise ProtocolError(ErrorCode.NOT_YOUR_FIGURE)
+
+        before = state.to_bytes()
+        success, _ = hosted.game.act(action)
+        if (self.max_turns is not None and state.turn_count >= self.max_turns
+                and not state.game_over):
+            if hosted.game.recorder is not None:
+                hosted.game.recorder.record_draw(state)
+            state.game_over = True  # abandoned as a draw
+        after = state.to_bytes()
+        delta = state_delta(before, after)
+        if after != before:
+            update = frame(MessageType.UPDATE, GAME.pack(hosted.number) + action.pack() + delta)
+            for seated in set(hosted.seats.values()) - {writer}:
+                send(seated, update)
+        reply = frame(MessageType.RESULT, RESULT_HEADER.pack(hosted.number, success) + delta)
+        if state.game_over:
+            winner = state.winner.value if state.winner is not None else 0
+            over = frame(MessageType.OVER, OVER_MESSAGE.pack(hosted.number, winner))
+            for seated in set(hosted.seats.values()) - {writer}:
+                send(seated, over)
+            reply += over
+            self.close_game(hosted)
+        return reply
+
+    def release(self, writer: asyncio.StreamWriter, only: Optional[HostedGame] = None):
+        """Free a connection's seats, dropping games nobody is seated at any more.
+
+        Without only the connection has closed, so games it created that
+        nobody ever sat at are dropped too.
+        """
+        for hosted in [only] if only is not None else list(self.games.values()):
+            seated = [player for player, other in hosted.seats.items() if other is writer]
+            for player in seated:
+                del hosted.seats[player]
+            abandoned = only is None and hosted.creator is writer
+            if (seated or abandoned) and not hosted.seats:
+                self.close_game(hosted)
+
+    def close_game(self, hosted: HostedGame):
+        if self.games.pop(hosted.number, None) is not None and hosted.game.recorder is not None:
+            hosted.game.recorder.close()
+
+def send(writer: asyncio.StreamWriter, message: bytes):
+    """Queue one message for a client."""
+    if not writer.is_closing():
+        writer.write(message)
+
+async def serve(server: GameServer, host: str = "127.0.0.1", port: int = 7878,
+                unix_path: Optional[str] = None):
+    """Listen on TCP, or on a Unix socket when unix_path is given, until cancelled."""
+    if unix_path is not None:
+        listener = await asyncio.start_unix_server(server.handle, unix_path)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+    async with listener:
+        await listener.serve_forever()
+
+def main():
+    """Command line entry point for the game server."""
+    parser = argparse.ArgumentParser(description="Host Motley Crew games for network clients")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=7878, help="TCP port to listen on")
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--max-turns", type=int, default=None, help="turn limit before a game is abandoned")
+    parser.add_argument("--replays", metavar="DIR", help="write a replay log per game into this directory")
+    args = parser.parse_args()
+
+    if args.replays is not None:
+        os.makedirs(args.replays, exist_ok=True)
+    server = GameServer(args.max_turns, args.replays)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"Serving games on {where}")
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+
+
+if __name__ == "__main__":
+    main()
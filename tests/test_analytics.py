@@ -0,0 +1,49 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+from main import Game, Player
+from replay import ReplayWriter
+
+def write_log(path, plies, seed=0):
+    """Log a game of random legal actions, stopping after the given number of plies."""
+    rng = random.Random(seed)
+    game = Game(recorder=ReplayWriter(path))
+    for player in [Player.ONE, Player.TWO]:
+        game.place_randomly(player, rng)
+    game.setup_complete = True
+    state = game.state
+    for _ in range(plies):
+        if state.game_over:
+            break
+        game.act(rng.choice(state.legal_actions(state.current_player)))
+    game.recorder.close()
+
+class ExportTest(unittest.TestCase):
+    @unittest.skipIf(np is None, "needs numpy")
+    def test_empty_logs_are_skipped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            logs = [os.path.join(directory, name) for name in ("a.mcr", "empty.mcr", "b.mcr")]
+            write_log(logs[0], 30, seed=1)
+            write_log(logs[1], 0)
+            write_log(logs[2], 20, seed=2)
+            output = os.path.join(directory, "columns")
+
+            self.assertEqual(analytics.export(logs, output, "npy"), "npy")
+            games = np.load(os.path.join(output, "game.npy"))
+            self.assertEqual(sorted(set(games.tolist())), [0, 2])
+            self.assertEqual(len(games), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
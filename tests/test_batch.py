@@ -0,0 +1,49 @@
+import copy
+import os
+import sys
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import ActionType
+
+@unittest.skipIf(np is None, "needs numpy")
+class BatchTest(unittest.TestCase):
+    def test_random_playouts_match_compact_state(self):
+        from batch import END_TURN_SLOT, FIGURE_COUNT, BatchGames
+
+        rng = np.random.default_rng(5)
+        batch = BatchGames.random_setup(24, rng)
+        states = [batch.to_compact(game) for game in range(batch.size)]
+        for _ in range(300):
+            if batch.game_over.all():
+                break
+            masks = [batch.legal_mask(fid) for fid in range(FIGURE_COUNT)]
+            for game, state in enumerate(states):
+                if state.game_over:
+                    continue
+                legal = {batch.decode(game, fid, int(slot))
+                         for fid in range(FIGURE_COUNT) for slot in np.flatnonzero(masks[fid][game])}
+                expected = {action for action in state.legal_actions(state.current_player)
+                            if action.kind != ActionType.END_TURN}
+                self.assertEqual(legal, expected)
+
+            before = copy.deepcopy(batch)
+            fids, slots = batch.random_step(rng)
+            for game, state in enumerate(states):
+                if state.game_over:
+                    continue
+                action = before.decode(game, int(fids[game]), int(slots[game]))
+                if slots[game] != END_TURN_SLOT:
+                    self.assertTrue(masks[fids[game]][game, slots[game]])
+                self.assertTrue(state.perform(action)[0])
+                self.assertEqual(state.key(), batch.to_compact(game).key())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import Game, Player
+
+def cached_answers(state):
+    """Every figure's cached move targets, attack targets and special actions."""
+    return [(state.move_targets(figure), state.attack_targets(figure), state.special_actions(figure))
+            for figure in state.figures if not figure.is_dead]
+
+def fresh_answers(state):
+    """The same answers worked out with empty caches."""
+    saved = state.move_cache, state.attack_cache, state.special_cache
+    state.move_cache, state.attack_cache, state.special_cache = {}, {}, {}
+    try:
+        return cached_answers(state)
+    finally:
+        state.move_cache, state.attack_cache, state.special_cache = saved
+
+class TargetCacheTest(unittest.TestCase):
+    def test_caches_follow_apply_and_undo(self):
+        for seed in range(8):
+            rng = random.Random(seed)
+            game = Game()
+            for player in [Player.ONE, Player.TWO]:
+                game.place_randomly(player, rng)
+            game.setup_complete = True
+            state = game.state
+
+            for _ in range(150):
+                if state.game_over:
+                    break
+                actions = state.legal_actions(state.current_player)
+                self.assertEqual(cached_answers(state), fresh_answers(state))
+                # Try a few actions and take them back before playing one for real
+                for action in rng.sample(actions, min(3, len(actions))):
+                    state.apply(action)
+                    self.assertEqual(cached_answers(state), fresh_answers(state))
+                    state.undo()
+                    self.assertEqual(cached_answers(state), fresh_answers(state))
+                state.apply(rng.choice(actions))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import (CHARGE_DIRECTIONS, LONG_EYE_DIRECTIONS, Action, ActionType, FigureType, Game,
+                  GameState, Player, square_position)
+
+SQUARES = [square_position(square) for square in range(64)]
+
+def random_positions(seed, games=4, plies=120):
+    """Walk seeded random playouts, yielding the state and a random generator before every ply."""
+    rng = random.Random(seed)
+    for _ in range(games):
+        game = Game()
+        for player in [Player.ONE, Player.TWO]:
+            game.place_randomly(player, rng)
+        game.setup_complete = True
+        state = game.state
+        for _ in range(plies):
+            if state.game_over:
+                break
+            yield state, rng
+            state.perform(rng.choice(state.legal_actions(state.current_player)))
+
+def candidate_actions(state):
+    """Every action record the side to move could try, legal or not."""
+    player = state.current_player
+    targets = [figure.position for figure in state.figures]
+    candidates = [Action(ActionType.END_TURN)]
+    for figure in state.figures_of(player):
+        pos = figure.position
+        for target in SQUARES:
+            candidates.append(Action(ActionType.MOVE, pos, target))
+            candidates.append(Action(ActionType.ATTACK, pos, target))
+        if figure.type == FigureType.KNIGHT:
+            candidates.extend(Action(ActionType.CHARGE, pos, direction=d) for d in CHARGE_DIRECTIONS)
+        elif figure.type == FigureType.ARBALIST:
+            candidates.extend(Action(ActionType.LONG_EYE, pos, direction=d) for d in LONG_EYE_DIRECTIONS)
+        elif figure.type == FigureType.BLACK_MAGE:
+            candidates.extend(Action(ActionType.MAGIC_BOMB, pos, target) for target in SQUARES)
+            candidates.extend(Action(ActionType.PLAGUE, pos, target, value=x)
+                              for target in targets for x in range(9))
+            # Raised figures come back identical, so only the first of each type is listed
+            seen = set()
+            for index, dead in enumerate(state.dead_figures[player]):
+                if dead.type not in seen:
+                    seen.add(dead.type)
+                    candidates.extend(Action(ActionType.VAMPIRIC_PUSH, pos, target, value=index)
+                                      for target in SQUARES)
+        elif figure.type == FigureType.WHITE_MAGE:
+            for kind in (ActionType.CONJURE, ActionType.HEAL, ActionType.CONTAIN):
+                candidates.extend(Action(kind, pos, target) for target in targets)
+    return candidates
+
+def snapshot(state):
+    """Everything apply() may change, with figures compared by identity as well as by value."""
+    figures = [(id(f), f.type, f.player, f.position, f.life, f.is_dead, f.has_moved, f.has_acted,
+                f.counter_containment_turns) for f in state.figures]
+    dead = {p: [(id(f), f.type, f.player, f.position, f.life, f.is_dead) for f in state.dead_figures[p]]
+            for p in Player}
+    return (figures, dead, [id(f) if f else None for f in state.squares], dict(state.occupied),
+            dict(state.pieces), state.moved, state.acted, state.contained, dict(state.scores),
+            dict(state.live_counts), dict(state.magic_bomb_used), state.current_player,
+            state.turn_count, state.game_over, state.winner, state.hash)
+
+class EngineTest(unittest.TestCase):
+    def test_legal_actions_match_the_action_methods(self):
+        for index, (state, _) in enumerate(random_positions(1, games=3, plies=90)):
+            if index % 3:
+                continue
+            accepted = set()
+            for action in candidate_actions(state):
+                success, _ = state.apply(action)
+                state.undo()
+                if success:
+                    accepted.add(action)
+            legal = state.legal_actions(state.current_player)
+            self.assertEqual(len(legal), len(set(legal)))
+            self.assertEqual(set(legal), accepted)
+
+    def test_undo_restores_the_full_state(self):
+        for state, rng in random_positions(2):
+            before = snapshot(state)
+            applied = 0
+            for _ in range(rng.randint(1, 8)):
+                if state.game_over:
+                    break
+                success, message = state.apply(rng.choice(state.legal_actions(state.current_player)))
+                self.assertTrue(success, message)
+                applied += 1
+            for _ in range(applied):
+                state.undo()
+            self.assertEqual(snapshot(state), before)
+
+    def test_incremental_hash_matches_recomputed_hash(self):
+        for state, rng in random_positions(3):
+            self.assertEqual(state.hash, state.compute_hash())
+            state.apply(rng.choice(state.legal_actions(state.current_player)))
+            self.assertEqual(state.hash, state.compute_hash())
+            state.undo()
+            self.assertEqual(state.hash, state.compute_hash())
+
+    def test_state_record_round_trip(self):
+        for state, _ in random_positions(4):
+            data = state.to_bytes()
+            copy = GameState.from_bytes(data)
+            self.assertEqual(copy.to_bytes(), data)
+            self.assertEqual(copy.hash, state.hash)
+            self.assertEqual(set(copy.legal_actions(copy.current_player)),
+                             set(state.legal_actions(state.current_player)))
+
+
+if __name__ == "__main__":
+    unittest.main()
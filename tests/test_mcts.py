@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selfplay import play_game
+
+class MCTSTest(unittest.TestCase):
+    def test_mcts_beats_random(self):
+        wins = losses = points = conceded = 0
+        for seed in range(4):
+            # Alternate sides so neither player keeps the first move
+            side = seed % 2
+            agents = ["mcts:iterations=10", "random"]
+            if side:
+                agents.reverse()
+            result = play_game(seed, seed, agents[0], agents[1], max_turns=20)
+            if result["winner"] == side + 1:
+                wins += 1
+            elif result["winner"] is not None:
+                losses += 1
+            points += result["scores"][side]
+            conceded += result["scores"][1 - side]
+        self.assertGreater(wins, losses)
+        self.assertGreater(points, conceded)
+
+
+if __name__ == "__main__":
+    unittest.main()
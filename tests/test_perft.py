@@ -0,0 +1,42 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perft import REFERENCE_COUNTS, REFERENCE_SETUPS, perft, reference_state
+
+class PerftTest(unittest.TestCase):
+    def checked_perft(self, state, depth):
+        """perft() that also checks every undo restores the position record and the hash."""
+        actions = state.legal_actions(state.current_player)
+        if depth <= 1:
+            return len(actions)
+        record, key = state.to_bytes(), state.hash
+        nodes = 0
+        for action in actions:
+            state.apply(action)
+            nodes += self.checked_perft(state, depth - 1)
+            state.undo()
+            self.assertEqual(state.to_bytes(), record, action)
+            self.assertEqual(state.hash, key, action)
+        return nodes
+
+    def test_reference_counts(self):
+        for name in REFERENCE_SETUPS:
+            state = reference_state(name)
+            for depth in (1, 2, 3):
+                with self.subTest(setup=name, depth=depth):
+                    self.assertEqual(perft(state, depth), REFERENCE_COUNTS[name][depth - 1])
+            self.assertEqual(state.to_bytes().hex(), REFERENCE_SETUPS[name])
+
+    def test_undo_restores_every_position(self):
+        for name, depth in (("opening", 2), ("skirmish", 3)):
+            with self.subTest(setup=name):
+                state = reference_state(name)
+                self.assertEqual(self.checked_perft(state, depth), REFERENCE_COUNTS[name][depth - 1])
+                self.assertEqual(state.hash, state.compute_hash())
+
+
+if __name__ == "__main__":
+    unittest.main()
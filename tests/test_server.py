@@ -0,0 +1,95 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import (ACTION_RECORD, NO_DIRECTION, NO_SQUARE, Action, ActionType, Player,
+                  square_index)
+from protocol import (GAME, JOIN_REQUEST, NEW_REQUEST, OVER_MESSAGE, ErrorCode, MessageType, frame,
+                      read_message)
+from replay import ReplayReader
+from server import GameServer
+
+class ServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = GameServer()
+        self.listener = await asyncio.start_server(self.server.handle, "127.0.0.1", 0)
+        port = self.listener.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.listener.close()
+        await self.listener.wait_closed()
+
+    async def request(self, kind, payload):
+        self.writer.write(frame(kind, payload))
+        await self.writer.drain()
+        return await read_message(self.reader)
+
+    async def test_action_without_target_is_a_bad_message(self):
+        kind, payload = await self.request(MessageType.NEW, NEW_REQUEST.pack(7, Player.ONE.value))
+        self.assertEqual(kind, MessageType.STATUS)
+        (number,) = GAME.unpack_from(payload)
+        state = self.server.games[number].game.state
+        origin = square_index(state.figures_of(Player.ONE)[0].position)
+
+        for action_type, start, target in [(ActionType.MOVE, origin, NO_SQUARE),
+                                           (ActionType.HEAL, origin, NO_SQUARE),
+                                           (ActionType.ATTACK, NO_SQUARE, origin)]:
+            record = ACTION_RECORD.pack(action_type.value, start, target, NO_DIRECTION)
+            kind, payload = await self.request(MessageType.ACT, GAME.pack(number) + record)
+            self.assertEqual(kind, MessageType.ERROR)
+            self.assertEqual(payload, bytes([ErrorCode.BAD_MESSAGE.value]))
+
+        # The connection is still served afterwards
+        kind, payload = await self.request(MessageType.STATE, GAME.pack(number))
+        self.assertEqual(kind, MessageType.STATUS)
+
+    async def test_unseated_game_is_dropped_with_its_creator(self):
+        kind, payload = await self.request(MessageType.NEW, NEW_REQUEST.pack(7, 0))
+        self.assertEqual(kind, MessageType.STATUS)
+        (number,) = GAME.unpack_from(payload)
+        self.assertIn(number, self.server.games)
+
+        self.writer.close()
+        await self.writer.wait_closed()
+        for _ in range(100):
+            if number not in self.server.games:
+                break
+            await asyncio.sleep(0.01)
+        self.assertNotIn(number, self.server.games)
+
+    async def test_turn_limit_draw_is_reported_and_logged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.server.max_turns = 1
+            self.server.replay_dir = directory
+            kind, payload = await self.request(MessageType.NEW, NEW_REQUEST.pack(7, Player.ONE.value))
+            (number,) = GAME.unpack_from(payload)
+            kind, payload = await self.request(MessageType.JOIN,
+                                               JOIN_REQUEST.pack(number, Player.TWO.value))
+            self.assertEqual(kind, MessageType.STATUS)
+
+            end_turn = Action(ActionType.END_TURN).pack()
+            kind, payload = await self.request(MessageType.ACT, GAME.pack(number) + end_turn)
+            self.assertEqual(kind, MessageType.RESULT)
+            kind, payload = await read_message(self.reader)
+            self.assertEqual(kind, MessageType.OVER)
+            self.assertEqual(OVER_MESSAGE.unpack(payload), (number, 0))
+            self.assertNotIn(number, self.server.games)
+
+            (log,) = os.listdir(directory)
+            with ReplayReader(os.path.join(directory, log)) as reader:
+                self.assertTrue(reader.drawn)
+                self.assertEqual(len(reader), 1)
+                self.assertEqual(reader.action(0).kind, ActionType.END_TURN)
+                final = reader.final_state()
+                self.assertTrue(final.game_over)
+                self.assertIsNone(final.winner)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import Action, ActionType
+from transposition import Bound, TranspositionTable
+
+class TranspositionTest(unittest.TestCase):
+    def test_table_fits_its_memory_budget(self):
+        budget = 1024 * 1024
+        table = TranspositionTable(budget)
+        arrays = [table.keys, table.values, table.depths, table.bounds, table.generations, table.actions]
+        self.assertLessEqual(sum(sys.getsizeof(column) for column in arrays), budget * 1.01)
+
+    def test_best_action_survives_packing(self):
+        table = TranspositionTable(1024)
+        action = Action(ActionType.PLAGUE, (1, 2), (3, 4), value=5)
+        table.store(12345, 1.5, 3, Bound.LOWER, action)
+        self.assertEqual(table.probe(12345).action, action)
+        # Storing without an action keeps the old one
+        table.store(12345, 2.5, 4, Bound.EXACT)
+        self.assertEqual(table.probe(12345).action, action)
+        table.store(678, 0.0, 1, Bound.UPPER)
+        self.assertIsNone(table.probe(678).action)
+
+
+if __name__ == "__main__":
+    unittest.main()
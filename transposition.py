@@ -0,0 +1,105 @@
+from array import array
+from enum import IntEnum
+from typing import NamedTuple, Optional
+
+from main import ACTION_RECORD, Action
+
+class Bound(IntEnum):
+    EXACT = 0
+    LOWER = 1  # value is a lower bound (search failed high)
+    UPPER = 2  # value is an upper bound (search failed low)
+
+class TTEntry(NamedTuple):
+    value: float
+    depth: int
+    bound: Bound
+    action: Optional[Action]
+
+# key (8) + value (8) + depth (2) + bound (1) + generation (1) + ACTION_RECORD (4), all in
+# flat arrays so there is no per-entry object overhead
+ENTRY_BYTES = 24
+NO_ACTION = 0xFFFFFFFF  # no action kind packs to 0xFF
+
+class TranspositionTable:
+    """Fixed-size transposition table keyed by GameState.hash.
+
+    Entries live in parallel preallocated arrays grouped into two-slot
+    buckets, with best actions packed as ACTION_RECORDs. The first slot is depth-preferred and only gives way to a
+    search at least as deep or to an entry left over from an earlier
+    search; the second slot is always replaced.
+    """
+
+    def __init__(self, memory_bytes: int = 64 * 1024 * 1024):
+        buckets = 1
+        while buckets * 4 * ENTRY_BYTES <= memory_bytes:
+            buckets *= 2
+        self.mask = buckets - 1
+        size = buckets * 2
+
+        # Repeating a one-item array allocates exactly size items
+        self.keys = array('Q', [0]) * size
+        self.values = array('d', [0.0]) * size
+        self.depths = array('h', [-1]) * size  # -1 marks an empty slot
+        self.bounds = array('b', [0]) * size
+        self.generations = array('B', [0]) * size
+        self.actions = array('I', [NO_ACTION]) * size
+        self.generation = 0
+
+    @property
+    def capacity(self) -> int:
+        """Number of entry slots."""
+        return len(self.keys)
+
+    def new_search(self):
+        """Start a new search so entries from earlier ones become replaceable."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        """Empty every slot."""
+        size = len(self.keys)
+        self.depths = array('h', [-1]) * size
+        self.actions = array('I', [NO_ACTION]) * size
+        self.generation = 0
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """Look up a position, returning its entry or None."""
+        slot = (key & self.mask) * 2
+        for i in (slot, slot + 1):
+            if self.depths[i] >= 0 and self.keys[i] == key:
+                action = None
+                if self.actions[i] != NO_ACTION:
+                    action = Action.unpack(self.actions[i].to_bytes(ACTION_RECORD.size, "little"))
+                return TTEntry(self.values[i], self.depths[i], Bound(self.bounds[i]), action)
+        return None
+
+    def store(self, key: int, value: float, depth: int, bound: Bound, action: Optional[Action] = None):
+        """Record a search result for a position."""
+        slot = (key & self.mask) * 2
+        depths = self.depths
+        if (depths[slot] < 0 or self.keys[slot] == key or depths[slot] <= depth
+                or self.generations[slot] != self.generation):
+            i = slot
+            if self.keys[slot + 1] == key:
+                depths[slot + 1] = -1  # don't keep a stale copy in the other slot
+        else:
+            i = slot + 1
+
+        if action is not None:
+            packed = int.from_bytes(action.pack(), "little")
+        elif self.keys[i] == key and depths[i] >= 0:
+            packed = self.actions[i]  # keep the old best action rather than losing it
+        else:
+            packed = NO_ACTION
+
+        self.keys[i] = key
+        self.values[i] = value
+        self.depths[i] = depth
+        self.bounds[i] = bound
+        self.generations[i] = self.generation
+        self.actions[i] = packed
+
+    def usage(self) -> float:
+        """Fraction of slots written during the current search."""
+        used = sum(1 for i, depth in enumerate(self.depths)
+                   if depth >= 0 and self.generations[i] == self.generation)
+        return used / len(self.depths)